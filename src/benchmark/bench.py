@@ -0,0 +1,352 @@
+'''
+Benchmarks for geogitpy.
+
+Creates a synthetic repository and measures the latency and throughput of the main Repository
+operations. Results are saved as JSON, and can be compared with the ones of a previous run.
+
+    python bench.py --features 10000 --commits 50 --branches 4 --output after.json --compare before.json
+
+If GeoGit is not installed (or --standin is used), the stand-in CLI in the bin folder is used instead.
+
+To measure parsing and caching without the cost of running geogit, record a run and replay it,
+optionally injecting a fixed latency per command (the importshp benchmark is skipped when replaying):
+
+    python bench.py --record run.json
+    python bench.py --replay run.json --latency 0.01
+
+The startup benchmark imports geogit.repo and creates a Repository in a new interpreter. If it loads modules
+that should only be imported when used, or if its p50 is over the startup budget, the run exits with an error.
+Startup times depend on the machine, so the budget can be set with --startupbudget or the
+GEOGITPY_STARTUP_BUDGET environment variable, to a baseline measured on the machine that runs the check
+plus a margin. Otherwise STARTUP_BUDGET is used:
+
+    python bench.py --only startup --startupbudget 0.05
+'''
+
+import os
+import sys
+
+libpath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(libpath)
+
+import time
+import json
+import random
+import subprocess
+import shutil
+import argparse
+import platform
+import tempfile
+from distutils.spawn import find_executable
+import geogit
+from geogit import DEFERRED_MODULES
+from geogit.repo import Repository
+from geogit.replayconnector import RecordingConnector, ReplayConnector
+from geogit import instrumentation
+from geogit import cliparser
+import synthetic
+
+STANDIN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bin")
+
+#Seconds that a new interpreter is expected to take to import geogit.repo and create a Repository (the p50
+#of the startup benchmark), if no budget is set for the machine. Runs over it, or that load any of the
+#DEFERRED_MODULES, fail
+STARTUP_BUDGET = 0.1
+
+#Environment variable with the startup budget of the machine, in seconds
+STARTUP_BUDGET_VARIABLE = "GEOGITPY_STARTUP_BUDGET"
+
+_STARTUP_SCRIPT = """
+import sys
+import time
+start = time.time()
+from geogit.repo import Repository
+if len(sys.argv) > 1:
+    Repository(sys.argv[1])
+print time.time() - start
+print " ".join(sorted(set(name.split(".")[0] for name in sys.modules)))
+"""
+
+def usestandin():
+    '''Puts the stand-in geogit launcher first in the PATH used to run geogit'''
+    os.environ["PATH"] = STANDIN_PATH + os.pathsep + os.environ.get("PATH", "")
+    os.environ["GEOGIT_STANDIN_PYTHON"] = sys.executable
+
+
+class Context(object):
+
+    '''The repository being benchmarked, and the data that benchmarks pick their arguments from'''
+
+    def __init__(self, repo, folder, seed, features, parsecommits):
+        self.repo = repo
+        self.folder = folder
+        self.features = features
+        self.parsecommits = parsecommits
+        self._revlistoutput = None
+        self._showoutput = None
+        self.rnd = random.Random(seed)
+        self.importrnd = random.Random(seed)
+        self.paths = [f.path for f in repo.features(recursive = True)]
+        self.commitids = [c.commitid for c in repo.log()]
+        self._importrepo = None
+        self._records = None
+
+    def randompath(self):
+        return self.rnd.choice(self.paths)
+
+    def importrepo(self):
+        '''A copy of the repository, so imports do not modify the one used by other benchmarks'''
+        if self._importrepo is None:
+            path = os.path.join(self.folder, "import")
+            shutil.copytree(self.repo.url, path)
+            self._importrepo = Repository(path)
+        return self._importrepo
+
+    def revlistoutput(self):
+        if self._revlistoutput is None:
+            self._revlistoutput = synthetic.revlistoutput(self.parsecommits)
+        return self._revlistoutput
+
+    def showoutput(self):
+        if self._showoutput is None:
+            self._showoutput = synthetic.showoutput(self.features)
+        return self._showoutput
+
+    def importrecords(self):
+        '''Records for a new version of the synthetic layer, to be imported'''
+        if self._records is None:
+            self._records = synthetic._initialrecords(self.features, self.importrnd)
+        return synthetic._edit(self._records, 0.05, self.importrnd)
+
+
+def benchlog(context, i):
+    return len(context.repo.log())
+
+def benchchildren(context, i):
+    return len(context.repo.children(geogit.HEAD, None, True))
+
+def benchfeaturedata(context, i):
+    context.repo.featuredata(geogit.HEAD, context.randompath())
+    return 1
+
+def benchversions(context, i):
+    return len(context.repo.versions(context.randompath()))
+
+def benchdiff(context, i):
+    if len(context.commitids) < 2:
+        return 0
+    n = context.rnd.randint(0, len(context.commitids) - 2)
+    return len(context.repo.diff(context.commitids[n + 1], context.commitids[n]))
+
+def benchtreediff(context, i):
+    if len(context.commitids) < 2:
+        return 0
+    n = context.rnd.randint(0, len(context.commitids) - 2)
+    return len(context.repo.treediff(context.commitids[n + 1], context.commitids[n]))
+
+def benchblame(context, i):
+    return len(context.repo.blame(context.randompath()))
+
+def benchimportshp(context, i):
+    repo = context.importrepo()
+    records = context.importrecords()
+    repo.importshp(synthetic.writeshapefile(context.folder, "imported", records))
+    return len(records)
+
+def benchparselog(context, i):
+    return sum(1 for commit in cliparser.parselog(context.repo, context.revlistoutput()))
+
+def benchparsefeatures(context, i):
+    return sum(1 for feature in cliparser.parsefeatures(context.showoutput()))
+
+#Benchmarks, as (name, function) tuples. Functions take the context and the iteration number,
+#and return the number of items (commits, features, diff entries...) processed
+BENCHMARKS = [("log", benchlog),
+              ("children", benchchildren),
+              ("featuredata", benchfeaturedata),
+              ("versions", benchversions),
+              ("diff", benchdiff),
+              ("treediff", benchtreediff),
+              ("blame", benchblame),
+              ("importshp", benchimportshp),
+              ("parselog", benchparselog),
+              ("parsefeatures", benchparsefeatures)]
+
+
+def measurestartup(url, iterations):
+    '''
+    Imports geogit.repo and creates a Repository for the passed url, if it is not None, in a new interpreter
+    for each iteration. Returns a dict with the latency percentiles, as measure does, and the deferred
+    modules that were loaded
+    '''
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([libpath] + ([env["PYTHONPATH"]] if env.get("PYTHONPATH") else []))
+    times = []
+    loaded = set()
+    for i in range(iterations):
+        command = [sys.executable, "-c", _STARTUP_SCRIPT] + ([url] if url is not None else [])
+        lines = subprocess.check_output(command, env = env).splitlines()
+        times.append(float(lines[0]))
+        loaded.update(lines[1].split())
+    total = sum(times)
+    return {"iterations": iterations,
+            "items": iterations,
+            "total": total,
+            "throughput": iterations / total if total else 0.0,
+            "latency": {"min": min(times), "mean": total / iterations, "p50": _percentile(times, 50),
+                        "p90": _percentile(times, 90), "p99": _percentile(times, 99), "max": max(times)},
+            "deferred": sorted(loaded.intersection(DEFERRED_MODULES))}
+
+def checkstartup(result, budget = STARTUP_BUDGET):
+    '''
+    Returns a list with the reasons why the result of the startup benchmark is not within the budget.
+    If budget is None, only the modules loaded are checked
+    '''
+    failures = []
+    if budget is not None and result["latency"]["p50"] > budget:
+        failures.append("startup p50 of %.4fs is over the budget of %.4fs" % (result["latency"]["p50"], budget))
+    if result["deferred"]:
+        failures.append("importing geogit.repo loads " + ", ".join(result["deferred"]))
+    return failures
+
+def startupbudget(budget = None):
+    '''Returns the passed startup budget, or the one in the STARTUP_BUDGET_VARIABLE, or STARTUP_BUDGET'''
+    if budget is not None:
+        return budget
+    if os.environ.get(STARTUP_BUDGET_VARIABLE):
+        return float(os.environ[STARTUP_BUDGET_VARIABLE])
+    return STARTUP_BUDGET
+
+def _percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+def measure(func, context, iterations):
+    '''Runs a benchmark function, returning a dict with its latency percentiles and throughput'''
+    times = []
+    items = 0
+    with instrumentation.profile() as stats:
+        for i in range(iterations):
+            start = time.time()
+            items += func(context, i)
+            times.append(time.time() - start)
+    total = sum(times)
+    return {"iterations": iterations,
+            "items": items,
+            "total": total,
+            "throughput": items / total if total else 0.0,
+            "latency": {"min": min(times), "mean": total / iterations, "p50": _percentile(times, 50),
+                        "p90": _percentile(times, 90), "p99": _percentile(times, 99), "max": max(times)},
+            "commands": dict((s.name, {"count": s.count, "walltime": s.walltime.total,
+                                       "parsetime": s.parsetime.total, "lines": s.lines})
+                             for s in stats.commands.values())}
+
+def run(options, standin):
+    folder = tempfile.mkdtemp()
+    repo = None
+    try:
+        start = time.time()
+        if options.replay:
+            with open(options.replay) as f:
+                url = json.load(f)["url"]
+            repo = Repository(url, ReplayConnector(options.replay, options.latency))
+        elif options.repo:
+            repo = Repository(options.repo)
+        else:
+            repo = synthetic.createrepository(os.path.join(folder, "repo"), options.features, options.commits,
+                        options.branches, options.branchcommits, options.editfraction, seed = options.seed)
+        if options.record:
+            repo = Repository(repo.url, RecordingConnector())
+        setuptime = time.time() - start
+        context = Context(repo, folder, options.seed, options.features, options.parsecommits)
+        results = {}
+        for name, func in BENCHMARKS:
+            if options.only and name not in options.only:
+                continue
+            if options.replay and name == "importshp":
+                continue
+            results[name] = measure(func, context, options.iterations)
+            print "%-12s p50 %8.4fs  p90 %8.4fs  %10.1f items/s" % (name, results[name]["latency"]["p50"],
+                            results[name]["latency"]["p90"], results[name]["throughput"])
+        if not options.only or "startup" in options.only:
+            results["startup"] = measurestartup(None if options.replay else repo.url, options.iterations)
+            print "%-12s p50 %8.4fs  p90 %8.4fs  budget %.4fs" % ("startup", results["startup"]["latency"]["p50"],
+                            results["startup"]["latency"]["p90"], startupbudget(options.startupbudget))
+        return {"environment": {"python": platform.python_version(), "platform": platform.platform(),
+                                "cli": "standin" if standin else "geogit", "date": time.strftime("%Y-%m-%dT%H:%M:%S")},
+                "parameters": {"features": options.features, "commits": options.commits, "branches": options.branches,
+                               "branchcommits": options.branchcommits, "editfraction": options.editfraction,
+                               "parsecommits": options.parsecommits, "iterations": options.iterations, "seed": options.seed, "repo": options.repo,
+                               "replay": options.replay, "latency": options.latency},
+                "setuptime": setuptime,
+                "results": results}
+    finally:
+        #if setup failed, there is nothing recorded and the original error is raised
+        if options.record and repo is not None and isinstance(repo.connector, RecordingConnector):
+            repo.connector.save(options.record)
+        if options.keep:
+            print "Benchmark data kept in " + folder
+        else:
+            shutil.rmtree(folder, ignore_errors = True)
+
+def compare(base, current):
+    '''Returns a table comparing the results of two runs'''
+    lines = ["%-12s %10s %10s %8s %12s %12s %8s" % ("benchmark", "base p50", "p50", "ratio",
+                                                   "base items/s", "items/s", "ratio")]
+    for name, result in sorted(current["results"].items()):
+        old = base["results"].get(name)
+        if old is None:
+            continue
+        p50, oldp50 = result["latency"]["p50"], old["latency"]["p50"]
+        throughput, oldthroughput = result["throughput"], old["throughput"]
+        lines.append("%-12s %10.4f %10.4f %8.2f %12.1f %12.1f %8.2f" % (name, oldp50, p50,
+                        p50 / oldp50 if oldp50 else 0.0, oldthroughput, throughput,
+                        throughput / oldthroughput if oldthroughput else 0.0))
+    return "\n".join(lines)
+
+def main(args = None):
+    parser = argparse.ArgumentParser(description = "Benchmarks for geogitpy")
+    parser.add_argument("--features", type = int, default = 1000, help = "number of features in the synthetic layer")
+    parser.add_argument("--commits", type = int, default = 20, help = "number of commits in the master branch")
+    parser.add_argument("--branches", type = int, default = 2, help = "number of branches")
+    parser.add_argument("--branchcommits", type = int, default = 5, help = "number of commits in each branch")
+    parser.add_argument("--editfraction", type = float, default = 0.05, help = "fraction of features modified by each commit")
+    parser.add_argument("--iterations", type = int, default = 10, help = "number of times each benchmark is run")
+    parser.add_argument("--parsecommits", type = int, default = 100000, help = "number of commits in the output parsed by parselog")
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--repo", help = "use an existing repository instead of creating a synthetic one")
+    parser.add_argument("--only", nargs = "+", help = "names of the benchmarks to run")
+    parser.add_argument("--standin", action = "store_true", help = "use the stand-in CLI even if geogit is installed")
+    parser.add_argument("--record", help = "file to save the commands run and their output to")
+    parser.add_argument("--replay", help = "file with recorded commands to replay instead of running geogit")
+    parser.add_argument("--latency", type = float, default = 0, help = "seconds to wait for each replayed command")
+    parser.add_argument("--output", help = "file to save the results to, as JSON")
+    parser.add_argument("--compare", help = "file with the results of a previous run to compare with")
+    parser.add_argument("--keep", action = "store_true", help = "do not delete the synthetic repository")
+    parser.add_argument("--startupbudget", type = float,
+                        help = "maximum seconds to import geogit.repo and create a Repository. If it is not passed, "
+                               "the one in %s is used, or %.2f seconds" % (STARTUP_BUDGET_VARIABLE, STARTUP_BUDGET))
+    options = parser.parse_args(args)
+    standin = options.standin or find_executable("geogit") is None
+    if standin and not options.replay:
+        usestandin()
+    results = run(options, standin)
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump(results, f, indent = 2, sort_keys = True)
+    if options.compare:
+        with open(options.compare) as f:
+            print compare(json.load(f), results)
+    if "startup" in results["results"]:
+        startup = results["results"]["startup"]
+        failures = checkstartup(startup, startupbudget(options.startupbudget))
+        for failure in failures:
+            print "FAILED: " + failure
+        if failures:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,4 @@
+@echo off
+rem Launcher for the geogit stand-in used by the benchmarks
+if "%GEOGIT_STANDIN_PYTHON%"=="" set GEOGIT_STANDIN_PYTHON=python
+"%GEOGIT_STANDIN_PYTHON%" "%~dp0..\standin.py" %*
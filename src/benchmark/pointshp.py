@@ -0,0 +1,110 @@
+'''
+Minimal reader and writer for point shapefiles, used to generate synthetic data for benchmarks
+without depending on any GIS library.
+
+Fields are described as (name, type) tuples, with type being one of
+'C' (string), 'N' (integer) or 'F' (floating point number).
+Records are (x, y, attributes) tuples, attributes being a dict with field names as keys.
+'''
+
+import os
+import struct
+
+WGS84_PRJ = ('GEOGCS["GCS_WGS_1984",DATUM["D_WGS_1984",SPHEROID["WGS_1984",6378137,298.257223563]],'
+             'PRIMEM["Greenwich",0],UNIT["Degree",0.017453292519943295]]')
+
+_WIDTHS = {'C': (64, 0), 'N': (18, 0), 'F': (24, 8)}
+
+def _basename(path):
+    return os.path.splitext(path)[0]
+
+def _header(length, bbox):
+    header = struct.pack(">7i", 9994, 0, 0, 0, 0, 0, length)
+    header += struct.pack("<2i", 1000, 1)
+    header += struct.pack("<8d", bbox[0], bbox[1], bbox[2], bbox[3], 0, 0, 0, 0)
+    return header
+
+def write(path, fields, records):
+    '''Writes a point shapefile (.shp, .shx, .dbf and .prj files) with the passed fields and records'''
+    base = _basename(path)
+    if records:
+        xs = [r[0] for r in records]
+        ys = [r[1] for r in records]
+        bbox = (min(xs), min(ys), max(xs), max(ys))
+    else:
+        bbox = (0, 0, 0, 0)
+    n = len(records)
+    with open(base + ".shp", "wb") as shp:
+        shp.write(_header(50 + 14 * n, bbox))
+        for i, record in enumerate(records):
+            shp.write(struct.pack(">2i", i + 1, 10))
+            shp.write(struct.pack("<i2d", 1, record[0], record[1]))
+    with open(base + ".shx", "wb") as shx:
+        shx.write(_header(50 + 4 * n, bbox))
+        for i in range(n):
+            shx.write(struct.pack(">2i", 50 + 14 * i, 10))
+    with open(base + ".prj", "w") as prj:
+        prj.write(WGS84_PRJ)
+    widths = [_WIDTHS[t] for name, t in fields]
+    recordlength = 1 + sum(w for w, d in widths)
+    with open(base + ".dbf", "wb") as dbf:
+        dbf.write(struct.pack("<4BIHH20x", 3, 113, 1, 1, n, 33 + 32 * len(fields), recordlength))
+        for (name, t), (width, decimals) in zip(fields, widths):
+            dbf.write(struct.pack("<11sc4xBB14x", name[:10], t, width, decimals))
+        dbf.write("\r")
+        for record in records:
+            attributes = record[2]
+            dbf.write(" ")
+            for (name, t), (width, decimals) in zip(fields, widths):
+                value = attributes.get(name)
+                if value is None:
+                    text = ""
+                elif t == 'C':
+                    text = unicode(value).encode("utf-8")[:width].ljust(width)
+                elif t == 'F':
+                    text = ("%.*f" % (decimals, value))[:width]
+                else:
+                    text = str(int(value))[:width]
+                dbf.write(text.rjust(width) if t != 'C' else text.ljust(width))
+        dbf.write("\x1a")
+
+def read(path):
+    '''Reads a point shapefile, returning a tuple of (fields, records)'''
+    base = _basename(path)
+    with open(base + ".dbf", "rb") as dbf:
+        data = dbf.read()
+    n, headerlength, recordlength = struct.unpack("<IHH", data[4:12])
+    fields = []
+    widths = []
+    offset = 32
+    while data[offset] != "\r":
+        name, t, width, decimals = struct.unpack("<11sc4xBB14x", data[offset:offset + 32])
+        fields.append((name.split("\0")[0], t if t != 'N' or decimals == 0 else 'F'))
+        widths.append(width)
+        offset += 32
+    attributes = []
+    for i in range(n):
+        start = headerlength + i * recordlength + 1
+        values = {}
+        for (name, t), width in zip(fields, widths):
+            text = data[start:start + width].strip()
+            start += width
+            if text == "":
+                values[name] = None
+            elif t == 'C':
+                values[name] = text.decode("utf-8")
+            elif t == 'F':
+                values[name] = float(text)
+            else:
+                values[name] = int(text)
+        attributes.append(values)
+    with open(base + ".shp", "rb") as shp:
+        data = shp.read()
+    records = []
+    offset = 100
+    for values in attributes:
+        length = struct.unpack(">2i", data[offset:offset + 8])[1]
+        shapetype, x, y = struct.unpack("<i2d", data[offset + 8:offset + 28])
+        records.append((x, y, values))
+        offset += 8 + 2 * length
+    return fields, records
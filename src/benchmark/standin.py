@@ -0,0 +1,538 @@
+'''
+A stand-in for the geogit command-line interface, used to run benchmarks where GeoGit is not installed.
+
+It implements the subset of commands used by the CLI connector, producing output in the same format,
+and stores repositories in a .geogit folder with the same layout of refs and heads.
+Objects are stored as loose files, in a format that has nothing to do with the one used by GeoGit.
+Only point shapefiles, as written by the pointshp module, can be imported.
+
+It is not meant to be used directly, but through the geogit launcher scripts in the bin folder.
+'''
+
+import os
+import re
+import sys
+import time
+import shutil
+import marshal
+import hashlib
+import getpass
+import pointshp
+
+NULL_ID = "0" * 40
+GEOGIT = ".geogit"
+HEAD = "HEAD"
+WORK_HEAD = "WORK_HEAD"
+STAGE_HEAD = "STAGE_HEAD"
+
+_TYPES = {'C': "STRING", 'N': "INTEGER", 'F': "DOUBLE"}
+
+
+class StandinException(Exception):
+    pass
+
+
+class Store(object):
+
+    '''Objects and refs of a repository'''
+
+    def __init__(self, url):
+        self.url = url
+        self.root = os.path.join(url, GEOGIT)
+        self._cache = {}
+
+    def exists(self):
+        return os.path.isdir(self.root)
+
+    def init(self):
+        if not os.path.isdir(self.url):
+            os.makedirs(self.url)
+        if not os.path.isdir(self.root):
+            os.makedirs(os.path.join(self.root, "objects"))
+            os.makedirs(os.path.join(self.root, "refs", "heads"))
+            os.makedirs(os.path.join(self.root, "refs", "tags"))
+        empty = self.put(("tree", []))
+        self.writefile(HEAD, "ref: refs/heads/master")
+        self.writefile(WORK_HEAD, empty)
+        self.writefile(STAGE_HEAD, empty)
+
+    def _objectpath(self, id):
+        return os.path.join(self.root, "objects", id[:2], id[2:])
+
+    def put(self, obj):
+        data = marshal.dumps(obj)
+        id = hashlib.sha1(data).hexdigest()
+        path = self._objectpath(id)
+        if not os.path.exists(path):
+            folder = os.path.dirname(path)
+            if not os.path.isdir(folder):
+                os.makedirs(folder)
+            with open(path, "wb") as f:
+                f.write(data)
+        self._cache[id] = obj
+        return id
+
+    def get(self, id):
+        obj = self._cache.get(id)
+        if obj is None:
+            path = self._objectpath(id)
+            if not os.path.exists(path):
+                raise StandinException("Object not found: " + id)
+            with open(path, "rb") as f:
+                obj = marshal.loads(f.read())
+            self._cache[id] = obj
+        return obj
+
+    def hasobject(self, id):
+        return id in self._cache or os.path.exists(self._objectpath(id))
+
+    def readfile(self, name):
+        path = os.path.join(self.root, name)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return f.read().strip()
+
+    def writefile(self, name, content):
+        path = os.path.join(self.root, name)
+        folder = os.path.dirname(path)
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        with open(path, "w") as f:
+            f.write(content + "\n")
+
+    def deletefile(self, name):
+        path = os.path.join(self.root, name)
+        if not os.path.exists(path):
+            raise StandinException("Ref does not exist: " + name)
+        os.remove(path)
+
+    def refs(self):
+        refs = []
+        for kind in ["heads", "tags"]:
+            folder = os.path.join(self.root, "refs", kind)
+            for name in sorted(os.listdir(folder)):
+                refs.append(("refs/%s/%s" % (kind, name), self.readfile("refs/%s/%s" % (kind, name))))
+        return refs
+
+    def headref(self):
+        '''Returns the name of the current branch ref, or None if HEAD is detached'''
+        head = self.readfile(HEAD)
+        if head.startswith("ref: "):
+            return head[len("ref: "):]
+        return None
+
+    def headcommit(self):
+        ref = self.headref()
+        if ref is None:
+            return self.readfile(HEAD)
+        return self.readfile(ref)
+
+    def sethead(self, commitid):
+        ref = self.headref()
+        self.writefile(ref or HEAD, commitid)
+
+    def treeof(self, id):
+        obj = self.get(id)
+        if obj[0] == "commit":
+            return obj[1]["tree"]
+        if obj[0] != "tree":
+            raise StandinException("Not a tree-ish object: " + id)
+        return id
+
+    def entries(self, treeid):
+        return self.get(treeid)[1]
+
+    def lookup(self, treeid, path):
+        '''Returns the (type, id, metadataid) entry for a path in a tree, or None if it does not exist'''
+        entry = ("tree", treeid, NULL_ID)
+        for name in path.strip("/").split("/"):
+            if entry[0] != "tree":
+                return None
+            entry = self._child(entry[1], name)
+            if entry is None:
+                return None
+        return entry
+
+    def _child(self, treeid, name):
+        for entry in self.entries(treeid):
+            if entry[0] == name:
+                return entry[1:]
+        return None
+
+    def settree(self, treeid, path, entry):
+        '''Returns the id of a tree like the passed one, with the entry at the passed path replaced (or removed, if None)'''
+        names = path.strip("/").split("/")
+        name = names[0]
+        entries = [e for e in self.entries(treeid) if e[0] != name]
+        if len(names) > 1:
+            child = self._child(treeid, name)
+            subtree = child[1] if child is not None and child[0] == "tree" else self.put(("tree", []))
+            newsubtree = self.settree(subtree, "/".join(names[1:]), entry)
+            entry = ("tree", newsubtree, NULL_ID) if self.entries(newsubtree) else None
+        if entry is not None:
+            entries.append((name,) + tuple(entry))
+        entries.sort()
+        return self.put(("tree", entries))
+
+    def walk(self, treeid, prefix = "", recursive = True):
+        '''Yields (path, type, id, metadataid) for the entries of a tree'''
+        for name, kind, id, metadataid in self.entries(treeid):
+            path = prefix + name
+            if kind == "tree" and recursive:
+                for child in self.walk(id, path + "/"):
+                    yield child
+            else:
+                yield (path, kind, id, metadataid)
+
+    def features(self, treeid):
+        return dict((path, (id, metadataid)) for path, kind, id, metadataid in self.walk(treeid) if kind == "feature")
+
+
+_SPEC = re.compile(r"^(.*?)((?:~\d*|\^)*)$")
+
+def resolve(store, spec):
+    '''Resolves a revision specification, such as HEAD~2 or master:parks/1, to an object id'''
+    path = None
+    if ":" in spec:
+        spec, path = spec.split(":", 1)
+    base, suffix = _SPEC.match(spec).groups()
+    if base in (WORK_HEAD, STAGE_HEAD):
+        id = store.readfile(base)
+    elif base == HEAD:
+        id = store.headcommit()
+    elif store.readfile("refs/heads/" + base) is not None:
+        id = store.readfile("refs/heads/" + base)
+    elif store.readfile("refs/tags/" + base) is not None:
+        id = store.readfile("refs/tags/" + base)
+    elif re.match("^[0-9a-f]{40}$", base) and store.hasobject(base):
+        id = base
+    else:
+        raise StandinException("Cannot resolve the provided reference: " + spec)
+    for step in re.findall(r"~\d*|\^", suffix):
+        n = 1 if step in ("~", "^") else int(step[1:])
+        for i in range(n):
+            parents = store.get(id)[1]["parents"] if store.get(id)[0] == "commit" else []
+            if not parents:
+                raise StandinException("Cannot resolve the provided reference: " + spec)
+            id = parents[0]
+    if path:
+        entry = store.lookup(store.treeof(id), path)
+        if entry is None:
+            raise StandinException("Path does not exist: " + path)
+        id = entry[1]
+    return id
+
+
+def ancestors(store, commitid):
+    '''Returns all the commits reachable from the passed one, most recent first'''
+    seen = set()
+    pending = [commitid]
+    commits = []
+    while pending:
+        id = pending.pop()
+        if id in seen or id == NULL_ID:
+            continue
+        seen.add(id)
+        commits.append((id, store.get(id)[1]))
+        pending.extend(store.get(id)[1]["parents"])
+    commits.sort(key = lambda c: c[1]["time"], reverse = True)
+    return commits
+
+
+def _userline(info, kind):
+    return "%s %s %s %d 0" % (kind, info["author"], info["email"], info["time"])
+
+
+def revlist(store, args):
+    path = args[args.index("-p") + 1] if "-p" in args else None
+    limit = int(args[args.index("-n") + 1]) if "-n" in args else None
+    for id, info in ancestors(store, resolve(store, args[0])):
+        if limit == 0:
+            break
+        if path is not None:
+            entry = store.lookup(info["tree"], path)
+            parent = info["parents"][0] if info["parents"] else None
+            parententry = store.lookup(store.get(parent)[1]["tree"], path) if parent else None
+            if entry is None or entry == parententry:
+                continue
+        if limit is not None:
+            limit -= 1
+        print "commit " + id
+        print "tree " + info["tree"]
+        if info["parents"]:
+            for parent in info["parents"]:
+                print "parent " + parent
+        else:
+            print "parent "
+        print _userline(info, "author")
+        print _userline(info, "committer")
+        print "message"
+        for line in info["message"].split("\n"):
+            print "\t" + line
+        print ""
+
+
+def lstree(store, args):
+    spec = args[0]
+    recursive = "-r" in args
+    id = resolve(store, spec)
+    prefix = spec.split(":", 1)[1].strip("/") + "/" if ":" in spec else ""
+    for path, kind, objectid, metadataid in store.walk(store.treeof(id), prefix, recursive):
+        print "%s %s %s %s" % (metadataid, kind, objectid, path)
+
+
+def show(store, args):
+    refs = [a for a in args if a != "--raw"]
+    for i, ref in enumerate(refs):
+        id = resolve(store, ref)
+        obj = store.get(id)
+        if obj[0] != "feature":
+            print "\n".join(str(v) for v in obj[1].items()) if obj[0] == "commit" else id
+            continue
+        print ref
+        print id
+        for name, kind, value in obj[1]["attributes"]:
+            print name
+            print kind
+            print value
+        if i < len(refs) - 1:
+            print ""
+
+
+def _changes(store, treea, treeb, path = None):
+    featuresa = store.features(treea)
+    featuresb = store.features(treeb)
+    changes = []
+    for p in sorted(set(featuresa) | set(featuresb)):
+        if path is not None and p != path and not p.startswith(path + "/"):
+            continue
+        ida = featuresa.get(p, (NULL_ID,))[0]
+        idb = featuresb.get(p, (NULL_ID,))[0]
+        if ida != idb:
+            changes.append((p, ida, idb))
+    return changes
+
+
+def difftree(store, args):
+    treea = store.treeof(resolve(store, args[0]))
+    treeb = store.treeof(resolve(store, args[1]))
+    path = args[args.index("--") + 1] if "--" in args else None
+    for p, ida, idb in _changes(store, treea, treeb, path):
+        print "%s %s %s" % (p, ida, idb)
+        if "--describe" in args:
+            attrsa = dict((a[0], a[2]) for a in store.get(ida)[1]["attributes"]) if ida != NULL_ID else {}
+            attrsb = dict((a[0], a[2]) for a in store.get(idb)[1]["attributes"]) if idb != NULL_ID else {}
+            for name in sorted(set(attrsa) | set(attrsb)):
+                if name not in attrsb:
+                    print "R " + name
+                    print attrsa[name]
+                elif name not in attrsa:
+                    print "A " + name
+                    print attrsb[name]
+                elif attrsa[name] != attrsb[name]:
+                    print "M " + name
+                    print attrsa[name]
+                    print attrsb[name]
+
+
+def blame(store, args):
+    path = args[0]
+    commitid = store.headcommit()
+    info = store.get(commitid)[1]
+    entry = store.lookup(info["tree"], path)
+    if entry is None:
+        raise StandinException("Path does not exist: " + path)
+    current = dict((a[0], a[2]) for a in store.get(entry[1])[1]["attributes"])
+    blamed = dict((name, (commitid, info)) for name in current)
+    while info["parents"]:
+        parentid = info["parents"][0]
+        info = store.get(parentid)[1]
+        entry = store.lookup(info["tree"], path)
+        if entry is None:
+            break
+        values = dict((a[0], a[2]) for a in store.get(entry[1])[1]["attributes"])
+        unchanged = [name for name in blamed if values.get(name) == current[name]]
+        if not unchanged:
+            break
+        for name in unchanged:
+            blamed[name] = (parentid, info)
+    for name in sorted(blamed):
+        id, info = blamed[name]
+        print "%s %s %s %s %d 0 %s" % (name, id, info["author"], info["email"], info["time"], current[name])
+
+
+def importshp(store, args):
+    shapefile = args[0]
+    dest = args[args.index("--dest") + 1] if "--dest" in args else os.path.splitext(os.path.basename(shapefile))[0]
+    fields, records = pointshp.read(shapefile)
+    attributetypes = [(name, _TYPES[t]) for name, t in fields] + [("the_geom", "POINT")]
+    featuretype = hashlib.sha1(repr(attributetypes)).hexdigest()
+    entries = []
+    for i, (x, y, values) in enumerate(records):
+        attributes = [(name, kind, unicode(values[name]).encode("utf-8") if values[name] is not None else "")
+                      for name, kind in attributetypes[:-1]]
+        attributes.append(("the_geom", "POINT", "POINT (%r %r)" % (x, y)))
+        id = store.put(("feature", {"featuretype": featuretype, "attributes": attributes}))
+        entries.append((str(i + 1), "feature", id, featuretype))
+    entries.sort()
+    layer = store.put(("tree", entries))
+    work = store.settree(store.readfile(WORK_HEAD), dest, ("tree", layer, featuretype))
+    store.writefile(WORK_HEAD, work)
+    if "--add" in args:
+        store.writefile(STAGE_HEAD, work)
+    print "%d features imported" % len(records)
+
+
+def exportshp(store, args):
+    tree = store.treeof(resolve(store, args[0]))
+    features = sorted(store.features(tree).items())
+    fields = []
+    records = []
+    kinds = dict((v, k) for k, v in _TYPES.items())
+    for path, (id, metadataid) in features:
+        attributes = store.get(id)[1]["attributes"]
+        if not fields:
+            fields = [(name, kinds.get(kind, 'C')) for name, kind, value in attributes if kind != "POINT"]
+        values = {}
+        x = y = 0.0
+        for name, kind, value in attributes:
+            if kind == "POINT":
+                x, y = [float(c) for c in value[value.index("(") + 1:value.index(")")].split()]
+            elif kind == "INTEGER":
+                values[name] = int(value) if value else None
+            elif kind == "DOUBLE":
+                values[name] = float(value) if value else None
+            else:
+                values[name] = value.decode("utf-8")
+        records.append((x, y, values))
+    pointshp.write(args[1], fields, records)
+
+
+def add(store, args):
+    work = store.readfile(WORK_HEAD)
+    if not args:
+        store.writefile(STAGE_HEAD, work)
+        return
+    stage = store.readfile(STAGE_HEAD)
+    for path in args:
+        stage = store.settree(stage, path, store.lookup(work, path))
+    store.writefile(STAGE_HEAD, stage)
+
+
+def commit(store, args):
+    message = args[args.index("-m") + 1]
+    parent = store.headcommit()
+    info = {"tree": store.readfile(STAGE_HEAD), "parents": [parent] if parent else [],
+            "author": os.environ.get("GEOGIT_STANDIN_USER", getpass.getuser()).replace(" ", "_"),
+            "email": "standin@localhost", "time": int(time.time() * 1000), "message": message}
+    if parent:
+        info["time"] = max(info["time"], store.get(parent)[1]["time"] + 1)
+    store.sethead(store.put(("commit", info)))
+
+
+def branch(store, args):
+    if args[0] == "-d":
+        store.deletefile("refs/heads/" + args[1])
+        return
+    name = args[0]
+    options = [a for a in args[1:] if a.startswith("-")]
+    refs = [a for a in args[1:] if not a.startswith("-")]
+    if store.readfile("refs/heads/" + name) is not None and "-f" not in options:
+        raise StandinException("A branch named '%s' already exists" % name)
+    store.writefile("refs/heads/" + name, resolve(store, refs[0] if refs else HEAD))
+    if "-c" in options:
+        checkout(store, [name])
+
+
+def checkout(store, args):
+    if "-p" in args:
+        ref = store.treeof(resolve(store, args[0]))
+        work = store.readfile(WORK_HEAD)
+        for path in args[args.index("-p") + 1:]:
+            work = store.settree(work, path, store.lookup(ref, path))
+        store.writefile(WORK_HEAD, work)
+        return
+    name = args[0]
+    if store.readfile("refs/heads/" + name) is not None:
+        store.writefile(HEAD, "ref: refs/heads/" + name)
+        id = store.readfile("refs/heads/" + name)
+    else:
+        id = resolve(store, name)
+        store.writefile(HEAD, id)
+    tree = store.treeof(id)
+    store.writefile(WORK_HEAD, tree)
+    store.writefile(STAGE_HEAD, tree)
+
+
+def reset(store, args):
+    id = resolve(store, args[0])
+    store.sethead(id)
+    tree = store.treeof(id)
+    if "--soft" not in args:
+        store.writefile(STAGE_HEAD, tree)
+    if "--hard" in args:
+        store.writefile(WORK_HEAD, tree)
+
+
+def showref(store, args):
+    for name, id in store.refs():
+        print "%s %s" % (id, name)
+
+
+def revparse(store, args):
+    print resolve(store, args[0])
+
+
+def tag(store, args):
+    if args[0] == "-d":
+        store.deletefile("refs/tags/" + args[1])
+    else:
+        store.writefile("refs/tags/" + args[0], resolve(store, args[1]))
+
+
+def conflicts(store, args):
+    print "No elements need merging."
+
+
+def clone(args):
+    shutil.copytree(os.path.join(args[0], GEOGIT), os.path.join(args[1], GEOGIT))
+
+
+_COMMANDS = {"rev-list": revlist, "rev-parse": revparse, "ls-tree": lstree, "show": show,
+             "diff-tree": difftree, "blame": blame, "add": add, "commit": commit, "branch": branch,
+             "checkout": checkout, "reset": reset, "show-ref": showref, "tag": tag, "conflicts": conflicts}
+
+_SUBCOMMANDS = {("shp", "import"): importshp, ("shp", "export"): exportshp}
+
+
+def main(args):
+    url = os.getcwd()
+    store = Store(url)
+    if not args:
+        print "usage: geogit <command> [<args>]"
+        return 1
+    try:
+        if args[0] == "init":
+            store.init()
+            print "Initialized empty Geogit repository in " + os.path.join(url, GEOGIT)
+            return 0
+        if args[0] == "clone":
+            clone(args[1:])
+            return 0
+        if not store.exists():
+            raise StandinException("Not in a geogit repository: " + url)
+        if tuple(args[:2]) in _SUBCOMMANDS:
+            _SUBCOMMANDS[tuple(args[:2])](store, args[2:])
+        elif args[0] in _COMMANDS:
+            _COMMANDS[args[0]](store, args[1:])
+        else:
+            raise StandinException("Command not supported by the geogit stand-in: " + " ".join(args))
+    except StandinException, e:
+        print e
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,102 @@
+'''
+Generation of synthetic repositories for benchmarks.
+
+Repositories are created through the Repository API, importing a point shapefile for each commit,
+so they can be created both with GeoGit and with the stand-in CLI.
+'''
+
+import os
+import copy
+import random
+import shutil
+import tempfile
+import geogit
+from geogit.repo import Repository
+import pointshp
+
+FIELDS = [("name", 'C'), ("category", 'N'), ("value", 'F')]
+
+def _initialrecords(count, rnd):
+    records = []
+    for i in range(count):
+        attributes = {"name": "feature %d" % i, "category": rnd.randint(0, 20), "value": rnd.uniform(0, 10000)}
+        records.append((rnd.uniform(-180, 180), rnd.uniform(-85, 85), attributes))
+    return records
+
+def _edit(records, fraction, rnd):
+    '''Modifies a fraction of the passed records, changing their attributes and moving them slightly'''
+    records = list(records)
+    count = max(1, int(len(records) * fraction)) if records else 0
+    for i in rnd.sample(range(len(records)), count):
+        x, y, attributes = records[i]
+        attributes = dict(attributes)
+        attributes["value"] = rnd.uniform(0, 10000)
+        records[i] = (x + rnd.uniform(-0.01, 0.01), y + rnd.uniform(-0.01, 0.01), attributes)
+    return records
+
+def writeshapefile(folder, layer, records):
+    '''Writes a version of the synthetic layer to a shapefile in the passed folder, returning its path'''
+    path = os.path.join(folder, layer + ".shp")
+    pointshp.write(path, FIELDS, records)
+    return path
+
+def createrepository(path, features = 1000, commits = 20, branches = 0, branchcommits = 5,
+                     editfraction = 0.05, layer = "points", seed = 0):
+    '''
+    Creates a repository with a single layer of point features.
+
+    features: number of features in the layer
+    commits: number of commits in the master branch. The first one adds all features, and each of the
+    following ones modifies a fraction of them, given by editfraction
+    branches: number of branches to create, forking from commits evenly spread along the master branch.
+    Each branch has branchcommits commits of its own.
+
+    Returns the Repository object, with master checked out
+    '''
+    rnd = random.Random(seed)
+    folder = tempfile.mkdtemp()
+    try:
+        repo = Repository(path, init = True)
+        records = _initialrecords(features, rnd)
+        forkpoints = set(int(commits * (i + 1) / (branches + 1.0)) for i in range(branches))
+        snapshots = []
+        for i in range(commits):
+            if i > 0:
+                records = _edit(records, editfraction, rnd)
+            repo.importshp(writeshapefile(folder, layer, records))
+            repo.addandcommit("commit %d" % i)
+            if i in forkpoints:
+                snapshots.append((repo.revparse(geogit.HEAD), copy.copy(records)))
+        for i, (commitid, branchrecords) in enumerate(snapshots):
+            name = "branch%d" % i
+            repo.createbranch(commitid, name)
+            repo.checkout(name)
+            for j in range(branchcommits):
+                branchrecords = _edit(branchrecords, editfraction, rnd)
+                repo.importshp(writeshapefile(folder, layer, branchrecords))
+                repo.addandcommit("%s commit %d" % (name, j))
+        if snapshots:
+            repo.checkout(geogit.MASTER)
+        return repo
+    finally:
+        shutil.rmtree(folder, ignore_errors = True)
+
+
+def revlistoutput(commits):
+    '''Returns the lines that rev-list would output for a linear history with the passed number of commits'''
+    lines = []
+    for i in range(commits):
+        timestamp = 1384817842000 - i * 60000
+        lines.extend(["commit %040x" % (commits - i), "tree %040x" % (commits + i), "parent %040x" % (commits - i - 1),
+                      "author volaya volaya@boundlessgeo.com %d 3600000" % timestamp,
+                      "committer volaya volaya@boundlessgeo.com %d 3600000" % timestamp,
+                      "message", "\tcommit %d" % i, ""])
+    return lines
+
+def showoutput(features):
+    '''Returns the lines that show --raw would output for the passed number of synthetic features'''
+    lines = []
+    for i in range(features):
+        lines.extend(["HEAD:points/%d" % i, "%040x" % i, "name", "STRING", "feature %d" % i, "category", "INTEGER", str(i % 20),
+                      "value", "DOUBLE", str(i * 1.5), "the_geom", "POINT", "POINT (%d %d)" % (i % 360 - 180, i % 170 - 85), ""])
+    return lines
@@ -9,4 +9,7 @@ RESET_MODE_HARD = "hard"
 RESET_MODE_MIXED = "mixed"
 RESET_MODE_SOFT = "soft"
 
+#Modules that only some operations need, so importing geogit.repo must not load them
+DEFERRED_MODULES = ["shapely", "numpy", "pyarrow", "multiprocessing", "sqlite3", "ctypes"]
+
 
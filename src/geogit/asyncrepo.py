@@ -0,0 +1,243 @@
+import threading
+import Queue
+from geogit import cliconnector
+from geogit.repo import Repository
+from geogit.geogitexception import GeoGitException
+
+#Maximum number of geogit processes that an AsyncRepository runs at the same time
+DEFAULT_MAX_CONCURRENT = 8
+
+#Number of elements that a streaming operation can read ahead of its consumer
+DEFAULT_BUFFER_SIZE = 1000
+
+#Seconds between checks for cancellation while a producer or a consumer is blocked
+POLL_INTERVAL = 0.1
+
+READ_METHODS = ['revparse', 'head', 'log', 'trees', 'features', 'children', 'branches', 'tags', 'branch',
+                'diff', 'treediff', 'haschanged', 'unstaged', 'staged', 'notindatabase', 'status', 'conflicts',
+                'blame', 'featuredata', 'versions', 'asof', 'changestats', 'maphistory', 'featurediff', 'show', 'remotes',
+                'exportshp', 'exportsl', 'exportgeojson', 'exportdiffgeojson',
+                'ismerging', 'isrebasing', 'ischerrypicking']
+
+WRITE_METHODS = ['createbranch', 'deletebranch', 'createtag', 'deletetag', 'checkout', 'updatepathtoref',
+                 'add', 'addfiltered', 'addandcommit', 'commit', 'commitfiltered', 'reset', 'importosm',
+                 'importosmchunked', 'importshp', 'importshpchanges', 'modifyfeature',
+                 'downloadosm', 'merge', 'rebase', 'continuerebase', 'abortrebase', 'cherrypick', 'cherrypickrange',
+                 'continuecherrypick', 'abortcherrypick', 'addremote', 'removeremote']
+
+_END = object()
+
+class AsyncResult(object):
+
+    '''The result of an operation that is being run by an AsyncRepository'''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        self._processes = []
+        self._running = False
+        self._cancelled = False
+        self._value = None
+        self._error = None
+        self._callbacks = []
+
+    def done(self):
+        '''Returns True if the operation has finished, failed or been cancelled'''
+        return self._event.is_set()
+
+    def cancelled(self):
+        return self._cancelled
+
+    def cancel(self):
+        '''
+        Cancels the operation, killing the geogit process that it is running, if any.
+        Returns False if the operation had already finished
+        '''
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self._cancelled = True
+            processes = list(self._processes)
+            running = self._running
+        for proc in processes:
+            cliconnector.killprocess(proc)
+        if not running:
+            self._finish()
+        return True
+
+    def result(self, timeout = None):
+        '''
+        Waits for the operation to finish and returns its result.
+        Raises the exception raised by the operation if it failed, or a GeoGitException if it was cancelled
+        or it did not finish before the passed timeout (in seconds)
+        '''
+        self._event.wait(timeout)
+        if not self._event.is_set():
+            raise GeoGitException("Operation did not finish in the specified time")
+        if self._cancelled:
+            raise GeoGitException("Operation was cancelled")
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+    def adddonecallback(self, callback):
+        '''Adds a callable to be called with this AsyncResult once the operation finishes'''
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def _start(self):
+        with self._lock:
+            if self._cancelled or self._event.is_set():
+                return False
+            self._running = True
+            return True
+
+    def _addprocess(self, proc):
+        with self._lock:
+            self._processes = [p for p in self._processes if p.poll() is None]
+            self._processes.append(proc)
+            cancelled = self._cancelled
+        if cancelled:
+            cliconnector.killprocess(proc)
+
+    def _finish(self, value = None, error = None):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._value = value
+            self._error = error
+            self._processes = []
+            self._event.set()
+            callbacks = self._callbacks
+            self._callbacks = []
+        for callback in callbacks:
+            callback(self)
+
+
+class AsyncIterator(AsyncResult):
+
+    '''
+    An AsyncResult for operations that produce a sequence of elements.
+    Iterating it yields elements as soon as they are read from the output of geogit
+    '''
+
+    def __init__(self, buffersize = DEFAULT_BUFFER_SIZE):
+        AsyncResult.__init__(self)
+        self._items = Queue.Queue(buffersize)
+
+    def __iter__(self):
+        while True:
+            try:
+                item = self._items.get(True, POLL_INTERVAL)
+            except Queue.Empty:
+                if self._event.is_set() and self._items.empty():
+                    break
+                continue
+            if item is _END:
+                break
+            yield item
+        self.result()
+
+    def _put(self, item):
+        while not self._cancelled:
+            try:
+                self._items.put(item, True, POLL_INTERVAL)
+                return True
+            except Queue.Full:
+                pass
+        return False
+
+    def _drain(self, generator):
+        try:
+            for item in generator:
+                if not self._put(item):
+                    break
+        finally:
+            generator.close()
+        self._put(_END)
+
+
+class AsyncRepository(object):
+
+    '''
+    A non-blocking interface to a repository.
+
+    It has the same methods as the Repository class, but they return an AsyncResult immediately
+    instead of waiting for geogit to finish. Operations are run in a pool of worker threads, so no more
+    than maxconcurrent geogit processes are running at the same time for this repository.
+    Operations that modify the repository are run one at a time.
+    '''
+
+    def __init__(self, repo, connector = None, maxconcurrent = DEFAULT_MAX_CONCURRENT):
+        '''
+        repo: a Repository object, or the url of the repository
+        connector: the connector to use if a url is passed
+        maxconcurrent: the maximum number of operations to run at the same time
+        '''
+        self.repo = repo if isinstance(repo, Repository) else Repository(repo, connector)
+        self.maxconcurrent = maxconcurrent
+        self._queue = Queue.Queue()
+        self._workers = []
+        self._workerslock = threading.Lock()
+        self._writelock = threading.Lock()
+
+    @property
+    def url(self):
+        return self.repo.url
+
+    def __getattr__(self, name):
+        if name not in READ_METHODS and name not in WRITE_METHODS:
+            raise AttributeError(name)
+        method = getattr(self.repo, name)
+        write = name in WRITE_METHODS
+        def submit(*args, **kwargs):
+            return self._submit(AsyncResult(), method, args, kwargs, write)
+        submit.__name__ = name
+        submit.__doc__ = method.__doc__
+        return submit
+
+    def iterlog(self, ref = None, path = None, buffersize = DEFAULT_BUFFER_SIZE):
+        '''Returns an AsyncIterator that yields the commits in the history of the passed ref as they are read'''
+        result = AsyncIterator(buffersize)
+        return self._submit(result, lambda: result._drain(self.repo.iterlog(ref, path)), (), {}, False)
+
+    def close(self):
+        '''Stops the worker threads once the operations already submitted have finished'''
+        with self._workerslock:
+            for worker in self._workers:
+                self._queue.put(None)
+            self._workers = []
+
+    def _submit(self, result, func, args, kwargs, write):
+        self._queue.put((result, func, args, kwargs, write))
+        with self._workerslock:
+            if len(self._workers) < self.maxconcurrent:
+                worker = threading.Thread(target = self._work)
+                worker.daemon = True
+                self._workers.append(worker)
+                worker.start()
+        return result
+
+    def _work(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            result, func, args, kwargs, write = task
+            if not result._start():
+                continue
+            cliconnector.setprocesslistener(result._addprocess)
+            try:
+                if write:
+                    with self._writelock:
+                        value = func(*args, **kwargs)
+                else:
+                    value = func(*args, **kwargs)
+                result._finish(value)
+            except Exception, e:
+                result._finish(error = e)
+            finally:
+                cliconnector.setprocesslistener(None)
@@ -0,0 +1,60 @@
+'''
+Caches for data that can be reused across calls to a repository.
+
+Geogit objects are immutable and addressed by the SHA-1 of their content, so data keyed by
+an object id is never invalidated, and only has to be evicted to bound memory.
+'''
+
+import threading
+from collections import OrderedDict
+
+#Default maximum number of entries in the cache of each repository
+DEFAULT_SIZE = 10000
+
+class LRUCache(object):
+
+    '''A thread-safe dict-like cache that keeps up to maxsize entries, evicting the least recently used ones'''
+
+    def __init__(self, maxsize = DEFAULT_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default = None):
+        with self._lock:
+            try:
+                value = self._entries.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._entries[key] = value
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last = False)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def discard(self, match):
+        '''Removes the entries whose keys the passed function returns True for. Returns the number of entries removed'''
+        with self._lock:
+            keys = [key for key in self._entries if match(key)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
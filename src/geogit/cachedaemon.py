@@ -0,0 +1,289 @@
+'''
+A cache of parsed repository objects shared by all the processes of a machine, served by a daemon
+over a Unix socket.
+
+Feature data and commits are immutable and keyed by their ids, so once a process has retrieved and
+parsed them, any other process working with the same repositories can reuse them. Values are pickled
+by the clients and stored by the daemon as they are received, up to a total size, evicting the least
+recently used ones. The daemon does not need geogit or any of the libraries used to parse values.
+
+Start the daemon with:
+
+    $ python -m geogit.cachedaemon --maxsize 512
+
+and set a client as the shared cache of the repositories in each process:
+
+    >>> Repository.sharedcache = CacheClient()
+
+Values are unpickled by the clients, so the daemon and its clients must belong to the same user. The
+default socket is in a folder of the temp folder that only its user can access, the socket itself is
+only accessible by the user that started the daemon, and clients do not connect to sockets owned by
+other users. If the daemon is not running, clients behave as an empty cache, and try to connect again
+after RETRY_INTERVAL seconds.
+'''
+
+import os
+import time
+import socket
+import struct
+import logging
+import argparse
+import threading
+import SocketServer
+import cPickle as pickle
+from collections import OrderedDict
+from userfolder import USER_FOLDER, makeuserfolder
+
+logger = logging.getLogger("geogit")
+
+DEFAULT_SOCKET = os.path.join(USER_FOLDER, "cache.sock")
+
+#Default maximum total size of the values stored by the daemon, in bytes
+DEFAULT_MAXSIZE = 512 * 1024 * 1024
+
+#Seconds that a client waits before trying to connect again to a daemon that was not reachable
+RETRY_INTERVAL = 10
+
+#Seconds that a client waits for a response before considering the daemon unreachable
+TIMEOUT = 5
+
+OP_GET = "get"
+OP_PUT = "put"
+OP_STATS = "stats"
+OP_CLEAR = "clear"
+
+_LENGTH = struct.Struct("<I")
+
+
+def _send(sock, obj):
+    data = pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+    sock.sendall(_LENGTH.pack(len(data)) + data)
+
+def _recvall(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1024 * 1024))
+        if not chunk:
+            raise EOFError("Connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return "".join(chunks)
+
+def _receive(sock):
+    return pickle.loads(_recvall(sock, _LENGTH.unpack(_recvall(sock, _LENGTH.size))[0]))
+
+
+class ByteStore(object):
+
+    '''A thread-safe LRU store of strings, up to a total size in bytes'''
+
+    def __init__(self, maxsize = DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, keys):
+        '''Returns a list with the values of the passed keys, with None for the ones that are not in the store'''
+        values = []
+        with self._lock:
+            for key in keys:
+                value = self._entries.pop(key, None)
+                if value is None:
+                    self.misses += 1
+                else:
+                    self._entries[key] = value
+                    self.hits += 1
+                values.append(value)
+        return values
+
+    def put(self, items):
+        with self._lock:
+            for key, value in items:
+                old = self._entries.pop(key, None)
+                if old is not None:
+                    self.size -= len(old)
+                if len(value) > self.maxsize:
+                    continue
+                self._entries[key] = value
+                self.size += len(value)
+            while self.size > self.maxsize:
+                key, value = self._entries.popitem(last = False)
+                self.size -= len(value)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "size": self.size, "maxsize": self.maxsize,
+                    "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+class _Handler(SocketServer.BaseRequestHandler):
+
+    def handle(self):
+        store = self.server.store
+        while True:
+            try:
+                op, payload = _receive(self.request)
+            except (EOFError, socket.error):
+                return
+            except (pickle.UnpicklingError, ValueError, TypeError), e:
+                logger.warning("Closing connection with a client that sent an invalid request: %s" % e)
+                return
+            if op == OP_GET:
+                result = store.get(payload)
+            elif op == OP_PUT:
+                store.put(payload)
+                result = None
+            elif op == OP_STATS:
+                result = store.stats()
+            elif op == OP_CLEAR:
+                store.clear()
+                result = None
+            else:
+                return
+            _send(self.request, result)
+
+
+class CacheServer(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+
+    '''A daemon that serves a ByteStore over a Unix socket, handling each client connection in its own thread'''
+
+    daemon_threads = True
+
+    def __init__(self, path = DEFAULT_SOCKET, maxsize = DEFAULT_MAXSIZE):
+        if path == DEFAULT_SOCKET:
+            makeuserfolder(USER_FOLDER)
+        if os.path.exists(path):
+            os.remove(path)
+        self.store = ByteStore(maxsize)
+        umask = os.umask(0177)
+        try:
+            SocketServer.UnixStreamServer.__init__(self, path, _Handler)
+        finally:
+            os.umask(umask)
+
+    def server_close(self):
+        SocketServer.UnixStreamServer.server_close(self)
+        try:
+            os.remove(self.server_address)
+        except OSError:
+            pass
+
+
+class CacheClient(object):
+
+    '''
+    A client of a cache daemon, with the same get and put methods as an LRUCache.
+    Each thread uses its own connection
+    '''
+
+    def __init__(self, path = DEFAULT_SOCKET):
+        self.path = path
+        self._local = threading.local()
+        self._unavailable = 0
+
+    def _socket(self):
+        sock = getattr(self._local, "socket", None)
+        if sock is None:
+            if time.time() - self._unavailable < RETRY_INTERVAL:
+                return None
+            #values are unpickled, so a socket created by another user is never used
+            try:
+                owner = os.stat(self.path).st_uid
+            except OSError, e:
+                self._failed(e)
+                return None
+            if owner != os.getuid():
+                self._failed("the socket belongs to another user")
+                return None
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(TIMEOUT)
+            try:
+                sock.connect(self.path)
+            except socket.error, e:
+                sock.close()
+                self._failed(e)
+                return None
+            self._local.socket = sock
+            self._unavailable = 0
+        return sock
+
+    def _failed(self, error):
+        if not self._unavailable:
+            logger.warning("Cache daemon at %s is not available: %s" % (self.path, error))
+        self._unavailable = time.time()
+        sock = getattr(self._local, "socket", None)
+        if sock is not None:
+            sock.close()
+            self._local.socket = None
+
+    def _call(self, op, payload = None):
+        sock = self._socket()
+        if sock is None:
+            return None
+        try:
+            _send(sock, (op, payload))
+            return _receive(sock)
+        except (EOFError, socket.error, pickle.UnpicklingError), e:
+            self._failed(e)
+            return None
+
+    def getmany(self, keys):
+        '''Returns a list with the values of the passed keys, with None for the ones that are not in the cache'''
+        keys = list(keys)
+        values = self._call(OP_GET, keys)
+        if values is None:
+            return [None] * len(keys)
+        return [pickle.loads(v) if v is not None else None for v in values]
+
+    def get(self, key, default = None):
+        value = self.getmany([key])[0]
+        return default if value is None else value
+
+    def putmany(self, items):
+        '''Stores a list of (key, value) tuples'''
+        self._call(OP_PUT, [(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL)) for key, value in items])
+
+    def put(self, key, value):
+        self.putmany([(key, value)])
+
+    def stats(self):
+        '''Returns a dict with the number of entries, size and hits and misses of the daemon, or None if it is not available'''
+        return self._call(OP_STATS)
+
+    def clear(self):
+        self._call(OP_CLEAR)
+
+    def close(self):
+        sock = getattr(self._local, "socket", None)
+        if sock is not None:
+            sock.close()
+            self._local.socket = None
+
+
+def main(args = None):
+    parser = argparse.ArgumentParser(description = "Cache daemon for geogitpy processes")
+    parser.add_argument("socket", nargs = "?", default = DEFAULT_SOCKET, help = "path of the Unix socket to listen on")
+    parser.add_argument("--maxsize", type = int, default = DEFAULT_MAXSIZE // (1024 * 1024),
+                        help = "maximum size of the cached values, in megabytes")
+    options = parser.parse_args(args)
+    logging.basicConfig(level = logging.INFO)
+    server = CacheServer(options.socket, options.maxsize * 1024 * 1024)
+    logger.info("Cache daemon listening on " + options.socket)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
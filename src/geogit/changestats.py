@@ -0,0 +1,252 @@
+'''
+A persistent index of the changes made by each commit: the number of features added, modified and removed
+under each tree, and the bounding box of all the changed features.
+
+Computing these for a commit takes a diff with its parent, so a history view that shows them for every
+commit would run one diff per row. The index computes them once for each commit and stores them in a file
+in the .geogit folder, so the stats of a whole page of commits come from a single read of that file.
+
+When the index is updated with a ref, the history of the ref is read with a single rev-list command that
+lists the changes of each commit, and only the commits that are not in the index are added to it. Bounding
+boxes are read from the listings of the trees that changed, in the commit for added and modified features
+and in its parent for removed and modified ones.
+
+    >>> index = repo.changestats()
+    >>> for commit in repo.log()[:1000]:
+    ...     stats = index.get(commit.commitid)
+    ...     print stats.added, stats.modified, stats.removed, stats.trees.keys()
+
+Records are only ever appended to the file, so several processes can share it. The file is locked while
+records are appended, and the records added by other processes are read before appending, so they are
+kept. A record that was not completely written is ignored and overwritten by the next update.
+'''
+
+import os
+import struct
+import binascii
+import threading
+try:
+    import fcntl
+except ImportError:
+    #not available on Windows, where the file is not locked
+    fcntl = None
+import geogit
+import cliparser
+from diff import TYPE_ADDED, TYPE_MODIFIED, TYPE_REMOVED
+from geogitexception import GeoGitException
+from status import readref
+
+MAGIC = "GGSTAT01"
+
+INDEX_FILE = os.path.join(".geogit", "geogitpy", "changestats.idx")
+
+#commit id, bounding box of the changes, number of trees
+_RECORD = struct.Struct("<20s4dI")
+#length of the path of a tree, followed by the path and its counts of added, modified and removed features
+_PATH = struct.Struct("<H")
+_COUNTS = struct.Struct("<III")
+
+_NO_BBOX = (float("inf"), float("inf"), float("-inf"), float("-inf"))
+
+
+class ChangeStats(object):
+
+    '''The changes made by a commit, compared to its first parent'''
+
+    __slots__ = ["commitid", "trees", "bbox"]
+
+    def __init__(self, commitid, trees, bbox):
+        '''
+        trees: a dict with (added, modified, removed) tuples, keyed by the path of the tree that contains the features
+        bbox: the bounding box of the changed features as a (minx, miny, maxx, maxy) tuple, or None if it is not known
+        '''
+        self.commitid = commitid
+        self.trees = trees
+        self.bbox = bbox
+
+    @property
+    def added(self):
+        return sum(counts[0] for counts in self.trees.itervalues())
+
+    @property
+    def modified(self):
+        return sum(counts[1] for counts in self.trees.itervalues())
+
+    @property
+    def removed(self):
+        return sum(counts[2] for counts in self.trees.itervalues())
+
+    def __str__(self):
+        return "%d added / %d modified / %d removed in %s" % (self.added, self.modified, self.removed,
+                                                             ", ".join(sorted(self.trees)))
+
+
+def _tree(path):
+    return path.rpartition("/")[0]
+
+def _union(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+def _bboxes(repo, ref, tree):
+    try:
+        listing = repo.children(ref, tree or None)
+    except GeoGitException:
+        return {}
+    return dict((listing.path(i), listing.bbox(i)) for i in xrange(len(listing)))
+
+def compute(repo, commit, diffs):
+    '''Returns the ChangeStats of a commit, given the list of DiffEntry objects with its changes'''
+    trees = {}
+    changed = {}
+    for d in diffs:
+        tree = _tree(d.path)
+        counts = trees.setdefault(tree, [0, 0, 0])
+        changetype = d.type()
+        counts[[TYPE_ADDED, TYPE_MODIFIED, TYPE_REMOVED].index(changetype)] += 1
+        changed.setdefault(tree, []).append((d.path, changetype))
+    bbox = None
+    for tree, entries in changed.iteritems():
+        if any(changetype != TYPE_REMOVED for path, changetype in entries):
+            new = _bboxes(repo, commit.commitid, tree)
+            for path, changetype in entries:
+                if changetype != TYPE_REMOVED:
+                    bbox = _union(bbox, new.get(path))
+        if commit.parent and any(changetype != TYPE_ADDED for path, changetype in entries):
+            old = _bboxes(repo, commit.parent, tree)
+            for path, changetype in entries:
+                if changetype != TYPE_ADDED:
+                    bbox = _union(bbox, old.get(path))
+    return ChangeStats(commit.commitid, dict((tree, tuple(counts)) for tree, counts in trees.iteritems()), bbox)
+
+
+def _pack(stats):
+    parts = [_RECORD.pack(binascii.unhexlify(stats.commitid), *((stats.bbox or _NO_BBOX) + (len(stats.trees),)))]
+    for tree, counts in sorted(stats.trees.iteritems()):
+        path = tree.encode("utf-8")
+        parts.append(_PATH.pack(len(path)) + path + _COUNTS.pack(*counts))
+    return "".join(parts)
+
+def _unpack(data, offset):
+    '''Returns a ChangeStats and the offset of the next record, or None and the same offset if the record is not complete'''
+    if offset + _RECORD.size > len(data):
+        return None, offset
+    commitid, minx, miny, maxx, maxy, count = _RECORD.unpack_from(data, offset)
+    position = offset + _RECORD.size
+    trees = {}
+    for i in xrange(count):
+        if position + _PATH.size > len(data):
+            return None, offset
+        length = _PATH.unpack_from(data, position)[0]
+        position += _PATH.size
+        if position + length + _COUNTS.size > len(data):
+            return None, offset
+        path = data[position:position + length].decode("utf-8")
+        trees[path] = _COUNTS.unpack_from(data, position + length)
+        position += length + _COUNTS.size
+    bbox = None if minx > maxx else (minx, miny, maxx, maxy)
+    return ChangeStats(binascii.hexlify(commitid), trees, bbox), position
+
+
+class ChangeStatsIndex(object):
+
+    def __init__(self, repo):
+        self.repo = repo
+        self.filename = os.path.join(repo.url, INDEX_FILE)
+        self._stats = {}
+        self._offset = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def __len__(self):
+        return len(self._stats)
+
+    def __contains__(self, commitid):
+        return commitid in self._stats
+
+    def _load(self):
+        '''
+        Reads the records added to the file since it was last read, by this or other processes.
+        Returns a set with the ids of the commits read
+        '''
+        loaded = set()
+        try:
+            with open(self.filename, "rb") as f:
+                if self._offset == 0:
+                    if f.read(len(MAGIC)) != MAGIC:
+                        return loaded
+                    self._offset = len(MAGIC)
+                f.seek(self._offset)
+                data = f.read()
+        except IOError:
+            return loaded
+        offset = 0
+        while True:
+            stats, offset = _unpack(data, offset)
+            if stats is None:
+                break
+            self._stats[stats.commitid] = stats
+            loaded.add(stats.commitid)
+        self._offset += offset
+        return loaded
+
+    def _append(self, records):
+        '''Appends a list of (commit id, packed record) tuples, except those already added by other processes'''
+        folder = os.path.dirname(self.filename)
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        with open(self.filename, "ab") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                #records appended by other processes since the last read are read now, so only bytes
+                #after the last complete record are truncated
+                loaded = self._load()
+                f.seek(0, os.SEEK_END)
+                if self._offset == 0:
+                    #a new file, or one that is not an index
+                    f.truncate(0)
+                    f.write(MAGIC)
+                    self._offset = len(MAGIC)
+                elif f.tell() > self._offset:
+                    #a record that was not completely written
+                    f.truncate(self._offset)
+                f.write("".join(record for commitid, record in records if commitid not in loaded))
+                f.flush()
+                self._offset = f.tell()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def get(self, commitid):
+        '''Returns the ChangeStats of the passed commit id, or None if it is not in the index'''
+        return self._stats.get(commitid)
+
+    def update(self, ref = geogit.HEAD):
+        '''Adds the commits in the history of the passed ref that are not in the index. Returns the number of commits added'''
+        tip = readref(self.repo.url, ref) or self.repo.revparse(ref)
+        with self._lock:
+            self._load()
+            if tip in self._stats:
+                return 0
+            #commits are listed by date, so the history is read until all the commits not indexed are found,
+            #which are the ancestors of the tip until the commits already in the index
+            pending = set([tip])
+            records = []
+            lines = self.repo.connector.stream(['rev-list', tip, '--changed'])
+            for commit, diffs in cliparser.parselog(self.repo, lines, True):
+                if commit.commitid in self._stats:
+                    continue
+                stats = compute(self.repo, commit, diffs)
+                self._stats[commit.commitid] = stats
+                records.append((commit.commitid, _pack(stats)))
+                pending.discard(commit.commitid)
+                pending.update(parentid for parentid in commit.parentids if parentid not in self._stats)
+                if not pending:
+                    break
+            if records:
+                self._append(records)
+            return len(records)
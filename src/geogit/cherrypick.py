@@ -0,0 +1,163 @@
+'''
+Cherry-picking of ranges of commits, stopping at the first conflict with a state that can be continued
+or aborted, as a rebase can.
+
+The commits in the range and the paths changed by each of them are read with a single rev-list command.
+Before picking any of them, the paths changed in the current branch since the start of the range are
+read with a single diff, and the commits that change any of those paths are considered to be likely
+conflicts. The pick stops before the first of them, so it can be checked, instead of stopping in the
+middle of a conflicted cherry-pick.
+
+The state of the range is saved in the repository before each commit is picked, so an interrupted or
+stopped range can be continued from another process.
+
+    >>> repo.cherrypickrange("north~200", "north")
+    GeoGitException: Stopped before commit ..., which changes paths also changed in the current branch
+    >>> repo.continuecherrypick()
+'''
+
+import os
+import json
+import geogit
+import cliparser
+from geogitexception import GeoGitException
+from status import readref
+
+STATE_FILE = os.path.join(".geogit", "geogitpy", "cherrypick.json")
+
+
+def _statefile(repo):
+    return os.path.join(repo.url, STATE_FILE)
+
+def readstate(repo):
+    '''Returns the saved state of the range being picked in the passed repository, or None if there is none'''
+    try:
+        with open(_statefile(repo)) as f:
+            return json.load(f)
+    except IOError:
+        return None
+
+def _savestate(repo, state):
+    filename = _statefile(repo)
+    folder = os.path.dirname(filename)
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    tmp = filename + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    if os.path.exists(filename):
+        os.remove(filename)
+    os.rename(tmp, filename)
+
+def _clearstate(repo):
+    try:
+        os.remove(_statefile(repo))
+    except OSError:
+        pass
+
+def _headid(repo):
+    return readref(repo.url, geogit.HEAD) or repo.revparse(geogit.HEAD)
+
+def rangecommits(repo, start, end):
+    '''
+    Returns a list of (Commit, list of changed paths) tuples with the commits that are in the history of end
+    but not in that of start, oldest first. start must be an ancestor of end, and there can be no merges between them
+    '''
+    startid = repo.revparse(start)
+    commits = []
+    for commit, diffs in cliparser.parselog(repo, repo.connector.stream(['rev-list', end, '--changed']), True):
+        if commit.commitid == startid:
+            break
+        if len(commit.parentids) > 1:
+            raise GeoGitException("Cannot cherry-pick merge commit %s in the range %s..%s" % (commit.commitid, start, end))
+        repo.commitgraph.add(commit)
+        commits.append((commit, [d.path for d in diffs]))
+    else:
+        raise GeoGitException("%s is not an ancestor of %s" % (start, end))
+    commits.reverse()
+    return commits
+
+def overlaps(repo, start, commits):
+    '''
+    Returns a dict with the paths changed both in the current branch since start and in each of the passed
+    (Commit, list of changed paths) tuples, keyed by the ids of the commits that have any
+    '''
+    changed = set(d.path for d in repo.diff(start, geogit.HEAD))
+    result = {}
+    for commit, paths in commits:
+        common = sorted(changed.intersection(paths))
+        if common:
+            result[commit.commitid] = common
+    return result
+
+def cherrypickrange(repo, start, end, check = True, progress = None):
+    '''
+    Picks the commits after start and up to end onto the current branch. See Repository.cherrypickrange
+    '''
+    if readstate(repo) is not None:
+        raise GeoGitException("A range of commits is already being cherry-picked. Continue or abort it first")
+    commits = rangecommits(repo, start, end)
+    state = {"orig": _headid(repo), "commits": [commit.commitid for commit, paths in commits], "next": 0,
+             "head": None, "conflicts": overlaps(repo, start, commits) if check else {}}
+    return _run(repo, state, progress)
+
+def _run(repo, state, progress, checknext = True):
+    commits = state["commits"]
+    while state["next"] < len(commits):
+        commitid = commits[state["next"]]
+        paths = state["conflicts"].get(commitid)
+        if paths and checknext:
+            state["head"] = None
+            _savestate(repo, state)
+            raise GeoGitException("Stopped before commit %s, which changes paths also changed in the current branch: %s"
+                                  % (commitid, ", ".join(paths)))
+        checknext = True
+        #the head before the pick is saved, to know whether it was completed if the process is interrupted
+        state["head"] = _headid(repo)
+        _savestate(repo, state)
+        try:
+            repo.connector.cherrypick(commitid)
+        except GeoGitException, e:
+            raise GeoGitException("Conflicts cherry-picking commit %s. Resolve and add them, and continue the range: %s"
+                                  % (commitid, e.message))
+        _picked(repo, state, progress)
+    _clearstate(repo)
+    return len(commits)
+
+def _picked(repo, state, progress):
+    state["next"] += 1
+    state["head"] = None
+    _savestate(repo, state)
+    if progress is not None:
+        progress(state["next"], len(state["commits"]))
+
+def continuecherrypick(repo, progress = None):
+    '''
+    Continues picking the range that was stopped. If the last pick stopped with conflicts, they must be resolved
+    and added, and the staged changes are committed with the message of the commit being picked
+    '''
+    state = readstate(repo)
+    if state is None:
+        raise GeoGitException("No range of commits is being cherry-picked")
+    #the commit where the range stopped is picked without checking it again, unless it was already picked
+    checknext = False
+    if state["head"] is not None:
+        commitid = state["commits"][state["next"]]
+        if _headid(repo) != state["head"]:
+            _picked(repo, state, progress)
+            checknext = True
+        elif repo.conflicts():
+            raise GeoGitException("Conflicts cherry-picking commit %s have not been resolved" % commitid)
+        elif repo.staged():
+            repo.commit(repo.commitgraph.get(commitid).message)
+            _picked(repo, state, progress)
+            checknext = True
+    return _run(repo, state, progress, checknext)
+
+def abortcherrypick(repo):
+    '''Resets the current branch to where it was before the range was picked, discarding the changes'''
+    state = readstate(repo)
+    if state is None:
+        raise GeoGitException("No range of commits is being cherry-picked")
+    repo.reset(state["orig"], geogit.RESET_MODE_HARD)
+    _clearstate(repo)
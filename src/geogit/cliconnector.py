@@ -1,30 +1,123 @@
 import subprocess
 import os
 import tempfile
+import threading
+import collections
+import signal
+import time
 import geogit
-from feature import Feature
-from tree import Tree
-from commit import Commit
-import datetime
-from diff import Diffentry
+from listing import Listing, TYPE_FEATURE, TYPE_TREE
 from commitish import Commitish
 from geogitexception import GeoGitException
-from shapely.wkt import loads
+from instrumentation import instrumented, logger
+import instrumentation
+import cliparser
 
-def _run(command):         
-                                                                                                            
+#Number of trailing output lines kept to build the message of a failed command
+ERROR_CONTEXT_LINES = 200
+
+#Maximum number of paths passed to a single add command. It bounds the memory that geogit uses for them
+MAX_PATHS_PER_COMMAND = 1000
+
+#Maximum total length of the paths passed to a single command. cmd.exe has a much lower limit than exec
+MAX_COMMAND_LENGTH = 7000 if os.name == 'nt' else 100000
+
+_local = threading.local()
+
+def setprocesslistener(listener):
+    '''
+    Sets a callable that will be called with each geogit process started from the current thread,
+    right after it is started. Pass None to remove it.
+    This is used to be able to kill the process of an operation that has been cancelled
+    '''
+    _local.processlistener = listener
+
+def _popen(command, cwd = None):
     command = ['geogit'] + command
-    print " ".join(command)
-    output = []    
-    proc = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, 
-                            stdin=subprocess.PIPE,stderr=subprocess.STDOUT, universal_newlines=True)
-    for line in iter(proc.stdout.readline, ""):        
-        line = line.strip("\n")
-        output.append(line)        
-    returncode = proc.returncode    
-    if returncode:
-        raise GeoGitException("\n".join(output))       
-    return output
+    logger.debug(" ".join(command))
+    if os.name == 'nt':
+        proc = subprocess.Popen(command, cwd = cwd, shell = True, stdout=subprocess.PIPE,
+                                stdin=subprocess.PIPE,stderr=subprocess.STDOUT, universal_newlines=True)
+    else:
+        #geogit is a launcher script, so it runs in its own process group to be able to kill the JVM with it
+        proc = subprocess.Popen(command, cwd = cwd, preexec_fn = os.setsid, stdout=subprocess.PIPE,
+                                stdin=subprocess.PIPE,stderr=subprocess.STDOUT, universal_newlines=True)
+    listener = getattr(_local, 'processlistener', None)
+    if listener is not None:
+        listener(proc)
+    return proc
+
+def batches(args, maxcount = MAX_PATHS_PER_COMMAND, maxlength = MAX_COMMAND_LENGTH):
+    '''
+    Splits a list of command arguments into lists of at most maxcount arguments and maxlength characters,
+    so they can be passed to several commands. An argument longer than maxlength gets a list of its own
+    '''
+    batch = []
+    length = 0
+    for arg in args:
+        if batch and (len(batch) == maxcount or length + len(arg) + 1 > maxlength):
+            yield batch
+            batch = []
+            length = 0
+        batch.append(arg)
+        length += len(arg) + 1
+    if batch:
+        yield batch
+
+def killprocess(proc):
+    '''Kills a geogit process started by this module, if it is still running'''
+    if proc.poll() is not None:
+        return
+    try:
+        if os.name == 'nt':
+            proc.kill()
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except OSError:
+        pass
+
+def measured(lines, event):
+    '''
+    Yields the passed output lines, adding their size to the passed CommandEvent,
+    along with the time spent by the consumer processing them
+    '''
+    for line in lines:
+        event.lines += 1
+        event.bytes += len(line) + 1
+        yielded = time.time()
+        yield line
+        event.parsetime += time.time() - yielded
+
+def _stream(command, cwd = None):
+    '''
+    Runs a geogit command and yields the lines of its output as they are produced.
+    The process is killed if the generator is closed before the output is exhausted
+    '''
+    event = instrumentation.CommandEvent(command, cwd) if instrumentation.enabled() else None
+    proc = _popen(command, cwd)
+    tail = collections.deque(maxlen = ERROR_CONTEXT_LINES)
+    finished = False
+    try:
+        lines = (line.strip("\n") for line in iter(proc.stdout.readline, ""))
+        if event is not None:
+            lines = measured(lines, event)
+        for line in lines:
+            tail.append(line)
+            yield line
+        finished = True
+    finally:
+        proc.stdout.close()
+        if not finished:
+            killprocess(proc)
+        proc.wait()
+        if event is not None:
+            event.finish(proc.returncode)
+            instrumentation.record(event)
+    if proc.returncode:
+        raise GeoGitException("\n".join(tail))
+
+def _run(command, cwd = None):
+    return list(_stream(command, cwd))
     
 class CLIConnector():
     ''' A connector that calls the CLI version of geogit and parses CLI output'''
@@ -38,9 +131,13 @@ class CLIConnector():
         _run(commands)        
                 
     def run(self, command):   
-        os.chdir(self.repo.url)
-        return _run(command)  
+        return _run(command, self.repo.url)
 
+    def stream(self, command):
+        '''Like run, but returns a generator that yields output lines as they are produced'''
+        return _stream(command, self.repo.url)
+
+    @instrumented
     def revparse(self, rev):
         commands = ['rev-parse', rev]
         output = self.run(commands)
@@ -77,8 +174,9 @@ class CLIConnector():
             raise GeoGitException("Not a valid GeoGit repository: " + self.repo.url)
         
     
+    @instrumented
     def children(self, ref = 'HEAD', path = None, recursive = False):
-        children = []    
+        children = Listing(self.repo, ref)
         if path is None:
             fullref = ref
         else:
@@ -86,91 +184,25 @@ class CLIConnector():
         commands = ['ls-tree', fullref, "-v"]
         if recursive:
             commands.append("-r")
-        output = self.run(commands)    
-        for line in output:
+        for line in self.stream(commands):
             if line != '':                
                 tokens = line.split(" ")
+                bbox = cliparser.parsebbox(tokens[4:]) if len(tokens) > 4 else None
                 if tokens[1] == "feature":
-                    children.append(Feature(self.repo, ref, tokens[3]))
+                    children.add(TYPE_FEATURE, tokens[3], tokens[2], bbox)
                 elif tokens[1] == "tree":
-                    children.append(Tree(self.repo, ref, tokens[3]))
+                    children.add(TYPE_TREE, tokens[3], tokens[2], bbox)
         return children   
     
     def commitFromString(self, lines):                
-        message = False
-        messagetext = None
-        parent = None
-        commitid = None
-        for line in lines:
-            tokens = line.split(' ')
-            if message:
-                if line.startswith("\t") or line.startswith(" "):
-                    messagetext = line.strip() if messagetext is None else messagetext + "\n" + line.strip()
-                else:
-                    message = False            
-            else:                
-                if tokens[0] == 'commit':
-                    commitid = tokens[1]
-                if tokens[0] == 'tree':
-                    tree = tokens[1]                    
-                if tokens[0] == 'parent':
-                    if len(tokens) == 2 and tokens[1] != "":
-                        parent = tokens[1]                    
-                elif tokens[0] == 'author':
-                    author = " ".join(tokens[1:-3])
-                    authordate = datetime.datetime.fromtimestamp(int(tokens[-2])//1000)                
-                elif tokens[0] == 'committer':
-                    committer = tokens[1]
-                    committerdate = datetime.datetime.fromtimestamp(int(tokens[-2])//1000)
-                elif tokens[0] == 'message':
-                    message = True                
-            
-        if commitid is not None:
-            c = Commit(self.repo, commitid, tree, parent, messagetext, author, authordate, committer, committerdate)
-            return c
-        else:
-            return None
+        for commit in cliparser.parselog(self.repo, lines):
+            return commit
+        return None
 
     def logentryFromString(self, lines):
-        diffs = []
-        changes = False
-        message = False
-        messagetext = None
-        parent = None
-        commitid = None
-        for line in lines:
-            tokens = line.split(' ')
-            if message:
-                if line.startswith("\t") or line.startswith(" "):
-                    messagetext = line.strip() if messagetext is None else messagetext + "\n" + line.strip()
-                else:
-                    message = False
-            if changes:                                        
-                diffs.append(self.diffentryFromString(line))             
-            else:                
-                if tokens[0] == 'commit':
-                    commitid = tokens[1]
-                if tokens[0] == 'tree':
-                    tree = tokens[1]                    
-                if tokens[0] == 'parent':
-                    if len(tokens) == 2 and tokens[1] != "":
-                        parent = tokens[1]                    
-                elif tokens[0] == 'author':
-                    author = " ".join(tokens[1:-3])
-                    authordate = datetime.datetime.fromtimestamp(int(tokens[-2])//1000)                
-                elif tokens[0] == 'committer':
-                    committer = tokens[1]
-                    committerdate = datetime.datetime.fromtimestamp(int(tokens[-2])//1000)
-                elif tokens[0] == 'message':
-                    message = True
-                elif tokens[0] == 'changes':
-                    changes = True                
-            
-        if commitid is not None:
-            c = Commit(self.repo, commitid, tree, parent, messagetext, author, authordate, committer, committerdate)
-            return (c, diffs)
-        else:
-            return None
+        for entry in cliparser.parselog(self.repo, lines, True):
+            return entry
+        return None
 
     def addremote(self, name, url):
         commands = ["remote", "add", name, url]
@@ -180,6 +212,7 @@ class CLIConnector():
         commands = ["remote", "remove", name]
         self.run(commands)     
         
+    @instrumented
     def remotes(self):
         commands = ["remote", "list", "-v"]
         output = self.run(commands)
@@ -192,28 +225,18 @@ class CLIConnector():
                 names.append(tokens[0])
         return remotes        
         
+    @instrumented
     def log(self, ref, path = None):
-        commits = []
+        return list(self.iterlog(ref, path))
+
+    def iterlog(self, ref, path = None):
+        '''Returns a generator that yields commits as they are read from the output of geogit'''
         commands = ['rev-list', ref, '--changed']        
         if path is not None:
             commands.extend(["-p", path])
-        output = self.run(commands)
-        commitlines = []
-        for line in output:
-            if line == '':
-                commit = self.commitFromString(commitlines)
-                if commit is not None:
-                    commits.append(commit)
-                    commitlines = []
-            else:
-                commitlines.append(line)            
-            
-        if commitlines:
-            commit = self.commitFromString(commitlines)
-            if commit is not None:
-                commits.append(commit)
-        return commits 
+        return cliparser.parselog(self.repo, self.stream(commands))
     
+    @instrumented
     def conflicts(self):
         commands = ["conflicts", "--refspecs-only"]
         lines = self.run(commands)
@@ -236,6 +259,7 @@ class CLIConnector():
     def reset(self, ref, mode = 'hard'):
         self.run(['reset', ref, "--" + mode])                    
         
+    @instrumented
     def branches(self):    
         branches = []        
         output = self.run(['show-ref'])    
@@ -245,6 +269,7 @@ class CLIConnector():
                 branches.append((tokens[1][len("refs/heads/"):], tokens[0]))
         return branches
     
+    @instrumented
     def tags(self):
         tags = []
         output = self.run(['show-ref'])    
@@ -273,10 +298,16 @@ class CLIConnector():
         self.run(['tag', '-d', name])        
 
        
-    def add(self, paths = []):
-        commands = ['add']  
-        commands.extend(paths)      
-        self.run(commands)     
+    def add(self, paths = [], progress = None):
+        if not paths:
+            self.run(['add'])
+            return
+        added = 0
+        for batch in batches(paths):
+            self.run(['add'] + batch)
+            added += len(batch)
+            if progress is not None:
+                progress(added, len(paths))
             
     def commit(self, message, paths = []):
         commands = ['commit', '-m']
@@ -285,13 +316,10 @@ class CLIConnector():
         self.run(commands)               
              
     def diffentryFromString(self,line):
-        tokens = line.strip().split(" ")
-        path = tokens[0]
-        oldref = tokens[1]
-        newref = tokens[2]
-        return Diffentry(self.repo, oldref, newref, path) 
+        return cliparser.parsediffentry(self.repo, line)
     
     
+    @instrumented
     def diff(self, ref, refb):    
         diffs = []
         output = self.run(['diff-tree', ref, refb])    
@@ -327,9 +355,19 @@ class CLIConnector():
         self.run(["sl", "export", ref, "exported", "--database", database])
         
     def featuredata(self, ref, path):  
+        return self.identifiedfeaturedata(ref, path)[1]
+
+    @instrumented
+    def identifiedfeaturedata(self, ref, path):
+        '''
+        Returns a tuple with the object id of a feature and its attributes.
+        If the feature does not exist, it returns (None, {})
+        '''
         refandpath = ref + ":" + path      
-        output = self.run(["show", "--raw", refandpath])           
-        return self.parseattribs(output[2:]) 
+        output = self.run(["show", "--raw", refandpath])
+        for ref, objectid, attributes in cliparser.parsefeatures(output):
+            return objectid, attributes
+        return None, {}
 
     def cat(self, reference):
         return self.run(["cat", reference])
@@ -338,62 +376,30 @@ class CLIConnector():
         pass
         
     def parseattribs(self, lines):
-        attributes = {}
-        iterator = iter(lines)
-        while True:
-            try:
-                name = iterator.next()
-                attribtype = iterator.next()
-                value = iterator.next()
-                value = self.valuefromstring(value, attribtype)
-                attributes[name] = (value, attribtype)
-            except StopIteration:
-                return attributes 
+        return cliparser.parseattributes(lines)
         
     def valuefromstring(self, value, valuetype):
-        if valuetype == "BOOLEAN":
-            return str(value).lower() == "true"
-        elif valuetype in ["BYTE","SHORT","INTEGER","LONG"]:
-            return int(value)
-        elif valuetype in ["FLOAT","DOUBLE"]:
-            return float(value)
-        elif valuetype in ["POINT","LINESTRING","POLYGON","MULTIPOINT","MULTILINESTRING","MULTIPOLYGON"]:            
-            try:
-                geom = loads(value)
-                return geom
-            except:
-                return value            
-        else:
-            return value
+        return cliparser.valuefromstring(value, valuetype)
 
+    @instrumented
     def featuresdata(self, refs):
+        '''Returns a dict with the attributes of the passed features, keyed by the ref in their description'''
         features = {}
         commands = ["show", "--raw"]
         commands.extend(refs);
-        output = self.run(commands)        
-        iterator = iter(output)
-        lines = []    
-        name = None    
-        while True:
-            try:
-                line = iterator.next()
-                if line == "":                
-                    features[name] = self.parseattribs(lines)   
-                    lines = []
-                    name = None 
-                else:
-                    if name is None:
-                        name = line
-                        iterator.next() #consume id line
-                    else: 
-                        lines.append(line)   
-            except StopIteration:
-                break
-        if lines:
-            features[name] = self.parseattribs(lines)     
+        for ref, objectid, attributes in cliparser.parsefeatures(self.stream(commands)):
+            features[ref] = attributes
         return features
 
+    def iterfeaturesdata(self, refs):
+        '''Returns a generator that yields the attributes of the passed features, in the same order'''
+        commands = ["show", "--raw"]
+        commands.extend(refs)
+        for ref, objectid, attributes in cliparser.parsefeatures(self.stream(commands)):
+            yield attributes
+
     
+    @instrumented
     def featurediff(self, ref, ref2, path):
         diffs = {}
         output = self.run(["diff-tree", ref, ref2, "--", path, "--describe"])
@@ -420,6 +426,7 @@ class CLIConnector():
             except StopIteration:
                 return diffs    
             
+    @instrumented
     def blame(self, path):
         attributes = {}
         output = self.run(["blame", path, "--porcelain"])        
@@ -449,10 +456,10 @@ class CLIConnector():
         pass
     
     def continuerebase(self):
-        pass
+        self.run(["rebase", "--continue"])
     
     def abortrebase(self):
-        pass
+        self.run(["rebase", "--abort"])
     
     def abortmerge(self):
         pass
@@ -461,6 +468,7 @@ class CLIConnector():
         commands = ["cherry-pick", commitish]
         self.run(commands)
         
+    @instrumented
     def show(self, ref):
         commands = ["show", ref]
         return "\n".join(self.run(commands))
@@ -474,6 +482,7 @@ class CLIConnector():
         self.applypatch(patchfile)
         os.remove(patchfile) 
 
+    @instrumented
     def createpatchfile(self, path, attributes):               
         f = tempfile.NamedTemporaryFile(delete = False)         
         output = self.run(["show", "--raw", geogit.WORK_HEAD + ":" + path])
@@ -0,0 +1,160 @@
+'''
+Parsers for the output of the geogit commands that produce large amounts of text.
+
+Parsers work in a single pass over an iterable of lines, so they can consume the output
+of a command as it is produced, without keeping it in memory.
+'''
+
+from geogit.commit import Commit
+from geogit.diff import Diffentry
+
+def parsediffentry(repo, line):
+    '''Parses a line in the form "path oldid newid"'''
+    path, oldref, newref = line.strip().split(" ")[:3]
+    return Diffentry(repo, oldref, newref, path)
+
+def parselog(repo, lines, changes = False):
+    '''
+    Parses the output of rev-list, yielding a Commit object for each commit.
+    If changes is True, it yields tuples of (Commit, list of Diffentry) instead, with the changes listed
+    after each commit, if any.
+
+    This runs once for each line of outputs that can have millions of them, so each commit is read
+    with an inner loop over the same iterator, and dates are converted only when they are used.
+    '''
+    iterator = iter(lines)
+    line = next(iterator, None)
+    while line is not None:
+        if not line.startswith("commit "):
+            line = next(iterator, None)
+            continue
+        commitid = line[7:]
+        tree = author = authortime = committer = committertime = None
+        parents = []
+        message = []
+        diffs = []
+        for line in iterator:
+            if not line:
+                break
+            first = line[0]
+            if first == "\t" or first == " ":
+                message.append(line.strip())
+                continue
+            keyword, _, value = line.partition(" ")
+            if keyword == "tree":
+                tree = value
+            elif keyword == "parent":
+                if value:
+                    parents.append(value)
+            elif keyword == "author":
+                tokens = value.rsplit(" ", 3)
+                author = tokens[0]
+                authortime = tokens[2]
+            elif keyword == "committer":
+                tokens = value.rsplit(" ", 3)
+                committer = tokens[0].partition(" ")[0]
+                committertime = tokens[2]
+            elif keyword == "commit":
+                break
+            elif keyword == "changes" and changes:
+                line = None
+                for line in iterator:
+                    if not line:
+                        break
+                    diffs.append(parsediffentry(repo, line))
+                break
+        else:
+            line = None
+        commit = Commit(repo, commitid, tree, parents[0] if parents else None, "\n".join(message) if message else None,
+                        author, authortime, committer, committertime, parents)
+        yield (commit, diffs) if changes else commit
+        if not line or not line.startswith("commit "):
+            line = next(iterator, None)
+
+def parsebbox(tokens):
+    '''
+    Parses a bounding box from the tokens that follow the path in a line of ls-tree -v, if there are any.
+    Coordinates can be separated by spaces, commas or semicolons, in minx, miny, maxx, maxy order.
+    Returns a tuple of 4 floats, or None if the tokens do not describe a bounding box
+    '''
+    values = " ".join(tokens).replace(",", " ").replace(";", " ").split()
+    if len(values) != 4:
+        return None
+    try:
+        return tuple(float(v) for v in values)
+    except ValueError:
+        return None
+
+
+def _boolean(value):
+    return value.lower() == "true"
+
+_loads = None
+
+def _geometry(value):
+    #Shapely takes longer to import than the rest of the library, so it is only imported once a geometry is read
+    global _loads
+    if _loads is None:
+        from shapely.wkt import loads as _loads
+    try:
+        return _loads(value)
+    except:
+        return value
+
+_GEOMETRY_TYPES = ["POINT", "LINESTRING", "POLYGON", "MULTIPOINT", "MULTILINESTRING", "MULTIPOLYGON"]
+
+#Functions to convert attribute values to Python objects, by attribute type name.
+#Values of types not in this dict are kept as strings
+CONVERTERS = {"BOOLEAN": _boolean, "BYTE": int, "SHORT": int, "INTEGER": int, "LONG": int,
+              "FLOAT": float, "DOUBLE": float}
+CONVERTERS.update((t, _geometry) for t in _GEOMETRY_TYPES)
+
+def valuefromstring(value, valuetype):
+    '''Converts the string representation of an attribute value to the corresponding Python object'''
+    converter = CONVERTERS.get(valuetype)
+    if converter is None:
+        return value
+    try:
+        return converter(value)
+    except ValueError:
+        return value
+
+def parseattributes(lines):
+    '''
+    Parses attributes described in groups of 3 lines (name, type and value), until the lines
+    are exhausted or an empty line is found.
+    Returns a dict with attribute names as keys and (value, type) tuples as values
+    '''
+    converters = CONVERTERS
+    attributes = {}
+    iterator = iter(lines)
+    for name in iterator:
+        if not name:
+            break
+        valuetype = next(iterator, None)
+        value = next(iterator, None)
+        if value is None:
+            break
+        converter = converters.get(valuetype)
+        if converter is not None:
+            try:
+                value = converter(value)
+            except ValueError:
+                pass
+        attributes[name] = (value, valuetype)
+    return attributes
+
+def parsefeatures(lines):
+    '''
+    Parses the output of show --raw for one or more features, separated by empty lines.
+    Yields a tuple of (ref, object id, attributes) for each feature, from the two header lines of its
+    description, attributes being a dict as returned by parseattributes
+    '''
+    iterator = iter(lines)
+    for ref in iterator:
+        if not ref:
+            continue
+        objectid = next(iterator, None)
+        if objectid is None:
+            return
+        yield ref, objectid, parseattributes(iterator)
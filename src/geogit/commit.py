@@ -1,21 +1,67 @@
+import datetime
+import time
 from geogit.commitish import Commitish
 
+def _millis(date):
+    if date is None:
+        return None
+    if isinstance(date, datetime.datetime):
+        return int(time.mktime(date.timetuple())) * 1000
+    return int(date)
+
 class Commit(Commitish):
     
     ''' A geogit commit'''
+
+    __slots__ = ["commitid", "treeid", "parent", "parentids", "message", "authorname", "_authordate",
+                 "commitername", "_commiterdate"]
     
-    def __init__(self, repo, commitid, treeid, parent, message, authorname, authordate, commitername, commiterdate):
+    def __init__(self, repo, commitid, treeid, parent, message, authorname, authordate, commitername, commiterdate,
+                 parentids = None):
+        '''
+        Dates can be passed as datetime objects or as timestamps in milliseconds (numbers or strings, as geogit
+        outputs them). Timestamps are converted to datetime objects the first time they are used.
+        parent is the id of the first parent, and parentids the ids of all of them, for merge commits
+        '''
         self.ref = commitid
         self.repo = repo
+        self._diff = None
         self.commitid = commitid
         self.treeid = treeid
         self.parent = parent
+        if parentids is None:
+            parentids = [parent] if parent else []
+        self.parentids = parentids
         self.message = message
         self.authorname = authorname
-        self.authordate = authordate
+        self._authordate = authordate
         self.commitername = commitername
-        self.commiterdate = commiterdate
+        self._commiterdate = commiterdate
+
+    def commit(self):
+        return self
+
+    @property
+    def authordate(self):
+        if self._authordate is not None and not isinstance(self._authordate, datetime.datetime):
+            self._authordate = datetime.datetime.fromtimestamp(int(self._authordate) // 1000)
+        return self._authordate
+
+    @property
+    def authortimestamp(self):
+        '''The author date, in milliseconds since the epoch, as geogit outputs it'''
+        return _millis(self._authordate)
+
+    @property
+    def commitertimestamp(self):
+        '''The committer date, in milliseconds since the epoch, as geogit outputs it'''
+        return _millis(self._commiterdate)
 
+    @property
+    def commiterdate(self):
+        if self._commiterdate is not None and not isinstance(self._commiterdate, datetime.datetime):
+            self._commiterdate = datetime.datetime.fromtimestamp(int(self._commiterdate) // 1000)
+        return self._commiterdate
     
     def __str__(self):
         s = "id " + self.commitid + "\n"
@@ -0,0 +1,90 @@
+'''
+A cache of the commits of a repository, to navigate its history by commit id.
+
+Commits never change, so once read they are kept, indexed by id. When a commit that is not in the
+graph is requested, a page of its history is read with a single rev-list command, so walking back
+through the parents of a commit runs one command for every PAGE_SIZE commits, instead of resolving
+a longer ref~1~1... expression for each of them. Commits read are also added to the shared cache of
+the repository, if it has one, so other processes can get them from there.
+'''
+
+import threading
+import cliparser
+from commit import Commit
+from geogitexception import GeoGitException
+
+#Number of commits read by each rev-list command when a commit is not in the graph
+PAGE_SIZE = 1000
+
+
+class CommitGraph(object):
+
+    def __init__(self, repo, pagesize = PAGE_SIZE):
+        self.repo = repo
+        self.pagesize = pagesize
+        self._commits = {}
+        self._lock = threading.Lock()
+        self.pages = 0
+
+    def __len__(self):
+        return len(self._commits)
+
+    def __contains__(self, commitid):
+        return commitid in self._commits
+
+    def add(self, commit):
+        '''Adds a Commit object to the graph'''
+        with self._lock:
+            self._commits.setdefault(commit.commitid, commit)
+
+    def get(self, commitid):
+        '''
+        Returns the Commit object with the passed id, reading it and its recent history if needed.
+        If the repository has a shared cache, commits are looked up there before running geogit
+        '''
+        commit = self._commits.get(commitid)
+        if commit is None:
+            commit = self._fromshared(commitid)
+            if commit is not None:
+                self.add(commit)
+                return commit
+            self._load(commitid)
+            commit = self._commits.get(commitid)
+            if commit is None:
+                raise GeoGitException("Commit not found: " + commitid)
+        return commit
+
+    def _load(self, commitid):
+        lines = self.repo.connector.stream(['rev-list', commitid, '-n', str(self.pagesize)])
+        commits = list(cliparser.parselog(self.repo, lines))
+        with self._lock:
+            for commit in commits:
+                self._commits.setdefault(commit.commitid, commit)
+            self.pages += 1
+        shared = self._sharedcache()
+        if shared is not None:
+            shared.putmany((("commit", c.commitid), (c.commitid, c.treeid, c.parent, c.message, c.authorname,
+                            c.authortimestamp, c.commitername, c.commitertimestamp, c.parentids)) for c in commits)
+
+    def _sharedcache(self):
+        return self.repo.sharedcache if self.repo.usecache else None
+
+    def _fromshared(self, commitid):
+        shared = self._sharedcache()
+        fields = shared.get(("commit", commitid)) if shared is not None else None
+        return Commit(self.repo, *fields) if fields is not None else None
+
+    def parents(self, commitid):
+        '''Returns a list with the Commit objects of the parents of the passed commit'''
+        return [self.get(parentid) for parentid in self.get(commitid).parentids]
+
+    def firstparents(self, commitid):
+        '''Yields the passed commit and its ancestors following only the first parent of each commit'''
+        commit = self.get(commitid)
+        while commit is not None:
+            yield commit
+            commit = self.get(commit.parent) if commit.parent else None
+
+    def clear(self):
+        with self._lock:
+            self._commits.clear()
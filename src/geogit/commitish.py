@@ -1,16 +1,31 @@
 from geogit.tree import Tree
+from geogit.geogitexception import GeoGitException
 
 class Commitish(object):
     
     '''A reference that can be resolved to a commit.
     This does not store the information of the commit, but it is supposed to serve to perform actual work
     on that snapshot, like retrieving trees and feature for the version it represents'''
+
+    __slots__ = ["ref", "repo", "_diff", "_commitid"]
     
     def __init__(self, repo, ref):
         self.ref = ref
         self.repo = repo
         self._diff = None
+        self._commitid = None
+
+    @property
+    def commitid(self):
+        '''The id of the commit this reference points to. It is resolved only the first time it is used'''
+        if self._commitid is None:
+            self._commitid = self.repo.revparse(self.ref)
+        return self._commitid
     
+    def commit(self):
+        '''Returns the Commit object for this reference'''
+        return self.repo.commitgraph.get(self.commitid)
+
     def log(self):
         '''Return the history up to this Commitish'''
         return self.repo.log(self.ref)
@@ -24,14 +39,33 @@ class Commitish(object):
         self.repo.checkout(self.ref)
         
     def diff(self):
-        '''Returns a list of DiffEntry with all changes introduced by this commitish'''
+        '''Returns a list of DiffEntry with all changes introduced by this commitish, compared to its first parent'''
         if self._diff is None:
-            self._diff = self.repo.diff(self.ref, self.ref + '~1')
+            parentids = self.commit().parentids
+            if not parentids:
+                raise GeoGitException("%s has no parent to compare with" % self.ref)
+            self._diff = self.repo.diff(self.commitid, parentids[0])
         return self._diff
 
+    def changestats(self):
+        '''Returns a ChangeStats with the number of features changed by this commitish under each tree, and their bounding box'''
+        return self.repo.changestats(self.commitid).get(self.commitid)
+
     def parent(self):
-        '''Returns a Commitish that represents the parent of this one'''
-        return Commitish(self.repo, self.ref + '~1')
+        '''
+        Returns a Commitish that represents the first parent of this one, or None if it has no parents.
+        Its ref is the id of the parent, so it does not have to be resolved again
+        '''
+        parentids = self.commit().parentids
+        if not parentids:
+            return None
+        parent = Commitish(self.repo, parentids[0])
+        parent._commitid = parentids[0]
+        return parent
+
+    def parents(self):
+        '''Returns a list of Commit objects with the parents of this one. Merge commits have more than one'''
+        return self.repo.commitgraph.parents(self.commitid)
     
     def __str__(self):
         return str(self.ref)
\ No newline at end of file
@@ -0,0 +1,157 @@
+'''
+A persistent index of the committer dates of the commits in the first-parent history of a ref, to find
+the commit that was the current one at a given time.
+
+The index is a file in the .geogit folder with (date, commit id) records sorted by date, and the id of
+the commit that was the tip of the ref when it was last updated. When the ref has moved, only the commits
+after that one are read and added to it, and they are appended to the file if they are not older than
+the last record. If the old tip is no longer in the history of the ref, the index is rebuilt.
+
+Only indexes of symbolic refs, such as HEAD and branches, are saved. The history of a commit id never
+changes, and features and commits taken from listings and logs have one as their ref, so saving their
+indexes would add a file for each of them. Those are kept in memory only.
+
+    >>> commit = repo.asof(datetime.datetime(2024, 3, 1))
+    >>> layer = Tree(repo, commit.commitid, "parks")
+'''
+
+import os
+import re
+import time
+import bisect
+import struct
+import binascii
+import datetime
+import threading
+import geogit
+from status import readref
+
+MAGIC = "GGDATE01"
+
+INDEX_FOLDER = os.path.join(".geogit", "geogitpy", "dateindex")
+
+_COMMIT_ID = re.compile(r"^[0-9a-f]{40}$")
+
+#magic, id of the tip, number of records
+_HEADER = struct.Struct("<8s20sQ")
+#committer date in milliseconds, commit id
+_RECORD = struct.Struct("<q20s")
+
+
+def totimestamp(value):
+    '''Converts a datetime, a date or a number of seconds since the epoch to milliseconds since the epoch'''
+    if isinstance(value, datetime.datetime):
+        return int(time.mktime(value.timetuple())) * 1000 + value.microsecond // 1000
+    if isinstance(value, datetime.date):
+        return int(time.mktime(value.timetuple())) * 1000
+    return int(value * 1000)
+
+
+class DateIndex(object):
+
+    def __init__(self, repo, ref = geogit.HEAD):
+        self.repo = repo
+        self.ref = ref
+        self.persistent = _COMMIT_ID.match(ref) is None
+        self.filename = os.path.join(repo.url, INDEX_FOLDER, re.sub(r"[^\w.-]", "_", ref) + ".idx")
+        self.tip = None
+        self.dates = []
+        self.ids = []
+        self._lock = threading.Lock()
+        if self.persistent:
+            self._load()
+
+    def __len__(self):
+        return len(self.dates)
+
+    def _load(self):
+        try:
+            with open(self.filename, "rb") as f:
+                header = f.read(_HEADER.size)
+                if len(header) != _HEADER.size:
+                    return
+                magic, tip, count = _HEADER.unpack(header)
+                data = f.read(count * _RECORD.size)
+        except IOError:
+            return
+        if magic != MAGIC or len(data) != count * _RECORD.size:
+            return
+        for i in xrange(count):
+            date, commitid = _RECORD.unpack_from(data, i * _RECORD.size)
+            self.dates.append(date)
+            self.ids.append(binascii.hexlify(commitid))
+        self.tip = binascii.hexlify(tip)
+
+    def _header(self):
+        return _HEADER.pack(MAGIC, binascii.unhexlify(self.tip), len(self.dates))
+
+    def _records(self, start):
+        return "".join(_RECORD.pack(date, binascii.unhexlify(commitid))
+                       for date, commitid in zip(self.dates[start:], self.ids[start:]))
+
+    def _write(self):
+        folder = os.path.dirname(self.filename)
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        tmp = self.filename + ".%d.tmp" % os.getpid()
+        with open(tmp, "wb") as f:
+            f.write(self._header())
+            f.write(self._records(0))
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+        os.rename(tmp, self.filename)
+
+    def _append(self, start):
+        #records go after the ones in the file, and the header is updated last, so a file that
+        #is not completely written still has a consistent header
+        with open(self.filename, "r+b") as f:
+            f.seek(_HEADER.size + start * _RECORD.size)
+            f.write(self._records(start))
+            f.seek(0)
+            f.write(self._header())
+
+    def update(self):
+        '''Adds the commits that have been added to the ref since the last update. Returns the number of commits added'''
+        if self.persistent:
+            tip = readref(self.repo.url, self.ref) or self.repo.revparse(self.ref)
+        else:
+            tip = self.ref
+        with self._lock:
+            if tip == self.tip:
+                return 0
+            new = []
+            found = False
+            for commit in self.repo.commitgraph.firstparents(tip):
+                if commit.commitid == self.tip:
+                    found = True
+                    break
+                new.append((commit.commitertimestamp, commit.commitid))
+            #the walk goes from the tip backwards, and sorting is stable, so commits with the same date
+            #stay in the order of the history
+            new.reverse()
+            new.sort(key = lambda entry: entry[0])
+            start = len(self.dates)
+            appended = found and start and new[0][0] >= self.dates[-1]
+            if found:
+                entries = zip(self.dates, self.ids) + new
+            else:
+                entries = new
+            if not appended:
+                entries.sort(key = lambda entry: entry[0])
+            self.dates = [date for date, commitid in entries]
+            self.ids = [commitid for date, commitid in entries]
+            self.tip = tip
+            if self.persistent:
+                if appended:
+                    self._append(start)
+                else:
+                    self._write()
+            return len(new)
+
+    def lookup(self, timestamp):
+        '''
+        Returns the id of the last commit with a committer date not later than the passed time, which can be a
+        datetime, a date or a number of seconds since the epoch. Returns None if all commits are later
+        '''
+        i = bisect.bisect_right(self.dates, totimestamp(timestamp))
+        return self.ids[i - 1] if i else None
@@ -2,10 +2,19 @@ from geogit.geogitexception import GeoGitException
 
 class Feature(object):
 
-    def __init__(self, repo, ref, path):
+    __slots__ = ["repo", "ref", "path", "objectid", "bbox", "_attributes", "_featuretype"]
+
+    def __init__(self, repo, ref, path, objectid = None, bbox = None):
+        '''
+        objectid: the id of the feature object, if known. Features with the same id have the same data,
+        so it is used to reuse data already retrieved for other refs
+        bbox: the bounding box of the feature as a (minx, miny, maxx, maxy) tuple, if known
+        '''
         self.repo = repo
         self.ref = ref
         self.path = path
+        self.objectid = objectid
+        self.bbox = bbox
         self._attributes = None
         self._featuretype = None
 
@@ -31,9 +40,13 @@ class Feature(object):
         return self.repo.featurediff(self.ref, feature.ref, self.path)
     
     def query(self):                    
-        data = self.repo.featuredata(self.ref, self.path)
+        data = self.repo.featuredata(self.ref, self.path, self.objectid)
         if len(data) == 0:
             raise GeoGitException("Feature at the specified path does not exist")
+        self.setdata(data)
+
+    def setdata(self, data):
+        '''Sets the attributes of this feature from a dict like the one returned by Repository.featuredata'''
         self._attributes = {k: v[0] for k,v in data.iteritems()}
         self._featuretype = {k: v[1] for k,v in data.iteritems()}
 
@@ -44,6 +57,20 @@ class Feature(object):
         except GeoGitException, e:
             return False
 
+    def asof(self, timestamp):
+        '''
+        Returns this feature as it was at the passed time in the history of its ref, or None if it did not
+        exist then. timestamp can be a datetime, a date or a number of seconds since the epoch
+        '''
+        commit = self.repo.asof(timestamp, self.ref)
+        if commit is None:
+            return None
+        try:
+            objectid = self.repo.revparse(commit.commitid + ":" + self.path)
+        except GeoGitException:
+            return None
+        return Feature(self.repo, commit.commitid, self.path, objectid)
+
     def blame(self):
         '''
         Returns authorship information for this feature
@@ -0,0 +1,121 @@
+'''
+Streaming export of trees and diffs to GeoJSON, either as a FeatureCollection or as newline-delimited
+GeoJSON (one Feature per line), which can be consumed while it is being written.
+
+Features are retrieved in batches of BATCH_SIZE with a single show command each, and written as soon
+as they are parsed, so memory use does not depend on the number of features exported. Coordinates can
+be rounded to a number of decimals, which makes the output much smaller for data that does not need
+the full precision of doubles.
+
+    >>> with open("parks.geojson", "w") as f:
+    ...     repo.head().root().trees()[0].exportgeojson(f, ndjson = True, precision = 6)
+
+The id of each Feature is its path in the tree. Its geometry is the value of the geometry attribute
+passed to the export functions, or, if none is passed, that of the geometry attribute whose name comes
+first in alphabetical order. All other attributes are its properties, with geometries written as WKT. Features exported from a diff have a "change"
+member with the type of the difference, and removed features are written as they were in the
+first ref.
+'''
+
+import json
+from shapely.geometry import mapping
+from shapely.geometry.base import BaseGeometry
+from diff import TYPE_REMOVED
+
+#Number of features retrieved by each show command
+BATCH_SIZE = 500
+
+#Compact separators and no circularity checks let the C encoder of the json module do all the work
+_ENCODER = json.JSONEncoder(separators = (",", ":"), check_circular = False, default = unicode)
+
+
+def _round(coords, precision):
+    if not coords:
+        #empty geometries
+        return coords
+    if isinstance(coords[0], (float, int, long)):
+        return tuple(round(c, precision) for c in coords)
+    return [_round(c, precision) for c in coords]
+
+def geometryjson(geom, precision = None):
+    '''Returns a GeoJSON geometry dict for a shapely geometry, with its coordinates rounded to precision decimals'''
+    geometry = mapping(geom)
+    if precision is not None:
+        if "coordinates" in geometry:
+            geometry["coordinates"] = _round(geometry["coordinates"], precision)
+        else:
+            geometry["geometries"] = [geometryjson(g, precision) for g in geom.geoms]
+    return geometry
+
+def featurejson(path, data, precision = None, geometryattribute = None):
+    '''
+    Returns a GeoJSON Feature dict for the attributes of a feature, as returned by Repository.featuredata.
+    geometryattribute is the name of the attribute to use as its geometry. If it is None, the geometry
+    attribute whose name comes first in alphabetical order is used
+    '''
+    if geometryattribute is None:
+        geometries = sorted(name for name, (value, valuetype) in data.iteritems() if isinstance(value, BaseGeometry))
+        geometryattribute = geometries[0] if geometries else None
+    geometry = None
+    properties = {}
+    for name, (value, valuetype) in data.iteritems():
+        if name == geometryattribute:
+            geometry = geometryjson(value, precision) if isinstance(value, BaseGeometry) else None
+        else:
+            properties[name] = value
+    return {"type": "Feature", "id": path, "geometry": geometry, "properties": properties}
+
+
+class GeoJSONWriter(object):
+
+    '''Writes GeoJSON Feature dicts to a file object, as a FeatureCollection or as newline-delimited GeoJSON'''
+
+    def __init__(self, fp, ndjson = True):
+        self.fp = fp
+        self.ndjson = ndjson
+        self.count = 0
+        if not ndjson:
+            fp.write('{"type":"FeatureCollection","features":[\n')
+
+    def write(self, feature):
+        if self.count and not self.ndjson:
+            self.fp.write(",\n")
+        self.fp.write(_ENCODER.encode(feature))
+        if self.ndjson:
+            self.fp.write("\n")
+        self.count += 1
+
+    def close(self):
+        '''Ends the FeatureCollection, if the writer is not writing newline-delimited GeoJSON. It does not close the file'''
+        if not self.ndjson:
+            self.fp.write("\n]}\n")
+
+
+def exporttree(repo, ref, path, fp, ndjson = True, precision = None, geometryattribute = None):
+    '''Writes all the features under ref:path to a file object. Returns the number of features written'''
+    features = repo.children(ref, path, True).features()
+    writer = GeoJSONWriter(fp, ndjson)
+    for start in xrange(0, len(features), BATCH_SIZE):
+        batch = [features.path(i) for i in xrange(start, min(start + BATCH_SIZE, len(features)))]
+        datas = repo.connector.iterfeaturesdata([ref + ":" + p for p in batch])
+        for featurepath, data in zip(batch, datas):
+            writer.write(featurejson(featurepath, data, precision, geometryattribute))
+    writer.close()
+    return writer.count
+
+def exportdiff(repo, refa, refb, fp, ndjson = True, precision = None, path = None, geometryattribute = None):
+    '''
+    Writes the features that differ between 2 refs to a file object, optionally restricted to a path.
+    Returns the number of features written
+    '''
+    diffs = repo.diff(refa, refb) if path is None else repo.treediff(refa, refb, path)
+    writer = GeoJSONWriter(fp, ndjson)
+    for start in xrange(0, len(diffs), BATCH_SIZE):
+        batch = diffs[start:start + BATCH_SIZE]
+        refs = [(refa if d.type() == TYPE_REMOVED else refb) + ":" + d.path for d in batch]
+        for d, data in zip(batch, repo.connector.iterfeaturesdata(refs)):
+            feature = featurejson(d.path, data, precision, geometryattribute)
+            feature["change"] = d.type()
+            writer.write(feature)
+    writer.close()
+    return writer.count
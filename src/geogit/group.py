@@ -0,0 +1,235 @@
+'''
+Queries over a group of repositories, such as one repository per region, run in parallel.
+
+A RepositoryGroup calls the same method of all its member repositories in parallel, so a query takes
+about as long as its slowest member instead of the sum of all of them. An error in a member does not
+stop the others: results are returned for each member, with the value or the exception, and the time
+that it took.
+
+Operations that return sequences are merged into a single stream of (name of the member, element)
+tuples, which yields elements as soon as any member produces them. The merged log is ordered by date,
+newest first, as the log of a single repository is.
+
+    >>> group = RepositoryGroup({"north": "/repos/north", "south": "/repos/south"})
+    >>> stream = group.log()
+    >>> for name, commit in stream:
+    ...     print name, commit.message
+    >>> stream.errors, stream.timings
+'''
+
+import os
+import time
+import heapq
+import Queue
+import threading
+from collections import OrderedDict
+import geogit
+from geogit.repo import Repository
+
+#Maximum number of members that are queried at the same time by non-streaming operations
+DEFAULT_MAX_CONCURRENT = 8
+
+#Number of elements that each member can produce ahead of the consumer of a stream
+DEFAULT_BUFFER_SIZE = 1000
+
+#Seconds between checks for cancellation while a producer is blocked
+POLL_INTERVAL = 0.1
+
+_END = object()
+
+
+class MemberResult(object):
+
+    '''The result of an operation on a member of a group: its value or the exception it raised, and the time it took'''
+
+    def __init__(self, name, value = None, error = None, elapsed = 0.0):
+        self.name = name
+        self.value = value
+        self.error = error
+        self.elapsed = elapsed
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __str__(self):
+        if self.error is not None:
+            return "%s: failed after %.3fs: %s" % (self.name, self.elapsed, self.error)
+        return "%s: %.3fs" % (self.name, self.elapsed)
+
+
+class GroupStream(object):
+
+    '''
+    The merged output of an operation that produces a sequence for each member of a group. Iterating it
+    yields (name, element) tuples. Once it has been consumed, errors and timings have the exception raised
+    by each member that failed and the time each member took, keyed by name.
+    Each iteration runs the operation again in all members, and resets errors and timings.
+    '''
+
+    def __init__(self, repos, func, key = None, buffersize = DEFAULT_BUFFER_SIZE):
+        '''
+        func: a function that takes a Repository and returns an iterable
+        key: if not None, elements are merged in ascending order of this function, assuming that each
+        member produces them in that order. Otherwise they are yielded as they are produced
+        '''
+        self.repos = repos
+        self.func = func
+        self.key = key
+        self.buffersize = buffersize
+        self.errors = {}
+        self.timings = {}
+
+    def _put(self, queue, item, stop):
+        while not stop.is_set():
+            try:
+                queue.put(item, True, POLL_INTERVAL)
+                return True
+            except Queue.Full:
+                pass
+        return False
+
+    def _produce(self, name, repo, queue, stop, errors, timings):
+        #the stop event and the dicts are those of the iteration that started this producer, so producers
+        #of an iteration that was not consumed completely do not affect later ones
+        start = time.time()
+        try:
+            for element in self.func(repo):
+                if not self._put(queue, (name, element), stop):
+                    break
+        except Exception, e:
+            errors[name] = e
+        finally:
+            timings[name] = time.time() - start
+            self._put(queue, (name, _END), stop)
+
+    def _start(self, queues, stop):
+        for (name, repo), queue in zip(self.repos.iteritems(), queues):
+            thread = threading.Thread(target = self._produce, args = (name, repo, queue, stop, self.errors, self.timings))
+            thread.daemon = True
+            thread.start()
+
+    def __iter__(self):
+        stop = threading.Event()
+        self.errors = {}
+        self.timings = {}
+        try:
+            if self.key is None:
+                queue = Queue.Queue(self.buffersize)
+                self._start([queue] * len(self.repos), stop)
+                pending = len(self.repos)
+                while pending:
+                    name, element = queue.get()
+                    if element is _END:
+                        pending -= 1
+                    else:
+                        yield name, element
+            else:
+                queues = [Queue.Queue(self.buffersize) for repo in self.repos]
+                self._start(queues, stop)
+                heap = []
+                def push(i):
+                    name, element = queues[i].get()
+                    if element is not _END:
+                        heapq.heappush(heap, (self.key(element), i, name, element))
+                for i in xrange(len(queues)):
+                    push(i)
+                while heap:
+                    key, i, name, element = heapq.heappop(heap)
+                    yield name, element
+                    push(i)
+        finally:
+            #stops the producers if the stream is not consumed completely
+            stop.set()
+
+
+def _name(url):
+    return os.path.basename(os.path.normpath(url))
+
+
+class RepositoryGroup(object):
+
+    def __init__(self, repos, maxconcurrent = DEFAULT_MAX_CONCURRENT):
+        '''
+        repos: a dict of Repository objects or urls keyed by the names of the members, or a list of them,
+        in which case members are named after the last folder of their urls
+        maxconcurrent: the maximum number of members that are queried at the same time by operations that
+        do not return streams. Streams query all members at the same time, to be able to merge them
+        '''
+        if not isinstance(repos, dict):
+            repos = OrderedDict((_name(repo.url if isinstance(repo, Repository) else repo), repo) for repo in repos)
+        self.repos = OrderedDict((name, repo if isinstance(repo, Repository) else Repository(repo))
+                                 for name, repo in repos.iteritems())
+        self.maxconcurrent = maxconcurrent
+
+    def __len__(self):
+        return len(self.repos)
+
+    def names(self):
+        return self.repos.keys()
+
+    def map(self, func):
+        '''
+        Calls a function with each member Repository, in parallel, and returns an OrderedDict of
+        MemberResult objects keyed by the names of the members
+        '''
+        results = OrderedDict((name, None) for name in self.repos)
+        tasks = Queue.Queue()
+        for item in self.repos.iteritems():
+            tasks.put(item)
+        def work():
+            while True:
+                try:
+                    name, repo = tasks.get_nowait()
+                except Queue.Empty:
+                    return
+                start = time.time()
+                try:
+                    results[name] = MemberResult(name, func(repo), elapsed = time.time() - start)
+                except Exception, e:
+                    results[name] = MemberResult(name, error = e, elapsed = time.time() - start)
+        workers = [threading.Thread(target = work) for i in xrange(min(self.maxconcurrent, len(self.repos)))]
+        for worker in workers:
+            worker.daemon = True
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return results
+
+    def call(self, method, *args, **kwargs):
+        '''Calls the method of the Repository class with the passed name on all members, as map does'''
+        return self.map(lambda repo: getattr(repo, method)(*args, **kwargs))
+
+    def stream(self, func, key = None, buffersize = DEFAULT_BUFFER_SIZE):
+        '''Returns a GroupStream with the merged iterables returned by a function called with each member Repository'''
+        return GroupStream(self.repos, func, key, buffersize)
+
+    def log(self, ref = None, path = None):
+        '''Returns a GroupStream with the commits of all members, newest first'''
+        return self.stream(lambda repo: repo.iterlog(ref, path), lambda commit: -commit.commitertimestamp)
+
+    def features(self, ref = geogit.HEAD, path = None, recursive = False):
+        '''Returns a GroupStream with the features of all members, as each member lists them'''
+        return self.stream(lambda repo: repo.features(ref, path, recursive))
+
+    def diff(self, refa = geogit.HEAD, refb = geogit.WORK_HEAD):
+        '''Returns a GroupStream with the differences in all members, as each member computes them'''
+        return self.stream(lambda repo: repo.diff(refa, refb))
+
+    def exportshp(self, ref, path, folder):
+        '''
+        Exports a tree of each member to a shapefile in the passed folder, named after the member.
+        Returns an OrderedDict of MemberResult objects, whose values are the names of the shapefiles
+        '''
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        def export(repo):
+            shapefile = os.path.join(folder, self._namefor(repo) + ".shp")
+            repo.exportshp(ref, path, shapefile)
+            return shapefile
+        return self.map(export)
+
+    def _namefor(self, repo):
+        for name, member in self.repos.iteritems():
+            if member is repo:
+                return name
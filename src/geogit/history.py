@@ -0,0 +1,88 @@
+'''
+Computation of values over the history of a repository, in parallel.
+
+maphistory calls a function with the snapshot of a path at each commit, using a pool of processes,
+so statistics such as the number of features of a layer can be computed for thousands of commits
+using all cores. Each process has its own Repository object, so the function and its results must
+be picklable. That means the function has to be defined at the top level of a module.
+
+Snapshots are identified by the id of their tree, and each distinct tree is processed only once.
+Results are kept in the object cache of the repository, keyed by the function and the tree id,
+so commits that did not change the path, and later calls with the same function, reuse them.
+'''
+
+import multiprocessing
+from geogitexception import GeoGitException
+from tree import Tree
+
+_repo = None
+
+def _initworker(url):
+    global _repo
+    from repo import Repository
+    _repo = Repository(url)
+
+def _resolve(repo, commitid, path):
+    try:
+        return repo.revparse(commitid + ":" + path)
+    except GeoGitException:
+        return None
+
+def _call(repo, fn, commitid, path, treeid):
+    return fn(Tree(repo, commitid, path, treeid))
+
+def _treeid(args):
+    return _resolve(_repo, *args)
+
+def _apply(args):
+    return _call(_repo, *args)
+
+def _key(fn, treeid):
+    return ("maphistory", fn.__module__, fn.__name__, treeid)
+
+def maphistory(repo, ref, path, fn, processes = None):
+    '''
+    Calls fn with a Tree object for the passed path at each commit in the history of ref.
+    Returns a list of (Commit, result) tuples, in the same order as the log.
+    If the path does not exist at a commit, that commit is not included.
+
+    processes: number of processes to use. Defaults to the number of cores. If it is 1, everything
+    is computed in the calling process, using the passed repository and its connector
+    '''
+    commits = repo.log(ref)
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    pool = None
+    if processes > 1:
+        pool = multiprocessing.Pool(processes, _initworker, (repo.url,))
+    try:
+        if path is None:
+            treeids = [commit.treeid for commit in commits]
+        elif pool is None:
+            treeids = [_resolve(repo, commit.commitid, path) for commit in commits]
+        else:
+            treeids = pool.map(_treeid, [(commit.commitid, path) for commit in commits])
+        results = {}
+        pending = {}
+        for commit, treeid in zip(commits, treeids):
+            if treeid is None or treeid in results or treeid in pending:
+                continue
+            result = repo.objectcache.get(_key(fn, treeid)) if repo.usecache else None
+            if result is not None:
+                results[treeid] = result
+            else:
+                pending[treeid] = (fn, commit.commitid, path, treeid)
+        tasks = pending.values()
+        if pool is None:
+            computed = [_call(repo, *task) for task in tasks]
+        else:
+            computed = pool.map(_apply, tasks)
+        for task, result in zip(tasks, computed):
+            results[task[3]] = result
+            if repo.usecache:
+                repo.objectcache.put(_key(fn, task[3]), result)
+        return [(commit, results[treeid]) for commit, treeid in zip(commits, treeids) if treeid is not None]
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
@@ -0,0 +1,244 @@
+'''
+Instrumentation of the geogit commands run by connectors.
+
+Each command run produces a CommandEvent, which is passed to all registered listeners.
+Listeners are callables taking an event as their only argument.
+
+    >>> with profile() as stats:
+    >>>     repo.log()
+    >>>     repo.versions("parks/5")
+    >>> print stats.report()
+'''
+
+import time
+import math
+import logging
+import threading
+import functools
+import contextlib
+
+logger = logging.getLogger("geogit")
+
+_listeners = []
+_listenerslock = threading.Lock()
+_local = threading.local()
+
+#geogit commands that are grouped with their subcommand when aggregating events
+_COMMAND_GROUPS = ["shp", "osm", "sl", "pg", "remote"]
+
+def addlistener(listener):
+    '''Registers a callable to be called with a CommandEvent each time a geogit command finishes'''
+    global _listeners
+    with _listenerslock:
+        _listeners = _listeners + [listener]
+
+def removelistener(listener):
+    '''Unregisters a listener. Bound methods are compared by equality, since each access creates a new object'''
+    global _listeners
+    with _listenerslock:
+        _listeners = [l for l in _listeners if l != listener]
+
+def enabled():
+    '''Returns True if there is any listener registered'''
+    return bool(_listeners)
+
+def commandname(command):
+    '''Returns the name used to aggregate a command, such as "rev-list" or "shp import"'''
+    if not command:
+        return ""
+    if command[0] in _COMMAND_GROUPS and len(command) > 1:
+        return command[0] + " " + command[1]
+    return command[0]
+
+
+class CommandEvent(object):
+
+    '''
+    Information about a geogit command that has been run.
+
+    walltime is the time from the start of the process until it finished, and parsetime is the time spent
+    processing its output, which overlaps with walltime when output is processed as it is read.
+    operation is the name of the connector method that ran the command, if known
+    '''
+
+    def __init__(self, command, repository):
+        self.command = command
+        self.name = commandname(command)
+        self.repository = repository
+        self.operation = None
+        self.start = time.time()
+        self.end = None
+        self.bytes = 0
+        self.lines = 0
+        self.parsetime = 0.0
+        self.returncode = None
+
+    @property
+    def walltime(self):
+        return (self.end or time.time()) - self.start
+
+    def finish(self, returncode):
+        self.end = time.time()
+        self.returncode = returncode
+
+    def __str__(self):
+        return "%s [%s] %.3fs (parse %.3fs) %d lines %d bytes exit %s" % (" ".join(self.command), self.repository,
+                        self.walltime, self.parsetime, self.lines, self.bytes, self.returncode)
+
+
+def _emit(event):
+    for listener in _listeners:
+        try:
+            listener(event)
+        except Exception:
+            logger.exception("Error in geogit instrumentation listener")
+
+def record(event):
+    '''
+    Records a finished command. If it was run by an instrumented connector method,
+    it is emitted when that method returns, so the time spent parsing its output can be added
+    '''
+    scope = getattr(_local, "scope", None)
+    if scope is None:
+        _emit(event)
+    else:
+        if scope.events:
+            previous = scope.events[-1]
+            previous.parsetime += max(0.0, event.start - previous.end)
+        event.operation = scope.operation
+        scope.events.append(event)
+
+
+class _Scope(object):
+
+    def __init__(self, operation):
+        self.operation = operation
+        self.events = []
+
+
+def instrumented(method):
+    '''
+    Decorator for connector methods that run commands and parse their output.
+    The time elapsed between a command finishing and the next one starting (or the method returning)
+    is added to the parse time of that command
+    '''
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        if not _listeners or getattr(_local, "scope", None) is not None:
+            return method(*args, **kwargs)
+        scope = _Scope(method.__name__)
+        _local.scope = scope
+        try:
+            return method(*args, **kwargs)
+        finally:
+            _local.scope = None
+            if scope.events:
+                last = scope.events[-1]
+                last.parsetime += max(0.0, time.time() - last.end)
+            for event in scope.events:
+                _emit(event)
+    return wrapper
+
+
+class Histogram(object):
+
+    '''A distribution of values, counted in buckets with geometrically growing bounds'''
+
+    def __init__(self, minvalue = 0.001, factor = 2 ** 0.25, buckets = 100):
+        self.minvalue = minvalue
+        self.factor = factor
+        self.buckets = [0] * buckets
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        if value <= self.minvalue:
+            bucket = 0
+        else:
+            bucket = min(len(self.buckets) - 1, int(math.ceil(math.log(value / self.minvalue, self.factor))))
+        self.buckets[bucket] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p):
+        '''Returns an upper bound of the passed percentile (0-100), accurate to the width of a bucket'''
+        if not self.count:
+            return 0.0
+        rank = p / 100.0 * self.count
+        accumulated = 0
+        for i, n in enumerate(self.buckets):
+            accumulated += n
+            if n and accumulated >= rank:
+                return min(self.max, self.minvalue * self.factor ** i)
+        return self.max
+
+
+class CommandSummary(object):
+
+    '''Aggregated events of a single command'''
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.errors = 0
+        self.bytes = 0
+        self.lines = 0
+        self.walltime = Histogram()
+        self.parsetime = Histogram()
+
+    def add(self, event):
+        self.count += 1
+        if event.returncode:
+            self.errors += 1
+        self.bytes += event.bytes
+        self.lines += event.lines
+        self.walltime.add(event.walltime)
+        self.parsetime.add(event.parsetime)
+
+
+class CommandStats(object):
+
+    '''A listener that aggregates command events by command name'''
+
+    def __init__(self):
+        self.commands = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        with self._lock:
+            summary = self.commands.get(event.name)
+            if summary is None:
+                summary = self.commands[event.name] = CommandSummary(event.name)
+            summary.add(event)
+
+    def report(self):
+        '''Returns a table with the stats of each command, sorted by total wall time'''
+        lines = ["%-16s %6s %6s %10s %10s %10s %10s %10s %10s" % ("command", "count", "errors", "total(s)",
+                    "mean(s)", "p50(s)", "p95(s)", "parse(s)", "lines")]
+        summaries = sorted(self.commands.values(), key = lambda s: s.walltime.total, reverse = True)
+        for s in summaries:
+            lines.append("%-16s %6d %6d %10.3f %10.3f %10.3f %10.3f %10.3f %10d" % (s.name, s.count, s.errors,
+                    s.walltime.total, s.walltime.mean(), s.walltime.percentile(50), s.walltime.percentile(95),
+                    s.parsetime.total, s.lines))
+        return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def profile(stats = None):
+    '''
+    Context manager that aggregates all the commands run in the block, from any thread.
+    It yields the CommandStats object where stats are collected
+    '''
+    stats = stats or CommandStats()
+    addlistener(stats)
+    try:
+        yield stats
+    finally:
+        removelistener(stats)
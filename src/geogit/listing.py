@@ -0,0 +1,155 @@
+import binascii
+from array import array
+from geogit.feature import Feature
+from geogit.tree import Tree
+
+TYPE_TREE = 0
+TYPE_FEATURE = 1
+
+NAN = float("nan")
+NO_BBOX = (NAN, NAN, NAN, NAN)
+
+class Listing(object):
+
+    '''
+    A compact, read-only sequence of the trees and features in a listing of a tree, as returned by ls-tree.
+
+    Instead of keeping a Tree or Feature object for each entry, it stores entries in packed arrays:
+    the type of each entry, its object id as 20 raw bytes, and its path, split into an index in a table
+    of parent paths, which are stored only once, and its name. Bounding boxes, if geogit reports them,
+    are stored as 4 doubles per entry.
+    Tree and Feature objects are created when entries are accessed.
+    '''
+
+    def __init__(self, repo, ref):
+        self.repo = repo
+        self.ref = ref
+        self._types = array('b')
+        self._parents = array('i')
+        self._nameoffsets = array('L', [0])
+        self._names = bytearray()
+        self._objectids = bytearray()
+        self._bboxes = None
+        self._prefixes = []
+        self._prefixindices = {}
+        self._indices = None
+        self.snapshot = None
+
+    def add(self, entrytype, path, objectid, bbox = None):
+        '''
+        Adds an entry, with its type (TYPE_TREE or TYPE_FEATURE), full path and object id as a hex string.
+        bbox is an optional (minx, miny, maxx, maxy) tuple
+        '''
+        if isinstance(path, unicode):
+            path = path.encode("utf-8")
+        parent, _, name = path.rpartition("/")
+        index = self._prefixindices.get(parent)
+        if index is None:
+            index = self._prefixindices[parent] = len(self._prefixes)
+            self._prefixes.append(parent)
+        self._types.append(entrytype)
+        self._parents.append(index)
+        self._names += name
+        self._nameoffsets.append(len(self._names))
+        self._objectids.extend(binascii.unhexlify(objectid))
+        if bbox is not None and self._bboxes is None:
+            self._bboxes = array('d', [NAN] * (4 * (len(self._types) - 1)))
+        if self._bboxes is not None:
+            self._bboxes.extend(bbox or NO_BBOX)
+
+    def _view(self, indices):
+        view = Listing.__new__(Listing)
+        view.__dict__.update(self.__dict__)
+        view._indices = indices
+        return view
+
+    def _index(self, i):
+        if self._indices is not None:
+            return self._indices[i]
+        if i < 0:
+            i += len(self._types)
+        if i < 0 or i >= len(self._types):
+            raise IndexError("listing index out of range")
+        return i
+
+    def __len__(self):
+        return len(self._indices) if self._indices is not None else len(self._types)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in xrange(*i.indices(len(self)))]
+        i = self._index(i)
+        if self._types[i] == TYPE_TREE:
+            return Tree(self.repo, self.ref, self._path(i), self._objectid(i), self._bbox(i))
+        feature = Feature(self.repo, self.ref, self._path(i), self._objectid(i), self._bbox(i))
+        if self.snapshot is not None:
+            feature.setdata(self.snapshot.featuredata(i))
+        return feature
+
+    def __iter__(self):
+        for i in xrange(len(self)):
+            yield self[i]
+
+    def _path(self, i):
+        name = str(self._names[self._nameoffsets[i]:self._nameoffsets[i + 1]])
+        parent = self._prefixes[self._parents[i]]
+        return parent + "/" + name if parent else name
+
+    def path(self, i):
+        '''Returns the path of the entry at the passed position, without creating a Tree or Feature object'''
+        return self._path(self._index(i))
+
+    def type(self, i):
+        return self._types[self._index(i)]
+
+    def _objectid(self, i):
+        return binascii.hexlify(self._objectids[i * 20:(i + 1) * 20])
+
+    def objectid(self, i):
+        '''Returns the object id of the entry at the passed position, as a hex string'''
+        return self._objectid(self._index(i))
+
+    def _bbox(self, i):
+        if self._bboxes is None:
+            return None
+        bbox = tuple(self._bboxes[i * 4:(i + 1) * 4])
+        return None if bbox[0] != bbox[0] else bbox
+
+    def bbox(self, i):
+        '''Returns the bounding box of the entry at the passed position, or None if it is not known'''
+        return self._bbox(self._index(i))
+
+    def paths(self):
+        for i in xrange(len(self)):
+            yield self.path(i)
+
+    def trees(self):
+        '''Returns a Listing with only the trees in this one'''
+        return self._filter(TYPE_TREE)
+
+    def features(self):
+        '''Returns a Listing with only the features in this one'''
+        return self._filter(TYPE_FEATURE)
+
+    def _filter(self, entrytype):
+        types = self._types
+        indices = self._indices if self._indices is not None else xrange(len(types))
+        return self._view(array('i', (i for i in indices if types[i] == entrytype)))
+
+    def inparent(self, parent):
+        '''Returns a Listing with only the entries in this one whose parent is the passed path'''
+        index = self._prefixindices.get(parent.encode("utf-8") if isinstance(parent, unicode) else parent)
+        parents = self._parents
+        indices = self._indices if self._indices is not None else xrange(len(parents))
+        return self._view(array('i', (i for i in indices if parents[i] == index)))
+
+    def memorysize(self):
+        '''Returns an estimate of the memory used by the arrays of this listing, in bytes'''
+        arrays = [self._types, self._parents, self._nameoffsets]
+        if self._bboxes is not None:
+            arrays.append(self._bboxes)
+        size = sum(a.itemsize * len(a) for a in arrays)
+        size += len(self._names) + len(self._objectids) + sum(len(p) for p in self._prefixes)
+        if self._indices is not None:
+            size += self._indices.itemsize * len(self._indices)
+        return size
@@ -0,0 +1,280 @@
+'''
+Chunked, resumable import of OSM files.
+
+Importing a large OSM file with a single call to importosm can take hours, and has to start over if it
+fails. An OSMImport reads the file as a stream and splits it into chunks of a fixed number of entities
+(nodes, ways or relations, never mixed in a chunk). It imports and commits each chunk in turn, and saves
+a checkpoint after each commit, so an interrupted import can be resumed from the first chunk not committed.
+
+Ways need the nodes they reference to build their geometries, so all nodes read are kept in an SQLite
+database in the working folder of the import, and the nodes referenced by the ways in a chunk are added
+to it. Memory use is bounded by the size of a chunk, not by the size of the file.
+
+    >>> osmimport = OSMImport(repo, "planet-extract.osm", chunksize = 100000, progress = printprogress)
+    >>> osmimport.run()
+'''
+
+import os
+import json
+import time
+import shutil
+import logging
+import geogit
+from geogitexception import GeoGitException
+
+logger = logging.getLogger("geogit")
+
+#Default number of entities in each chunk
+DEFAULT_CHUNKSIZE = 50000
+
+CHECKPOINT_FILE = "checkpoint.json"
+
+ENTITY_TYPES = ("node", "way", "relation")
+
+
+class ImportProgress(object):
+
+    '''The state of an import, passed to the progress callback after each chunk'''
+
+    def __init__(self, bytestotal):
+        self.chunks = 0
+        self.entities = 0
+        self.bytesread = 0
+        self.bytestotal = bytestotal
+        self.start = time.time()
+        self.resumed = 0
+
+    @property
+    def elapsed(self):
+        return time.time() - self.start
+
+    @property
+    def featurespersecond(self):
+        '''Number of entities imported per second, not counting the ones committed before resuming'''
+        elapsed = self.elapsed
+        return (self.entities - self.resumed) / elapsed if elapsed else 0.0
+
+    @property
+    def fraction(self):
+        return float(self.bytesread) / self.bytestotal if self.bytestotal else 0.0
+
+    def __str__(self):
+        return "%d chunks, %d entities (%.1f%%), %.1f features/s" % (self.chunks, self.entities,
+                                                                   self.fraction * 100, self.featurespersecond)
+
+
+def logprogress(progress):
+    logger.info("OSM import: " + str(progress))
+
+
+class _CountingFile(object):
+
+    '''A file wrapper that counts the bytes read from it'''
+
+    def __init__(self, f):
+        self.f = f
+        self.bytesread = 0
+
+    def read(self, size = -1):
+        data = self.f.read(size)
+        self.bytesread += len(data)
+        return data
+
+
+_ET = None
+
+def _etree():
+    '''
+    Returns the cElementTree module, or ElementTree if it is not available. They are imported the first
+    time they are used, along with sqlite3, so they do not slow down importing the library
+    '''
+    global _ET
+    if _ET is None:
+        try:
+            import xml.etree.cElementTree as _ET
+        except ImportError:
+            import xml.etree.ElementTree as _ET
+    return _ET
+
+def _xml(elem):
+    return _etree().tostring(elem, "utf-8").split("?>", 1)[-1].strip()
+
+
+class NodeStore(object):
+
+    '''Nodes, stored as XML in an SQLite database'''
+
+    def __init__(self, filename):
+        import sqlite3
+        self.db = sqlite3.connect(filename)
+        self.db.execute("CREATE TABLE IF NOT EXISTS nodes (id INTEGER PRIMARY KEY, xml TEXT)")
+
+    def add(self, elements):
+        self.db.executemany("INSERT OR REPLACE INTO nodes VALUES (?, ?)",
+                            ((int(e.get("id")), _xml(e).decode("utf-8")) for e in elements))
+        self.db.commit()
+
+    def get(self, ids):
+        '''Returns a list with the XML of the nodes with the passed ids that are in the store, sorted by id'''
+        ids = list(ids)
+        nodes = []
+        for start in xrange(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            query = "SELECT id, xml FROM nodes WHERE id IN (%s)" % ",".join("?" * len(batch))
+            nodes.extend(self.db.execute(query, batch))
+        return [xml.encode("utf-8") for nodeid, xml in sorted(nodes)]
+
+    def close(self):
+        self.db.close()
+
+
+def chunks(f, chunksize):
+    '''
+    Reads an OSM file and yields a tuple of (entity type, list of elements) for each chunk.
+    Elements of a chunk are cleared when the next chunk is read
+    '''
+    context = _etree().iterparse(f, events = ("start", "end"))
+    root = None
+    current = None
+    elements = []
+    for event, elem in context:
+        if root is None:
+            root = elem
+            continue
+        if event != "end" or elem.tag not in ENTITY_TYPES:
+            continue
+        if elements and (elem.tag != current or len(elements) == chunksize):
+            yield current, elements
+            elements = []
+            root.clear()
+        current = elem.tag
+        elements.append(elem)
+    if elements:
+        yield current, elements
+
+
+class OSMImport(object):
+
+    def __init__(self, repo, osmfile, chunksize = DEFAULT_CHUNKSIZE, workdir = None,
+                 message = "Imported OSM data", progress = logprogress):
+        '''
+        repo: the repository to import into
+        osmfile: the OSM file to import
+        chunksize: the maximum number of entities in each chunk
+        workdir: the folder for the checkpoint, the node database and the chunk files. Defaults to
+        a folder next to the OSM file, so an interrupted import can be resumed by running it again
+        message: the message of the commits. The number of the chunk is added to it
+        progress: a function to call with an ImportProgress object after each chunk
+        '''
+        self.repo = repo
+        self.osmfile = osmfile
+        self.chunksize = chunksize
+        self.workdir = workdir or osmfile + ".import"
+        self.message = message
+        self.progress = progress
+
+    def _checkpointfile(self):
+        return os.path.join(self.workdir, CHECKPOINT_FILE)
+
+    def checkpoint(self):
+        '''Returns the saved checkpoint for this import, or None if there is none or it is for a different file'''
+        try:
+            with open(self._checkpointfile()) as f:
+                checkpoint = json.load(f)
+        except (IOError, ValueError):
+            return None
+        stat = os.stat(self.osmfile)
+        if (checkpoint["size"], checkpoint["mtime"], checkpoint["chunksize"]) != (stat.st_size, stat.st_mtime, self.chunksize):
+            return None
+        return checkpoint
+
+    def _savecheckpoint(self, checkpoint):
+        tmp = self._checkpointfile() + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(checkpoint, f)
+        if os.path.exists(self._checkpointfile()):
+            os.remove(self._checkpointfile())
+        os.rename(tmp, self._checkpointfile())
+
+    def chunkmessage(self, n):
+        return "%s [chunk %d]" % (self.message, n + 1)
+
+    def _committed(self, n):
+        '''Returns True if the last commit in the repository is the one for the passed chunk'''
+        try:
+            for commit in self.repo.iterlog():
+                return commit.message == self.chunkmessage(n)
+        except GeoGitException:
+            pass
+        return False
+
+    def _writechunk(self, n, entitytype, elements, nodes):
+        filename = os.path.join(self.workdir, "chunk-%05d.osm" % n)
+        with open(filename, "w") as f:
+            f.write("<?xml version='1.0' encoding='UTF-8'?>\n<osm version=\"0.6\" generator=\"geogitpy\">\n")
+            for node in nodes:
+                f.write(node + "\n")
+            for elem in elements:
+                f.write(_xml(elem) + "\n")
+            f.write("</osm>\n")
+        return filename
+
+    def run(self):
+        '''
+        Runs the import, resuming it from the last checkpoint if there is one.
+        Returns the final ImportProgress
+        '''
+        if not os.path.isdir(self.workdir):
+            os.makedirs(self.workdir)
+        stat = os.stat(self.osmfile)
+        checkpoint = self.checkpoint()
+        if checkpoint is None:
+            checkpoint = {"file": os.path.abspath(self.osmfile), "size": stat.st_size, "mtime": stat.st_mtime,
+                          "chunksize": self.chunksize, "chunks": 0, "entities": 0, "pending": None, "pendingentities": 0, "commits": []}
+        elif checkpoint["pending"] is not None and self._committed(checkpoint["pending"]):
+            checkpoint["chunks"] = checkpoint["pending"] + 1
+            checkpoint["entities"] += checkpoint["pendingentities"]
+            checkpoint["commits"].append(self.repo.revparse(geogit.HEAD))
+            checkpoint["pending"] = None
+            self._savecheckpoint(checkpoint)
+        progress = ImportProgress(stat.st_size)
+        progress.chunks = checkpoint["chunks"]
+        progress.entities = progress.resumed = checkpoint["entities"]
+        nodestore = NodeStore(os.path.join(self.workdir, "nodes.sqlite"))
+        try:
+            with open(self.osmfile, "rb") as f:
+                counting = _CountingFile(f)
+                for n, (entitytype, elements) in enumerate(chunks(counting, self.chunksize)):
+                    if n < checkpoint["chunks"]:
+                        continue
+                    nodes = []
+                    if entitytype == "node":
+                        nodestore.add(elements)
+                    elif entitytype == "way":
+                        refs = set(int(nd.get("ref")) for e in elements for nd in e.iter("nd"))
+                        nodes = nodestore.get(refs)
+                    filename = self._writechunk(n, entitytype, elements, nodes)
+                    checkpoint["pending"] = n
+                    checkpoint["pendingentities"] = len(elements)
+                    self._savecheckpoint(checkpoint)
+                    self.repo.importosm(filename, True)
+                    self.repo.addandcommit(self.chunkmessage(n))
+                    os.remove(filename)
+                    checkpoint["chunks"] = n + 1
+                    checkpoint["entities"] += len(elements)
+                    checkpoint["commits"].append(self.repo.revparse(geogit.HEAD))
+                    checkpoint["pending"] = None
+                    self._savecheckpoint(checkpoint)
+                    progress.chunks = n + 1
+                    progress.entities = checkpoint["entities"]
+                    progress.bytesread = counting.bytesread
+                    if self.progress is not None:
+                        self.progress(progress)
+        finally:
+            nodestore.close()
+        progress.bytesread = stat.st_size
+        return progress
+
+    def clean(self):
+        '''Deletes the working folder of the import'''
+        shutil.rmtree(self.workdir, ignore_errors = True)
@@ -0,0 +1,160 @@
+'''
+Connectors to record the commands run against a repository, and replay them later without running geogit.
+
+A RecordingConnector runs commands as the CLIConnector does, and keeps each command along with its output.
+A ReplayConnector returns recorded outputs, optionally waiting a given latency before each of them, so
+parsing and caching can be tested and benchmarked without a GeoGit installation and without the cost of
+starting a JVM for each command.
+
+    >>> repo = Repository(path, RecordingConnector())
+    >>> repo.log()
+    >>> repo.connector.save("log.json")
+    >>> repo = Repository(path, ReplayConnector("log.json", latency = 0.5))
+    >>> repo.log()
+'''
+
+import json
+import time
+import threading
+from geogit.cliconnector import CLIConnector, measured
+from geogit.commitish import Commitish
+from geogit.geogitexception import GeoGitException
+from geogit import instrumentation
+
+#Version of the format of recording files
+FORMAT_VERSION = 1
+
+
+class RecordingConnector(CLIConnector):
+
+    '''A CLIConnector that records all commands run and their output'''
+
+    def __init__(self):
+        self.interactions = []
+        self._lock = threading.Lock()
+
+    def _record(self, interaction):
+        with self._lock:
+            self.interactions.append(interaction)
+
+    def run(self, command):
+        try:
+            output = CLIConnector.run(self, command)
+        except GeoGitException, e:
+            self._record({"command": command, "output": unicode(e.message).split("\n"), "error": True})
+            raise
+        self._record({"command": command, "output": output, "error": False})
+        return output
+
+    def stream(self, command):
+        output = []
+        try:
+            for line in CLIConnector.stream(self, command):
+                output.append(line)
+                yield line
+        except GeoGitException, e:
+            self._record({"command": command, "output": unicode(e.message).split("\n"), "error": True})
+            raise
+        self._record({"command": command, "output": output, "error": False})
+
+    def head(self):
+        head = CLIConnector.head(self)
+        self._record({"call": "head", "result": head.ref})
+        return head
+
+    def ismerging(self):
+        result = CLIConnector.ismerging(self)
+        self._record({"call": "ismerging", "result": result})
+        return result
+
+    def isrebasing(self):
+        result = CLIConnector.isrebasing(self)
+        self._record({"call": "isrebasing", "result": result})
+        return result
+
+    def save(self, filename):
+        '''Saves the recorded interactions to a JSON file'''
+        with self._lock:
+            interactions = list(self.interactions)
+        with open(filename, "w") as f:
+            json.dump({"version": FORMAT_VERSION, "url": self.repo.url, "interactions": interactions}, f)
+
+
+class ReplayConnector(CLIConnector):
+
+    '''
+    A connector that returns the outputs stored in a recording, instead of running geogit.
+
+    When the same command has been recorded several times, outputs are returned in the order they were
+    recorded, and the last one is repeated once they are exhausted, unless strict is True.
+    Commands that were not recorded raise a GeoGitException.
+    '''
+
+    def __init__(self, recording, latency = 0, strict = False):
+        '''
+        recording: the name of a file saved by a RecordingConnector, or a list of interactions
+        latency: seconds to wait before returning the output of each command. It can also be a callable
+        that takes the command (a list of strings) and returns the number of seconds to wait
+        strict: if True, raise a GeoGitException when a command is run more times than it was recorded
+        '''
+        if isinstance(recording, basestring):
+            with open(recording) as f:
+                recording = json.load(f)["interactions"]
+        self.latency = latency
+        self.strict = strict
+        self._responses = {}
+        self._lock = threading.Lock()
+        for interaction in recording:
+            key = self._key(interaction)
+            self._responses.setdefault(key, []).append(interaction)
+
+    def _key(self, interaction):
+        if "call" in interaction:
+            return ("call", interaction["call"])
+        return tuple(interaction["command"])
+
+    def _response(self, key):
+        with self._lock:
+            responses = self._responses.get(key)
+            if not responses:
+                raise GeoGitException("No recorded response for %s" % " ".join(key))
+            if len(responses) > 1 or self.strict:
+                return responses.pop(0)
+            return responses[0]
+
+    def _wait(self, command):
+        latency = self.latency(command) if callable(self.latency) else self.latency
+        if latency:
+            time.sleep(latency)
+
+    def checkisrepo(self):
+        pass
+
+    def run(self, command):
+        return list(self.stream(command))
+
+    def stream(self, command):
+        response = self._response(tuple(command))
+        event = instrumentation.CommandEvent(command, self.repo.url) if instrumentation.enabled() else None
+        self._wait(command)
+        lines = iter(response["output"])
+        if event is not None:
+            lines = measured(lines, event)
+        try:
+            for line in lines:
+                yield line
+        finally:
+            if event is not None:
+                event.finish(1 if response["error"] else 0)
+                instrumentation.record(event)
+        if response["error"]:
+            raise GeoGitException("\n".join(response["output"]))
+
+    def head(self):
+        return Commitish(self.repo, self._response(("call", "head"))["result"])
+
+    def ismerging(self):
+        return self._response(("call", "ismerging"))["result"]
+
+    def isrebasing(self):
+        return self._response(("call", "isrebasing"))["result"]
@@ -1,14 +1,29 @@
 from commitish import Commitish
-from cliconnector import CLIConnector
+from cliconnector import CLIConnector, batches
 import geogit
 from geogitexception import GeoGitException
 from feature import Feature
-from tree import Tree
+from cache import LRUCache
+from treediff import TreeDiffer
+from commitgraph import CommitGraph
+from dateindex import DateIndex
+from changestats import ChangeStatsIndex
+from watcher import RefWatcher
+import osmimport
+import shpimport
+import status
+import cherrypick
+#history, snapshot and geojsonexport load multiprocessing or Shapely, so they are imported by the methods
+#that use them, and scripts that only run a few commands start faster
 
 class Repository:
     
     usecache = True
     _logcache = []
+    #SnapshotStore to read the features of trees from. Snapshots are not used if it is None
+    snapshots = None
+    #CacheClient of a cache daemon shared with other processes, used along with the object cache if it is not None
+    sharedcache = None
 
     def __init__(self, url, connector = None, init = False):
         '''
@@ -18,6 +33,8 @@ class Repository:
 
         '''
         self.url = url        
+        self.objectcache = LRUCache()
+        self.commitgraph = CommitGraph(self)
         self.connector = CLIConnector() if connector is None else connector
         self.connector.setRepository(self) 
         if init:
@@ -27,6 +44,8 @@ class Repository:
 
     def cleancache(self):
         self._logcache = []
+        self.objectcache.clear()
+        self.commitgraph.clear()
         
     def revparse(self, rev):
         '''returns the SHA-1 of a given element, represented as a string'''
@@ -41,18 +60,28 @@ class Repository:
         Returns a list of Commitish starting from the passed ref, or HEAD if there is no passed ref.
         If a path is passed, it only returns commits in which that path was modified
         '''        
-        return self.connector.log(ref or geogit.HEAD)
+        return self.connector.log(ref or geogit.HEAD, path)
+
+    def iterlog(self, ref = None, path = None):
+        '''
+        Like log, but returns a generator that yields commits as they are read,
+        instead of waiting for the whole history to be retrieved
+        '''
+        return self.connector.iterlog(ref or geogit.HEAD, path)
     
     def trees(self, ref = geogit.HEAD, path = None, recursive = False): 
-        '''returns a set of Tree objects with all the trees for the passed ref and path'''       
-        return [e for e in self.children(ref, path, recursive)  if isinstance(e, Tree)]
+        '''returns a Listing of Tree objects with all the trees for the passed ref and path'''       
+        return self.children(ref, path, recursive).trees()
     
     def features(self, ref = geogit.HEAD, path = None, recursive = False): 
-        '''returns a set of Feature objects with all the features for the passed ref and path'''                  
-        return [e for e in self.children(ref, path, recursive)  if isinstance(e, Feature)]
+        '''returns a Listing of Feature objects with all the features for the passed ref and path'''                  
+        return self.children(ref, path, recursive).features()
     
     def children(self, ref = geogit.HEAD, path = None, recursive = False): 
-        '''Returns a set of Tree and Feature objects with all the trees for the passed ref and path'''          
+        '''
+        Returns a Listing with Tree and Feature objects for all the children of the passed ref and path.
+        A Listing is a compact read-only sequence, which creates Tree and Feature objects when they are accessed
+        '''          
         return self.connector.children(ref, path, recursive)                   
             
     def master(self):
@@ -99,6 +128,18 @@ class Repository:
         '''Returns a list of DiffEntry representing the changes between 2 commits'''
         return self.connector.diff(refa, refb)
     
+    def treediff(self, refa = geogit.HEAD, refb = geogit.WORK_HEAD, path = None):
+        '''
+        Returns a list of DiffEntry representing the changes between 2 refs, optionally restricted to a path.
+        Unlike diff, it compares tree ids and lists only the subtrees that have changed, reusing listings
+        of previous calls, so it is faster for small changes and for consecutive diffs along a range of commits
+        '''
+        return TreeDiffer(self).diff(refa, refb, path)
+
+    def haschanged(self, refa, refb, path = None):
+        '''Returns True if the tree or feature at the passed path differs between 2 refs'''
+        return TreeDiffer(self).haschanged(refa, refb, path)
+
     def unstaged(self):
         '''Returns a list of diffEntry with the differences between staging area and working tree'''
         return self.diff(geogit.STAGE_HEAD, geogit.WORK_HEAD);
@@ -111,6 +152,23 @@ class Repository:
         '''Returns a list of diffEntry with the differences between HEAD and Working Tree'''
         return self.diff(geogit.HEAD, geogit.WORK_HEAD);
     
+    def status(self):
+        '''
+        Returns a Status object with the staged, unstaged and conflicted changes, and whether a merge or
+        rebase is in progress. It is cached until HEAD, STAGE_HEAD or WORK_HEAD move, and each call
+        returns a copy of the cached one, so it can be modified by the caller
+        '''
+        key = status.key(self) if self.usecache else None
+        if key is not None:
+            result = self.objectcache.get(key)
+            if result is not None:
+                return result.copy()
+        result = status.status(self, key[1:6] if key is not None else None)
+        if key is not None:
+            self.objectcache.put(key, result)
+            return result.copy()
+        return result
+
     def conflicts(self):
         '''Returns a list of tuples, each of them with the 3 versions defining a conflict'''
         return self.connector.conflicts()
@@ -123,16 +181,55 @@ class Repository:
         '''Updates the element in the passed paths to the version corresponding to the passed ref'''
         return self.connector.checkout(ref, paths)    
 
-    def add(self, paths = []):
-        '''Adds the passed paths to the staging area. If no paths are passed, it will add all the unstaged ones'''
-        return self.connector.add(paths)
+    def add(self, paths = [], progress = None):
+        '''
+        Adds the passed paths to the staging area. If no paths are passed, it will add all the unstaged ones.
+        Paths are added in batches, so the command line of each geogit call stays within system limits.
+        progress, if passed, is called with the number of paths added so far and the total after each batch
+        '''
+        return self.connector.add(paths, progress)
+
+    def addfiltered(self, filter, progress = None):
+        '''
+        Adds the unstaged changes for which the passed function returns True. It is called with a DiffEntry
+        for each of them. Returns the list of DiffEntry objects of the changes that were added
+        '''
+        entries = [d for d in self.unstaged() if filter(d)]
+        if entries:
+            self.add([d.path for d in entries], progress)
+        return entries
 
-    def addandcommit(self, message, paths = []):
-        self.add(paths)
+    def addandcommit(self, message, paths = [], progress = None):
+        self.add(paths, progress)
         return self.commit(message, paths)
 
     def commit(self, message, paths = []):
+        '''
+        Commits the staged changes in the passed paths, or all of them if no paths are passed.
+        If there are too many paths to pass them to a single command, they are committed by committing
+        the whole staging area, which is only allowed if no changes outside of them are staged
+        '''
+        if paths and len(list(batches(paths))) > 1:
+            paths = set(paths)
+            def selected(path):
+                parts = path.split("/")
+                return any("/".join(parts[:i]) in paths for i in xrange(1, len(parts) + 1))
+            others = [d.path for d in self.staged() if not selected(d.path)]
+            if others:
+                raise GeoGitException("Cannot commit %d paths while other changes are staged: %s"
+                                      % (len(paths), ", ".join(others[:10])))
+            paths = []
         return self.connector.commit(message, paths)
+
+    def commitfiltered(self, message, filter, progress = None):
+        '''
+        Adds and commits the unstaged changes for which the passed function returns True, as addfiltered does.
+        Returns the list of DiffEntry objects of the changes committed, which is empty if no commit was made
+        '''
+        entries = self.addfiltered(filter, progress)
+        if entries:
+            self.commit(message, [d.path for d in entries])
+        return entries
     
     def blame(self, path):
         '''
@@ -147,17 +244,32 @@ class Repository:
         '''Returns a Feature object corresponding to the passed ref and path'''
         return Feature(self, ref, path)    
 
-    def featuredata(self, ref, path):
+    def featuredata(self, ref, path, objectid = None):
         '''
         Returns the attributes of a given feature, as a dict with attributes 
         names as keys and tuples of (attribute_value, attribute_type_name) as values.
         Values are converted to appropiate types when possible, otherwise they are stored 
         as the string representation of the attribute
+
+        If the object id of the feature is passed, data already retrieved for a feature with
+        the same id is reused, even if it was retrieved for a different ref or path
         '''
-        data = self.connector.featuredata(ref, path)
+        if self.usecache and objectid is not None:
+            data = self.objectcache.get(objectid)
+            if data is None and self.sharedcache is not None:
+                data = self.sharedcache.get(objectid)
+                if data is not None:
+                    self.objectcache.put(objectid, data)
+            if data is not None:
+                return dict(data)
+        objectid, data = self.connector.identifiedfeaturedata(ref, path)
         if len(data) == 0:            
             raise GeoGitException("The specified feature does not exist")
-        return data
+        if self.usecache:
+            self.objectcache.put(objectid, data)
+            if self.sharedcache is not None:
+                self.sharedcache.put(objectid, data)
+        return dict(data)
     
     def versions(self, path):
         '''
@@ -170,14 +282,82 @@ class Repository:
         '''            
         entries = self.log(geogit.HEAD, path)        
         refs = [entry.ref + ":" + path for entry in entries]
-        features = self.connector.featuresdata(refs)                
-        versions = []
-        for i, ref in enumerate(features):
-            feature = features[ref]
-            commit = entries[i]
-            versions.append((commit, feature))
-        return versions
+        features = self.connector.iterfeaturesdata(refs)
+        return zip(entries, features)
     
+    def dateindex(self, ref = geogit.HEAD):
+        '''Returns the DateIndex of the first-parent history of the passed ref, without updating it'''
+        key = ("dateindex", ref)
+        index = self.objectcache.get(key) if self.usecache else None
+        if index is None:
+            index = DateIndex(self, ref)
+            if self.usecache:
+                self.objectcache.put(key, index)
+        return index
+
+    def changestats(self, ref = geogit.HEAD):
+        '''
+        Returns the ChangeStatsIndex of the repository, with the number of features added, modified and removed
+        under each tree and the bounding box of the changes of each commit. It is updated first with the commits
+        in the history of the passed ref that are not in it yet
+        '''
+        index = self.objectcache.get(("changestats",)) if self.usecache else None
+        if index is None:
+            index = ChangeStatsIndex(self)
+            if self.usecache:
+                self.objectcache.put(("changestats",), index)
+        index.update(ref)
+        return index
+
+    def asof(self, timestamp, ref = geogit.HEAD):
+        '''
+        Returns the Commit that was the last one in the first-parent history of ref at the passed time, which
+        can be a datetime, a date or a number of seconds since the epoch. Returns None if all commits are later.
+        The date index of the ref is updated first, adding the commits made since the last call
+        '''
+        index = self.dateindex(ref)
+        index.update()
+        commitid = index.lookup(timestamp)
+        return self.commitgraph.get(commitid) if commitid is not None else None
+
+    def watch(self, polling = False):
+        '''
+        Returns a started RefWatcher that calls its listeners when refs of this repository are changed by any
+        process, and invalidates the caches of this object that depend on them
+        '''
+        watcher = RefWatcher(self, polling)
+        watcher.start()
+        return watcher
+
+    def snapshot(self, ref, path = None, treeid = None):
+        '''
+        Returns a Snapshot with the decoded data of all features under the passed ref and path,
+        read from the snapshot store of the repository, or from a store in the default folder if
+        it has none. If it is not in the store, it is retrieved and added to it.
+        treeid is the id of the tree at ref:path, if known
+        '''
+        import snapshot
+        store = self.snapshots or snapshot.SnapshotStore()
+        if treeid is None:
+            treeid = self.revparse(ref if path is None else ref + ":" + path)
+        key = ("snapshot", store.folder, treeid)
+        result = self.objectcache.get(key) if self.usecache else None
+        if result is None:
+            result = store.get(treeid) or snapshot.create(self, ref, path, treeid, store)
+            if self.usecache:
+                self.objectcache.put(key, result)
+        return result
+
+    def maphistory(self, ref, path, fn, processes = None):
+        '''
+        Calls fn with a Tree object representing the passed path at each commit in the history of ref,
+        using a pool of processes. Returns a list of (Commit, result) tuples.
+        fn must be a function defined at the top level of a module, and its results must be picklable.
+        Results are computed once for each distinct tree, and cached
+        '''
+        import history
+        return history.maphistory(self, ref, path, fn, processes)
+
     def featurediff(self, ref, ref2, path):
         '''
         Returns a dict with attributes that have changed in the specified path between the specified refs
@@ -195,13 +375,50 @@ class Repository:
     def exportsl(self, ref, path, database):
         '''export to a SpatiaLite database'''
         self.connector.exportsl(ref, path, database)        
+
+    def exportgeojson(self, ref, path, fp, ndjson = True, precision = None, geometryattribute = None):
+        '''
+        Writes the features under ref:path to a file object as GeoJSON, streaming them as they are read.
+        If ndjson is True, one Feature is written in each line, otherwise a FeatureCollection is written.
+        If precision is not None, coordinates are rounded to that number of decimals.
+        geometryattribute is the name of the attribute used as the geometry of features. If it is None,
+        the geometry attribute whose name comes first in alphabetical order is used.
+        Returns the number of features written
+        '''
+        import geojsonexport
+        return geojsonexport.exporttree(self, ref, path, fp, ndjson, precision, geometryattribute)
+
+    def exportdiffgeojson(self, refa, refb, fp, ndjson = True, precision = None, path = None, geometryattribute = None):
+        '''
+        Writes the features that differ between 2 refs to a file object as GeoJSON, like exportgeojson does.
+        Each Feature has a "change" member with the type of the difference
+        '''
+        import geojsonexport
+        return geojsonexport.exportdiff(self, refa, refb, fp, ndjson, precision, path, geometryattribute)
     
     def importosm(self, osmfile, add):
         self.connector.importosm(osmfile, add)
         
+    def importosmchunked(self, osmfile, chunksize = osmimport.DEFAULT_CHUNKSIZE, message = "Imported OSM data",
+                         progress = osmimport.logprogress):
+        '''
+        Imports an OSM file in chunks of chunksize entities, committing each of them.
+        If the import is interrupted, calling this again resumes it from the first chunk not committed.
+        progress is called with an ImportProgress object after each chunk. Returns the final ImportProgress
+        '''
+        return osmimport.OSMImport(self, osmfile, chunksize, None, message, progress).run()
+
     def importshp(self, shpfile, add = False, dest = None):
         self.connector.importshp(shpfile, add, dest)
 
+    def importshpchanges(self, shpfile, dest = None, add = True):
+        '''
+        Imports a shapefile, skipping the import if the shapefile and the imported tree have not changed
+        since the last time it was imported into the same dest path. If add is True, only the features
+        that have changed are staged. Returns an ImportSummary with the features added, modified and removed
+        '''
+        return shpimport.importchanges(self, shpfile, dest, add)
+
     def addfeature(path, attributes):
         pass
 
@@ -227,9 +444,45 @@ class Repository:
         
     def rebase(self, commitish):
         self.connector.rebase(commitish)  
+
+    def continuerebase(self):
+        '''Continues a rebase stopped due to conflicts, once they have been resolved and added'''
+        self.connector.continuerebase()
+
+    def abortrebase(self):
+        '''Aborts a rebase stopped due to conflicts, returning the branch to where it was before it'''
+        self.connector.abortrebase()
         
     def cherrypick(self, commitish):
         self.connector.cherrypick(commitish)
+
+    def cherrypickrange(self, start, end, check = True, progress = None):
+        '''
+        Cherry-picks the commits after start and up to end, oldest first, onto the current branch.
+        start must be an ancestor of end, and there can be no merges between them.
+        If check is True, commits that change paths also changed in the current branch since start are
+        considered likely conflicts, and picking stops before the first of them.
+        If a commit is stopped before or has conflicts, a GeoGitException is raised, and the range can be
+        continued with continuecherrypick or aborted with abortcherrypick, even from another process.
+        progress, if passed, is called with the number of commits picked so far and the total after each of them.
+        Returns the number of commits picked
+        '''
+        return cherrypick.cherrypickrange(self, start, end, check, progress)
+
+    def continuecherrypick(self, progress = None):
+        '''
+        Continues a range of commits stopped by cherrypickrange. If there were conflicts, they must have been
+        resolved and added, and they are committed with the message of the commit that was being picked
+        '''
+        return cherrypick.continuecherrypick(self, progress)
+
+    def abortcherrypick(self):
+        '''Returns the current branch to where it was before a range of commits stopped by cherrypickrange was picked'''
+        cherrypick.abortcherrypick(self)
+
+    def ischerrypicking(self):
+        '''Returns true if the repo is in the middle of a range of commits stopped by cherrypickrange'''
+        return cherrypick.readstate(self) is not None
         
     def show(self, ref):
         return self.connector.show(ref)
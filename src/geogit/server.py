@@ -0,0 +1,280 @@
+'''
+A read-only HTTP service for a repository, so several applications can share a single Repository object,
+with its connector and its caches, instead of each of them running and caching its own queries.
+
+RepositoryApp is a WSGI application with the following endpoints. All of them take GET parameters
+and return JSON, or newline-delimited JSON (one object per line) for the ones that return sequences,
+which is streamed as it is read from geogit:
+
+    /log?ref=HEAD&path=parks             commits, as NDJSON
+    /children?ref=HEAD&path=parks&recursive=true
+                                         trees and features, as NDJSON
+    /featuredata?ref=HEAD&path=parks/1   attributes of a feature, as a JSON object. Geometries are WKT
+    /diff?refa=HEAD~1&refb=HEAD&path=parks
+                                         differences, as NDJSON. refb defaults to WORK_HEAD
+    /blame?path=parks/1                  authorship of each attribute of a feature at HEAD, as a JSON object
+
+Refs in a request are resolved to ids before running it, and responses have a strong ETag computed from
+them, so a client can revalidate a response with If-None-Match and get a 304 if nothing has moved.
+Responses for refs that are commit ids never change, so they are marked as cacheable for a year.
+Small responses are also kept in memory by the server, keyed by their ETag.
+
+    >>> serve(Repository("/path/to/repo"), port = 8642)
+
+or, from the command line:
+
+    $ python -m geogit.server /path/to/repo --port 8642
+'''
+
+import re
+import json
+import hashlib
+import logging
+import urlparse
+import argparse
+import SocketServer
+from wsgiref import simple_server
+import geogit
+from geogit.cache import LRUCache
+from geogit.geogitexception import GeoGitException
+from geogit.listing import TYPE_TREE
+from geogit.status import readref, readheads
+
+logger = logging.getLogger("geogit")
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8642
+
+#Maximum number of responses kept in memory by the server
+RESPONSE_CACHE_SIZE = 1000
+
+#Responses bigger than this number of bytes are not kept in memory
+MAX_CACHED_RESPONSE = 1024 * 1024
+
+#Cache-Control header of responses for refs that are commit ids, and for other refs
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MUTABLE_CACHE_CONTROL = "no-cache"
+
+JSON = "application/json"
+NDJSON = "application/x-ndjson"
+
+_COMMIT_ID = re.compile("^[0-9a-f]{40}$")
+
+_STATUS = {200: "200 OK", 304: "304 Not Modified", 400: "400 Bad Request", 404: "404 Not Found",
+           405: "405 Method Not Allowed"}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _default(value):
+    #geometries are converted to WKT, and other values that JSON does not support to strings
+    if hasattr(value, "wkt"):
+        return value.wkt
+    return unicode(value)
+
+def _dumps(obj):
+    return json.dumps(obj, default = _default, sort_keys = True)
+
+def commitjson(commit):
+    return {"id": commit.commitid, "tree": commit.treeid, "parents": commit.parentids, "message": commit.message,
+            "author": commit.authorname, "authordate": commit.authortimestamp,
+            "committer": commit.commitername, "commiterdate": commit.commitertimestamp}
+
+def diffjson(diff):
+    return {"path": diff.path, "old": diff.oldref, "new": diff.newref, "type": diff.type()}
+
+
+class RepositoryApp(object):
+
+    '''A WSGI application that serves read-only queries on a repository'''
+
+    def __init__(self, repo, cachesize = RESPONSE_CACHE_SIZE):
+        self.repo = repo
+        self.responses = LRUCache(cachesize)
+        self.routes = {"/log": self.log, "/children": self.children, "/featuredata": self.featuredata,
+                       "/diff": self.diff, "/blame": self.blame}
+
+    def resolve(self, ref):
+        '''
+        Returns a tuple with the id that the passed ref points to and True if the ref is that id, so the
+        result of a query for it can never change
+        '''
+        if _COMMIT_ID.match(ref):
+            return ref, True
+        if ref in (geogit.STAGE_HEAD, geogit.WORK_HEAD):
+            heads = readheads(self.repo.url)
+            treeid = heads[2] if ref == geogit.STAGE_HEAD else heads[3]
+            if treeid is not None:
+                return treeid, False
+        return readref(self.repo.url, ref) or self.repo.revparse(ref), False
+
+    def _query(self, params, name, default = None):
+        value = params.get(name, default)
+        if value is None:
+            raise BadRequest("Missing parameter: " + name)
+        return value
+
+    def _ref(self, params, name = "ref", default = geogit.HEAD):
+        '''
+        Returns the ref to query, the id it resolves to and whether it is immutable. Refs other than the staging
+        area and the working tree are queried by their id, so the response matches the ETag
+        '''
+        ref = self._query(params, name, default)
+        resolved, immutable = self.resolve(ref)
+        if ref not in (geogit.STAGE_HEAD, geogit.WORK_HEAD):
+            ref = resolved
+        return ref, resolved, immutable
+
+    #Each endpoint returns the ids and values its response depends on, whether it is immutable,
+    #the content type, and a function that returns an iterable with the chunks of the response
+
+    def log(self, params):
+        ref, resolved, immutable = self._ref(params)
+        path = params.get("path")
+        def body():
+            for commit in self.repo.iterlog(ref, path):
+                yield _dumps(commitjson(commit)) + "\n"
+        return (resolved, path), immutable, NDJSON, body
+
+    def children(self, params):
+        ref, resolved, immutable = self._ref(params)
+        path = params.get("path")
+        recursive = params.get("recursive", "false").lower() == "true"
+        def body():
+            listing = self.repo.children(ref, path, recursive)
+            for i in xrange(len(listing)):
+                entry = {"path": listing.path(i), "type": "tree" if listing.type(i) == TYPE_TREE else "feature",
+                         "id": listing.objectid(i), "bbox": listing.bbox(i)}
+                yield _dumps(entry) + "\n"
+        return (resolved, path, recursive), immutable, NDJSON, body
+
+    def featuredata(self, params):
+        ref, resolved, immutable = self._ref(params)
+        path = self._query(params, "path")
+        def body():
+            data = self.repo.featuredata(ref, path)
+            if not data:
+                raise GeoGitException("Feature at the specified path does not exist")
+            return [_dumps(data)]
+        return (resolved, path), immutable, JSON, body
+
+    def diff(self, params):
+        refa, resolveda, immutablea = self._ref(params, "refa")
+        refb, resolvedb, immutableb = self._ref(params, "refb", geogit.WORK_HEAD)
+        path = params.get("path")
+        def body():
+            if path is None:
+                diffs = self.repo.diff(refa, refb)
+            else:
+                diffs = self.repo.treediff(refa, refb, path)
+            for d in diffs:
+                yield _dumps(diffjson(d)) + "\n"
+        return (resolveda, resolvedb, path), immutablea and immutableb, NDJSON, body
+
+    def blame(self, params):
+        path = self._query(params, "path")
+        resolved, immutable = self.resolve(geogit.HEAD)
+        def body():
+            blame = self.repo.blame(path)
+            return [_dumps(dict((name, {"value": value, "commit": commitid, "author": author})
+                                for name, (value, commitid, author) in blame.iteritems()))]
+        return (resolved, path), False, JSON, body
+
+    def _error(self, start_response, status, message):
+        start_response(_STATUS[status], [("Content-Type", JSON)])
+        return [_dumps({"error": message})]
+
+    def __call__(self, environ, start_response):
+        method = environ.get("REQUEST_METHOD", "GET")
+        if method not in ("GET", "HEAD"):
+            return self._error(start_response, 405, "Only GET requests are supported")
+        route = environ.get("PATH_INFO", "")
+        handler = self.routes.get(route)
+        if handler is None:
+            return self._error(start_response, 404, "Unknown endpoint: " + route)
+        params = dict(urlparse.parse_qsl(environ.get("QUERY_STRING", "")))
+        try:
+            key, immutable, contenttype, body = handler(params)
+        except BadRequest, e:
+            return self._error(start_response, 400, e.message)
+        except GeoGitException, e:
+            return self._error(start_response, 404, e.message)
+        etag = '"%s"' % hashlib.sha1(_dumps([route] + list(key))).hexdigest()
+        headers = [("ETag", etag), ("Cache-Control", IMMUTABLE_CACHE_CONTROL if immutable else MUTABLE_CACHE_CONTROL)]
+        if etag in [tag.strip() for tag in environ.get("HTTP_IF_NONE_MATCH", "").split(",")]:
+            start_response(_STATUS[304], headers)
+            return []
+        headers.append(("Content-Type", contenttype))
+        cached = self.responses.get(etag)
+        if cached is not None:
+            start_response(_STATUS[200], headers + [("Content-Length", str(len(cached)))])
+            return [] if method == "HEAD" else [cached]
+        #the first chunk is read before starting the response, so errors running the query can still
+        #be reported with an error status
+        try:
+            chunks = iter(body())
+            first = next(chunks, None)
+        except GeoGitException, e:
+            return self._error(start_response, 404, e.message)
+        start_response(_STATUS[200], headers)
+        if method == "HEAD":
+            return []
+        return self._stream(etag, first, chunks)
+
+    def _stream(self, etag, first, chunks):
+        kept = []
+        size = 0
+        if first is not None:
+            kept.append(first)
+            size = len(first)
+            yield first
+        for chunk in chunks:
+            if kept is not None:
+                size += len(chunk)
+                kept.append(chunk)
+                if size > MAX_CACHED_RESPONSE:
+                    kept = None
+            yield chunk
+        if kept is not None:
+            self.responses.put(etag, "".join(kept))
+
+
+class ThreadingWSGIServer(SocketServer.ThreadingMixIn, simple_server.WSGIServer):
+
+    daemon_threads = True
+
+
+class _RequestHandler(simple_server.WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s" % (self.address_string(), format % args))
+
+
+def makeserver(repo, host = DEFAULT_HOST, port = DEFAULT_PORT):
+    '''Returns a server that handles each request in its own thread, all of them using the passed repository'''
+    return simple_server.make_server(host, port, RepositoryApp(repo), ThreadingWSGIServer, _RequestHandler)
+
+def serve(repo, host = DEFAULT_HOST, port = DEFAULT_PORT):
+    '''Serves the passed repository until the process is interrupted'''
+    server = makeserver(repo, host, port)
+    logger.info("Serving %s on http://%s:%d" % (repo.url, host, port))
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+def main(args = None):
+    from geogit.repo import Repository
+    parser = argparse.ArgumentParser(description = "Read-only HTTP service for a GeoGit repository")
+    parser.add_argument("repo", help = "path of the repository")
+    parser.add_argument("--host", default = DEFAULT_HOST)
+    parser.add_argument("--port", type = int, default = DEFAULT_PORT)
+    options = parser.parse_args(args)
+    logging.basicConfig(level = logging.INFO)
+    serve(Repository(options.repo), options.host, options.port)
+
+
+if __name__ == '__main__':
+    main()
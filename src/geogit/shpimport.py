@@ -0,0 +1,112 @@
+'''
+Import of shapefiles that skips unchanged inputs and stages only the features that changed.
+
+The component files of the shapefile are hashed, and the hashes are stored along with the id of the
+tree that the import produced in the working tree, in a manifest in the .geogit folder. If the same
+shapefile is imported again into the same path and neither the files nor that tree have changed, the
+import is skipped without running geogit at all, other than to check the ids of the trees.
+
+Otherwise, the shapefile is imported, and the features in the destination tree are compared with the
+staging area. Feature ids in geogit are hashes of their content, so features whose ids have not changed
+are unchanged, and only the ones that differ are staged.
+'''
+
+import os
+import json
+import hashlib
+import geogit
+from geogitexception import GeoGitException
+from diff import TYPE_ADDED, TYPE_MODIFIED, TYPE_REMOVED
+
+#Extensions of the files of a shapefile whose content is hashed
+COMPONENTS = [".shp", ".dbf", ".prj"]
+
+#Maximum number of changed features to stage by path. If more have changed, the whole tree is staged
+MAX_PATHS = 1000
+
+MANIFEST_FILE = os.path.join(".geogit", "geogitpy", "shpimports.json")
+
+
+def hashfile(filename, blocksize = 1024 * 1024):
+    '''Returns the SHA-1 of the content of a file, or None if it does not exist'''
+    if not os.path.exists(filename):
+        return None
+    sha = hashlib.sha1()
+    with open(filename, "rb") as f:
+        while True:
+            block = f.read(blocksize)
+            if not block:
+                break
+            sha.update(block)
+    return sha.hexdigest()
+
+def hashshapefile(shapefile):
+    '''Returns a dict with the hashes of the component files of a shapefile, keyed by extension'''
+    base = os.path.splitext(shapefile)[0]
+    return dict((ext, hashfile(base + ext)) for ext in COMPONENTS)
+
+
+class ImportSummary(object):
+
+    '''The result of an import: the paths of the features added, modified and removed, or skipped if the input had not changed'''
+
+    def __init__(self, dest, skipped = False, diffs = []):
+        self.dest = dest
+        self.skipped = skipped
+        self.diffs = diffs
+        self.added = [d.path for d in diffs if d.type() == TYPE_ADDED]
+        self.modified = [d.path for d in diffs if d.type() == TYPE_MODIFIED]
+        self.removed = [d.path for d in diffs if d.type() == TYPE_REMOVED]
+
+    def __str__(self):
+        if self.skipped:
+            return "%s: unchanged, import skipped" % self.dest
+        return "%s: %d added, %d modified, %d removed" % (self.dest, len(self.added), len(self.modified), len(self.removed))
+
+
+def _manifestfile(repo):
+    return os.path.join(repo.url, MANIFEST_FILE)
+
+def _loadmanifest(repo):
+    try:
+        with open(_manifestfile(repo)) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {}
+
+def _savemanifest(repo, manifest):
+    filename = _manifestfile(repo)
+    if not os.path.isdir(os.path.dirname(filename)):
+        os.makedirs(os.path.dirname(filename))
+    with open(filename, "w") as f:
+        json.dump(manifest, f, indent = 1, sort_keys = True)
+
+def _treeid(repo, ref, path):
+    try:
+        return repo.revparse(ref + ":" + path)
+    except GeoGitException:
+        return None
+
+def importchanges(repo, shapefile, dest = None, add = True):
+    '''
+    Imports a shapefile into the working tree, unless it has not changed since the last time it was
+    imported into the same path. If add is True, the features that differ from the ones in the staging
+    area are staged. Returns an ImportSummary
+    '''
+    dest = dest or os.path.splitext(os.path.basename(shapefile))[0]
+    key = os.path.abspath(shapefile) + "|" + dest
+    hashes = hashshapefile(shapefile)
+    manifest = _loadmanifest(repo)
+    entry = manifest.get(key)
+    if entry is not None and entry["hashes"] == hashes and _treeid(repo, geogit.WORK_HEAD, dest) == entry["tree"]:
+        if not add or _treeid(repo, geogit.STAGE_HEAD, dest) == entry["tree"]:
+            return ImportSummary(dest, True)
+    repo.importshp(shapefile, False, dest)
+    diffs = repo.treediff(geogit.STAGE_HEAD, geogit.WORK_HEAD, dest)
+    if add and diffs:
+        #staging the whole tree gives the same result, since the other features are equal in both trees,
+        #and it avoids long command lines when many features have changed
+        repo.add([d.path for d in diffs] if len(diffs) <= MAX_PATHS else [dest])
+    manifest[key] = {"hashes": hashes, "tree": _treeid(repo, geogit.WORK_HEAD, dest)}
+    _savemanifest(repo, manifest)
+    return ImportSummary(dest, False, diffs)
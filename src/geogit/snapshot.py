@@ -0,0 +1,367 @@
+'''
+A local store of decoded snapshots of trees, kept in memory-mapped columnar files.
+
+The first time a tree is read through the store, all its features are retrieved and decoded, and
+written to a file named after the id of the tree. Later reads, from this or any other process,
+map that file and decode values from the mapping only when they are used, without running geogit.
+Trees are content-addressed, so a file never has to be updated, and the store can be shared by
+several repositories.
+
+The store has a size cap. When it is exceeded, the least recently used files are deleted.
+
+    >>> repo.snapshots = SnapshotStore("/tmp/snapshots")
+    >>> for feature in repo.head().root().trees()[0].features():
+    ...     feature.attributes()
+
+Snapshot files start with a header describing the columns: one for each attribute, plus the paths
+and object ids of the features. Numbers are stored as arrays of 64-bit values, geometries as WKB,
+and other values as UTF-8 text, which is converted when read, as it is when read from geogit.
+'''
+
+import os
+import json
+import mmap
+import struct
+import binascii
+import shapely.wkb
+from shapely.geometry.base import BaseGeometry
+from cliparser import valuefromstring
+from listing import Listing, TYPE_FEATURE
+from userfolder import USER_FOLDER, makeuserfolder
+
+MAGIC = "GGSNAP01"
+
+#Default size cap of a store, in bytes
+DEFAULT_MAXSIZE = 1024 * 1024 * 1024
+
+#Default folder for stores, if none is passed. It is only accessible by the current user, since the
+#features in the snapshots are trusted
+DEFAULT_FOLDER = os.path.join(USER_FOLDER, "snapshots")
+
+#Number of features retrieved by each show command when a snapshot is created
+BATCH_SIZE = 500
+
+KIND_INTEGER = "i"
+KIND_FLOAT = "f"
+KIND_BOOLEAN = "b"
+KIND_GEOMETRY = "g"
+KIND_STRING = "s"
+
+_FORMATS = {KIND_INTEGER: "<q", KIND_FLOAT: "<d", KIND_BOOLEAN: "<B"}
+
+
+def _kind(values):
+    kinds = set()
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            kinds.add(KIND_BOOLEAN)
+        elif isinstance(value, (int, long)) and -2 ** 63 <= value < 2 ** 63:
+            kinds.add(KIND_INTEGER)
+        elif isinstance(value, float):
+            kinds.add(KIND_FLOAT)
+        elif isinstance(value, BaseGeometry):
+            kinds.add(KIND_GEOMETRY)
+        else:
+            kinds.add(KIND_STRING)
+    if kinds == set([KIND_INTEGER, KIND_FLOAT]):
+        return KIND_FLOAT
+    if len(kinds) == 1:
+        return kinds.pop()
+    return KIND_STRING
+
+def _text(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float):
+        return repr(value)
+    if isinstance(value, unicode):
+        return value.encode("utf-8")
+    return str(value)
+
+
+class _Writer(object):
+
+    def __init__(self, f):
+        self.f = f
+        self.offset = 0
+
+    def write(self, data):
+        self.f.write(data)
+        self.offset += len(data)
+
+    def align(self):
+        if self.offset % 8:
+            self.write("\0" * (8 - self.offset % 8))
+
+    def fixed(self, fmt, values):
+        self.align()
+        start = self.offset
+        self.write("".join(struct.pack(fmt, v) for v in values))
+        return start
+
+    def variable(self, blobs):
+        '''Writes a list of strings as an array of n + 1 offsets followed by their concatenation'''
+        offsets = [0]
+        for blob in blobs:
+            offsets.append(offsets[-1] + len(blob))
+        start = self.fixed("<Q", offsets)
+        for blob in blobs:
+            self.write(blob)
+        return start
+
+
+class _BlobList(object):
+
+    def __init__(self, blobs):
+        self.blobs = blobs
+
+    def write(self, data):
+        self.blobs.append(data)
+
+
+def write(filename, rows):
+    '''
+    Writes a snapshot file with the passed rows, which are tuples of (path, objectid, data),
+    data being a dict of attributes like the one returned by Repository.featuredata
+    '''
+    rows = list(rows)
+    names = []
+    types = {}
+    for path, objectid, data in rows:
+        for name, (value, valuetype) in data.iteritems():
+            if name not in types:
+                names.append(name)
+                types[name] = valuetype
+    #columns are written to a list of blobs first, since the header goes before them and it
+    #contains their offsets, which are relative to the end of the header
+    body = []
+    writer = _Writer(_BlobList(body))
+    paths = writer.variable([p.encode("utf-8") if isinstance(p, unicode) else p for p, i, d in rows])
+    writer.align()
+    ids = writer.offset
+    writer.write("".join(binascii.unhexlify(i) for p, i, d in rows))
+    columns = []
+    for name in names:
+        values = [d[name][0] if name in d else None for p, i, d in rows]
+        present = writer.fixed("<B", [name in d for p, i, d in rows])
+        kind = _kind(values)
+        if kind in _FORMATS:
+            offset = writer.fixed(_FORMATS[kind], [v or 0 for v in values])
+        elif kind == KIND_GEOMETRY:
+            offset = writer.variable([v.wkb if v is not None else "" for v in values])
+        else:
+            offset = writer.variable([_text(v) if v is not None else "" for v in values])
+        columns.append({"name": name, "type": types[name], "kind": kind, "present": present, "offset": offset})
+    header = json.dumps({"count": len(rows), "paths": paths, "ids": ids, "columns": columns})
+    start = len(MAGIC) + 8 + len(header)
+    padding = (8 - start % 8) % 8
+    tmp = filename + ".%d.tmp" % os.getpid()
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header) + padding))
+        f.write(header + " " * padding)
+        for blob in body:
+            f.write(blob)
+    try:
+        os.rename(tmp, filename)
+    except OSError:
+        #on Windows, rename fails if another process has already written the same snapshot
+        os.remove(tmp)
+
+
+class Snapshot(object):
+
+    '''
+    A read-only table of the features in a tree, backed by a memory-mapped snapshot file.
+    Values are decoded from the mapping each time they are accessed
+    '''
+
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self._map.close()
+            raise IOError("Not a snapshot file: " + filename)
+        length = struct.unpack_from("<Q", self._map, len(MAGIC))[0]
+        start = len(MAGIC) + 8
+        header = json.loads(self._map[start:start + length])
+        self._base = start + length
+        self.count = header["count"]
+        self._paths = header["paths"]
+        self._ids = header["ids"]
+        self.columns = [c["name"] for c in header["columns"]]
+        self._columns = dict((c["name"], c) for c in header["columns"])
+        self._positions = None
+
+    def __len__(self):
+        return self.count
+
+    def _variable(self, offset, i):
+        start, end = struct.unpack_from("<QQ", self._map, self._base + offset + i * 8)
+        data = self._base + offset + (self.count + 1) * 8
+        return self._map[data + start:data + end]
+
+    def path(self, i):
+        return self._variable(self._paths, i).decode("utf-8")
+
+    def objectid(self, i):
+        start = self._base + self._ids + i * 20
+        return binascii.hexlify(self._map[start:start + 20])
+
+    def value(self, name, i):
+        '''Returns the value of an attribute for the feature at the passed position, or None if it does not have it'''
+        column = self._columns[name]
+        if not ord(self._map[self._base + column["present"] + i]):
+            return None
+        kind = column["kind"]
+        if kind in _FORMATS:
+            fmt = _FORMATS[kind]
+            value = struct.unpack_from(fmt, self._map, self._base + column["offset"] + i * struct.calcsize(fmt))[0]
+            return bool(value) if kind == KIND_BOOLEAN else value
+        data = self._variable(column["offset"], i)
+        if kind == KIND_GEOMETRY:
+            return shapely.wkb.loads(data)
+        return valuefromstring(data.decode("utf-8"), column["type"])
+
+    def geometrycolumn(self):
+        '''Returns the name of the first attribute stored as a geometry, or None if there is none'''
+        for name in self.columns:
+            if self._columns[name]["kind"] == KIND_GEOMETRY:
+                return name
+        return None
+
+    def find(self, path):
+        '''Returns the position of the feature with the passed path, or None if it is not in the snapshot'''
+        if self._positions is None:
+            self._positions = dict((self.path(i), i) for i in xrange(self.count))
+        return self._positions.get(path)
+
+    def bounds(self, path):
+        '''Returns the bounds of the geometry of the feature with the passed path, or None if it has no geometry'''
+        i = self.find(path)
+        column = self.geometrycolumn()
+        if i is None or column is None:
+            return None
+        geom = self.value(column, i)
+        if geom is None or geom.is_empty:
+            return None
+        return geom.bounds
+
+    def column(self, name):
+        '''Returns a generator with the values of an attribute for all features'''
+        for i in xrange(self.count):
+            yield self.value(name, i)
+
+    def featuredata(self, i):
+        '''Returns the attributes of the feature at the passed position, as returned by Repository.featuredata'''
+        data = {}
+        for name in self.columns:
+            value = self.value(name, i)
+            if value is not None:
+                data[name] = (value, self._columns[name]["type"])
+        return data
+
+    def listing(self, repo, ref, path = None, recursive = False):
+        '''
+        Returns a Listing with the features in this snapshot, whose data is read from it.
+        Unless recursive is True, only the features whose parent is the passed path are included
+        '''
+        listing = Listing(repo, ref)
+        for i in xrange(self.count):
+            listing.add(TYPE_FEATURE, self.path(i), self.objectid(i))
+        listing.snapshot = self
+        if recursive:
+            return listing
+        return listing.inparent(path or "")
+
+    def close(self):
+        self._map.close()
+
+
+class SnapshotStore(object):
+
+    '''A folder with snapshot files, named after the ids of their trees, up to a total size of maxsize bytes'''
+
+    def __init__(self, folder = DEFAULT_FOLDER, maxsize = DEFAULT_MAXSIZE):
+        self.folder = folder
+        self.maxsize = maxsize
+        if folder == DEFAULT_FOLDER:
+            makeuserfolder(USER_FOLDER)
+            makeuserfolder(folder)
+        elif not os.path.isdir(folder):
+            try:
+                os.makedirs(folder)
+            except OSError:
+                if not os.path.isdir(folder):
+                    raise
+
+    def filename(self, treeid):
+        return os.path.join(self.folder, treeid + ".snap")
+
+    def get(self, treeid):
+        '''Returns the Snapshot for the passed tree id, or None if it is not in the store'''
+        filename = self.filename(treeid)
+        try:
+            snapshot = Snapshot(filename)
+        except (IOError, OSError):
+            return None
+        try:
+            os.utime(filename, None)
+        except OSError:
+            pass
+        return snapshot
+
+    def put(self, treeid, rows):
+        '''Writes a snapshot with the passed rows, as taken by the write function, and returns it'''
+        write(self.filename(treeid), rows)
+        self.evict(treeid)
+        return self.get(treeid)
+
+    def files(self):
+        '''Returns a list of (last access time, size, filename) tuples for the snapshots in the store'''
+        files = []
+        for name in os.listdir(self.folder):
+            if not name.endswith(".snap"):
+                continue
+            filename = os.path.join(self.folder, name)
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, filename))
+        return files
+
+    def size(self):
+        return sum(f[1] for f in self.files())
+
+    def evict(self, keep = None):
+        '''
+        Deletes the least recently used snapshots until the store is below its size cap.
+        The snapshot of the tree id passed as keep is never deleted, even if it is bigger than the cap
+        '''
+        files = sorted(self.files())
+        total = sum(f[1] for f in files)
+        kept = self.filename(keep) if keep is not None else None
+        files = [f for f in files if f[2] != kept]
+        while files and total > self.maxsize:
+            accessed, size, filename = files.pop(0)
+            try:
+                os.remove(filename)
+            except OSError:
+                continue
+            total -= size
+
+
+def create(repo, ref, path, treeid, store):
+    '''Retrieves all the features under ref:path and writes them to the store as the snapshot of treeid'''
+    features = repo.children(ref, path, True).features()
+    rows = []
+    for start in xrange(0, len(features), BATCH_SIZE):
+        paths = [features.path(i) for i in xrange(start, min(start + BATCH_SIZE, len(features)))]
+        datas = repo.connector.iterfeaturesdata([ref + ":" + p for p in paths])
+        for i, (featurepath, data) in enumerate(zip(paths, datas)):
+            rows.append((featurepath, features.objectid(start + i), data))
+    return store.put(treeid, rows)
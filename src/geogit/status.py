@@ -0,0 +1,141 @@
+'''
+The status of the working tree of a repository, computed with as few geogit calls as possible.
+
+The ids of HEAD, STAGE_HEAD and WORK_HEAD are read from the files in the .geogit folder, without
+running geogit. If the staging area has the same tree as the working tree, there are no unstaged
+changes, and nothing has to be compared. The differences between HEAD and the working tree are
+composed from the staged and unstaged ones, instead of running a third diff. Conflicts are only
+listed if the conflicts file of the repository is not empty.
+
+Repository.status caches the result keyed by those ids, so calling it again when nothing has moved
+returns immediately.
+
+    >>> status = repo.status()
+    >>> if not status.isclean():
+    ...     print status
+'''
+
+import os
+import geogit
+from diff import Diffentry
+
+GEOGIT_FOLDER = ".geogit"
+
+
+def _read(url, *path):
+    try:
+        with open(os.path.join(url, GEOGIT_FOLDER, *path)) as f:
+            return f.readline().strip()
+    except IOError:
+        return None
+
+def _stamp(filename):
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime)
+
+def readref(url, ref):
+    '''
+    Returns the id of the commit that HEAD or the branch with the passed name points to, reading it from the
+    .geogit folder. Returns None for other refs, or if it cannot be read
+    '''
+    if ref == geogit.HEAD:
+        return readheads(url)[1]
+    if ref in (geogit.STAGE_HEAD, geogit.WORK_HEAD):
+        return None
+    commitid = _read(url, "refs", "heads", *ref.split("/"))
+    return commitid if commitid is not None and len(commitid) == 40 else None
+
+def readheads(url):
+    '''
+    Reads the state of the heads of a repository from its .geogit folder. Returns a tuple with the name of
+    the current branch (None if HEAD is detached), the id of the HEAD commit, the ids of the trees of
+    STAGE_HEAD and WORK_HEAD, and a stamp of the conflicts file. Values that cannot be read are None
+    '''
+    head = _read(url, geogit.HEAD)
+    branch = None
+    headid = head
+    if head is not None and head.startswith("ref: "):
+        ref = head[len("ref: "):]
+        branch = ref[len("refs/heads/"):] if ref.startswith("refs/heads/") else ref
+        headid = _read(url, *ref.split("/"))
+    conflicts = _stamp(os.path.join(url, GEOGIT_FOLDER, "conflicts"))
+    return branch, headid, _read(url, geogit.STAGE_HEAD), _read(url, geogit.WORK_HEAD), conflicts
+
+def compose(repo, first, second):
+    '''
+    Returns the differences between the old version of a list of differences and the new version of a
+    second one, whose old version is the new version of the first one. The result is sorted by path
+    '''
+    versions = dict((d.path, [d.oldref, d.newref]) for d in first)
+    for d in second:
+        if d.path in versions:
+            versions[d.path][1] = d.newref
+        else:
+            versions[d.path] = [d.oldref, d.newref]
+    return [Diffentry(repo, old, new, path) for path, (old, new) in sorted(versions.iteritems()) if old != new]
+
+
+class Status(object):
+
+    '''The state of the working tree, staging area and HEAD of a repository, at the time it was read'''
+
+    def __init__(self, branch, headid, staged, unstaged, notindatabase, conflicts, merging, rebasing):
+        self.branch = branch
+        self.headid = headid
+        self.staged = staged
+        self.unstaged = unstaged
+        self.notindatabase = notindatabase
+        self.conflicts = conflicts
+        self.merging = merging
+        self.rebasing = rebasing
+
+    def copy(self):
+        '''Returns a Status with copies of the lists of changes and the dict of conflicts of this one'''
+        return Status(self.branch, self.headid, list(self.staged), list(self.unstaged), list(self.notindatabase),
+                      dict(self.conflicts), self.merging, self.rebasing)
+
+    def isclean(self):
+        '''Returns True if there are no staged or unstaged changes, no conflicts and no merge or rebase in progress'''
+        return not (self.staged or self.unstaged or self.conflicts or self.merging or self.rebasing)
+
+    def __str__(self):
+        s = "On branch %s\n" % self.branch if self.branch else "HEAD detached at %s\n" % self.headid
+        if self.merging:
+            s += "Merging\n"
+        if self.rebasing:
+            s += "Rebasing\n"
+        s += "%d staged, %d unstaged, %d conflicted" % (len(self.staged), len(self.unstaged), len(self.conflicts))
+        return s
+
+
+def key(repo):
+    '''Returns the key of the cached status of a repository, or None if the state of its heads cannot be read'''
+    heads = readheads(repo.url)
+    if None in heads[1:4]:
+        return None
+    orighead = _stamp(os.path.join(repo.url, GEOGIT_FOLDER, "ORIG_HEAD"))
+    rebasebranch = _stamp(os.path.join(repo.url, GEOGIT_FOLDER, "rebase-apply", "branch"))
+    return ("status",) + heads + (orighead, rebasebranch)
+
+def status(repo, heads = None):
+    '''
+    Computes the Status of a repository. heads is the tuple returned by readheads, if it has already been read.
+    Use Repository.status instead, which caches the result
+    '''
+    branch, headid, stageid, workid, conflictsstamp = heads or readheads(repo.url)
+    if stageid is not None and stageid == workid:
+        unstaged = []
+    else:
+        unstaged = repo.diff(geogit.STAGE_HEAD, geogit.WORK_HEAD)
+    #the tree of HEAD is only known without running geogit if the commit has already been read
+    if headid in repo.commitgraph and repo.commitgraph.get(headid).treeid == stageid:
+        staged = []
+    else:
+        staged = repo.diff(geogit.HEAD, geogit.STAGE_HEAD)
+    merging = repo.ismerging()
+    rebasing = repo.isrebasing()
+    conflicts = repo.conflicts() if conflictsstamp is not None and conflictsstamp[0] > 0 else {}
+    return Status(branch, headid, staged, unstaged, compose(repo, staged, unstaged), conflicts, merging, rebasing)
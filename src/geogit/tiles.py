@@ -0,0 +1,440 @@
+'''
+Generation of vector tile pyramids for the versions of a layer.
+
+A TilePyramid writes Mapbox Vector Tiles (MVT) for a tree of a repository and a range of zoom levels,
+in a folder with a z/x/y.mvt layout. Features are read from the snapshot of the tree (see the snapshot
+module), and a grid index of their bounding boxes is used to find the features in each tile.
+
+Once a pyramid has been generated for a commit, it can be updated to a newer one. Only the tiles
+that intersect the bounding boxes of the old or new versions of the features changed between both
+commits are generated again, so small edits only rebuild a small fraction of the tiles.
+
+    >>> pyramid = TilePyramid(repo, "parks", "/tmp/tiles", 0, 14)
+    >>> pyramid.generate(geogit.HEAD)
+    >>> pyramid.update(geogit.HEAD)
+
+Geometries are expected to be in geographic coordinates (longitude and latitude), and tiles use
+the spherical mercator tiling scheme.
+'''
+
+import os
+import json
+import math
+import shutil
+import struct
+from shapely.geometry import box
+from shapely.ops import transform
+
+#Name of the file where the state of a pyramid is stored
+STATE_FILE = "pyramid.json"
+
+EXTENT = 4096
+BUFFER = 64
+MAX_LATITUDE = 85.0511287798
+
+GEOM_POINT = 1
+GEOM_LINESTRING = 2
+GEOM_POLYGON = 3
+
+CMD_MOVETO = 1
+CMD_LINETO = 2
+CMD_CLOSEPATH = 7
+
+
+def lonlattotile(lon, lat, zoom):
+    '''Returns the fractional tile coordinates of a point at a zoom level'''
+    n = 2 ** zoom
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    x = (lon + 180.0) / 360.0 * n
+    rad = math.radians(lat)
+    y = (1.0 - math.log(math.tan(rad) + 1.0 / math.cos(rad)) / math.pi) / 2.0 * n
+    return x, y
+
+def tiletolonlat(x, y, zoom):
+    '''Returns the longitude and latitude of a point given by its fractional tile coordinates'''
+    n = 2.0 ** zoom
+    return x / n * 360.0 - 180.0, math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+
+def tilebounds(zoom, x, y, buffer = 0):
+    '''
+    Returns the bounds of a tile as a (minlon, minlat, maxlon, maxlat) tuple.
+    buffer is a fraction of a tile to extend the bounds with
+    '''
+    minlon, minlat = tiletolonlat(x - buffer, y + 1 + buffer, zoom)
+    maxlon, maxlat = tiletolonlat(x + 1 + buffer, y - buffer, zoom)
+    return minlon, minlat, maxlon, maxlat
+
+def tilerange(bounds, zoom, buffer = 0):
+    '''
+    Returns the range of tiles that intersect a bounding box at a zoom level, as a (minx, miny, maxx, maxy)
+    tuple. buffer is a fraction of a tile to extend the box with
+    '''
+    minx, maxy = lonlattotile(bounds[0], bounds[1], zoom)
+    maxx, miny = lonlattotile(bounds[2], bounds[3], zoom)
+    last = 2 ** zoom - 1
+    return (max(0, int(math.floor(minx - buffer))), max(0, int(math.floor(miny - buffer))),
+            min(last, int(math.floor(maxx + buffer))), min(last, int(math.floor(maxy + buffer))))
+
+
+class GridIndex(object):
+
+    '''A spatial index that puts the positions of features in the cells of a grid that their bounding boxes intersect'''
+
+    def __init__(self, cellsize = 1.0):
+        self.cellsize = cellsize
+        self.bounds = {}
+        self._cells = {}
+
+    def _cellrange(self, bounds):
+        size = self.cellsize
+        return (int(math.floor(bounds[0] / size)), int(math.floor(bounds[1] / size)),
+                int(math.floor(bounds[2] / size)), int(math.floor(bounds[3] / size)))
+
+    def insert(self, item, bounds):
+        self.bounds[item] = bounds
+        minx, miny, maxx, maxy = self._cellrange(bounds)
+        for cx in xrange(minx, maxx + 1):
+            for cy in xrange(miny, maxy + 1):
+                self._cells.setdefault((cx, cy), []).append(item)
+
+    def query(self, bounds):
+        '''Returns a set with the items whose bounding boxes intersect the passed one'''
+        result = set()
+        minx, miny, maxx, maxy = self._cellrange(bounds)
+        for cx in xrange(minx, maxx + 1):
+            for cy in xrange(miny, maxy + 1):
+                for item in self._cells.get((cx, cy), ()):
+                    b = self.bounds[item]
+                    if b[0] <= bounds[2] and b[2] >= bounds[0] and b[1] <= bounds[3] and b[3] >= bounds[1]:
+                        result.add(item)
+        return result
+
+    def __len__(self):
+        return len(self.bounds)
+
+
+def _varint(value):
+    data = []
+    while value > 0x7f:
+        data.append(chr((value & 0x7f) | 0x80))
+        value >>= 7
+    data.append(chr(value))
+    return "".join(data)
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+def _field(number, wiretype):
+    return _varint((number << 3) | wiretype)
+
+def _bytesfield(number, data):
+    return _field(number, 2) + _varint(len(data)) + data
+
+def _packed(number, values):
+    return _bytesfield(number, "".join(_varint(v) for v in values))
+
+def _value(value):
+    '''Encodes a Value message, or returns None if the value cannot be represented in a tile'''
+    if isinstance(value, bool):
+        return _field(7, 0) + _varint(int(value))
+    if isinstance(value, (int, long)) and -2 ** 63 <= value < 2 ** 63:
+        return _field(6, 0) + _varint(_zigzag(value))
+    if isinstance(value, float):
+        return _field(3, 1) + struct.pack("<d", value)
+    if isinstance(value, basestring):
+        if isinstance(value, unicode):
+            value = value.encode("utf-8")
+        return _bytesfield(1, value)
+    return None
+
+
+class _Encoder(object):
+
+    '''Encodes the geometry of a feature, already in tile coordinates, as MVT commands'''
+
+    def __init__(self):
+        self.commands = []
+        self.x = 0
+        self.y = 0
+
+    def _points(self, coords):
+        params = []
+        for x, y in coords:
+            x, y = int(round(x)), int(round(y))
+            params.append(_zigzag(x - self.x))
+            params.append(_zigzag(y - self.y))
+            self.x, self.y = x, y
+        return params
+
+    def point(self, points):
+        self.commands.append(CMD_MOVETO | (len(points) << 3))
+        self.commands.extend(self._points(points))
+
+    def line(self, coords, close = False):
+        coords = _dedup(coords)
+        if close:
+            if len(coords) > 1 and coords[0] == coords[-1]:
+                coords = coords[:-1]
+            if len(coords) < 3:
+                return False
+        elif len(coords) < 2:
+            return False
+        self.commands.append(CMD_MOVETO | (1 << 3))
+        self.commands.extend(self._points(coords[:1]))
+        self.commands.append(CMD_LINETO | ((len(coords) - 1) << 3))
+        self.commands.extend(self._points(coords[1:]))
+        if close:
+            self.commands.append(CMD_CLOSEPATH | (1 << 3))
+        return True
+
+    def ring(self, coords, exterior):
+        coords = _dedup(coords)
+        if (_area(coords) > 0) != exterior:
+            coords = coords[::-1]
+        return self.line(coords, True)
+
+def _dedup(coords):
+    '''Rounds coordinates to integers and removes consecutive repeated points'''
+    result = []
+    for coord in coords:
+        point = (int(round(coord[0])), int(round(coord[1])))
+        if not result or result[-1] != point:
+            result.append(point)
+    return result
+
+def _area(coords):
+    '''Signed area of a ring, positive for the orientation of exterior rings in tile coordinates'''
+    area = 0
+    for i in xrange(len(coords) - 1):
+        area += coords[i][0] * coords[i + 1][1] - coords[i + 1][0] * coords[i][1]
+    return area
+
+def encodegeometry(geom):
+    '''Returns a tuple of (geometry type, commands) for a geometry in tile coordinates, or None if it is empty'''
+    if geom.is_empty:
+        return None
+    encoder = _Encoder()
+    kind = geom.geom_type
+    if kind in ("Point", "MultiPoint"):
+        points = [geom.coords[0]] if kind == "Point" else [p.coords[0] for p in geom.geoms]
+        encoder.point(_dedup(points))
+        return GEOM_POINT, encoder.commands
+    if kind in ("LineString", "MultiLineString"):
+        lines = [geom] if kind == "LineString" else geom.geoms
+        for line in lines:
+            encoder.line(line.coords)
+        return (GEOM_LINESTRING, encoder.commands) if encoder.commands else None
+    if kind in ("Polygon", "MultiPolygon"):
+        polygons = [geom] if kind == "Polygon" else geom.geoms
+        for polygon in polygons:
+            if encoder.ring(polygon.exterior.coords, True):
+                for interior in polygon.interiors:
+                    encoder.ring(interior.coords, False)
+        return (GEOM_POLYGON, encoder.commands) if encoder.commands else None
+    if kind == "GeometryCollection":
+        parts = [encodegeometry(g) for g in geom.geoms]
+        parts = [p for p in parts if p is not None]
+        return parts[0] if parts else None
+    return None
+
+
+class TileLayer(object):
+
+    '''A layer of a vector tile being built'''
+
+    def __init__(self, name, extent = EXTENT):
+        self.name = name
+        self.extent = extent
+        self.features = []
+        self._keys = {}
+        self._values = {}
+
+    def _index(self, table, item):
+        index = table.get(item)
+        if index is None:
+            index = table[item] = len(table)
+        return index
+
+    def add(self, geom, attributes, featureid = None):
+        '''Adds a feature with a geometry in tile coordinates. Returns False if the geometry is empty'''
+        encoded = encodegeometry(geom)
+        if encoded is None:
+            return False
+        tags = []
+        for name, value in sorted(attributes.iteritems()):
+            encodedvalue = _value(value)
+            if encodedvalue is None:
+                continue
+            tags.append(self._index(self._keys, name))
+            tags.append(self._index(self._values, encodedvalue))
+        data = ""
+        if featureid is not None:
+            data += _field(1, 0) + _varint(featureid)
+        data += _packed(2, tags) + _field(3, 0) + _varint(encoded[0]) + _packed(4, encoded[1])
+        self.features.append(data)
+        return True
+
+    def encode(self):
+        data = _field(15, 0) + _varint(2) + _bytesfield(1, self.name)
+        for feature in self.features:
+            data += _bytesfield(2, feature)
+        for key, i in sorted(self._keys.items(), key = lambda item: item[1]):
+            data += _bytesfield(3, key.encode("utf-8") if isinstance(key, unicode) else key)
+        for value, i in sorted(self._values.items(), key = lambda item: item[1]):
+            data += _bytesfield(4, value)
+        data += _field(5, 0) + _varint(self.extent)
+        return _bytesfield(3, data)
+
+
+class TilePyramid(object):
+
+    '''Vector tiles for a tree of a repository, stored in a folder'''
+
+    def __init__(self, repo, path, folder, minzoom = 0, maxzoom = 14, layer = None, extent = EXTENT, buffer = BUFFER):
+        '''
+        repo: the repository
+        path: the path of the tree with the features of the layer
+        folder: the folder to write tiles to. Tiles are written to z/x/y.mvt files inside it
+        layer: the name of the layer in the tiles. Defaults to the last element of the path
+        extent: size of the tiles in tile coordinates
+        buffer: size of the area around each tile that is included in it, in tile coordinates
+        '''
+        self.repo = repo
+        self.path = path
+        self.folder = folder
+        self.minzoom = minzoom
+        self.maxzoom = maxzoom
+        self.layer = layer or path.split("/")[-1]
+        self.extent = extent
+        self.buffer = buffer
+        self.tileswritten = 0
+        self.tilesdeleted = 0
+
+    def _statefile(self):
+        return os.path.join(self.folder, STATE_FILE)
+
+    def state(self):
+        '''Returns a dict with the commit and tree the tiles were generated for, or None if they have not been generated'''
+        try:
+            with open(self._statefile()) as f:
+                return json.load(f)
+        except IOError:
+            return None
+
+    def _savestate(self, commitid, treeid):
+        state = {"commit": commitid, "tree": treeid, "path": self.path, "minzoom": self.minzoom,
+                 "maxzoom": self.maxzoom, "layer": self.layer, "extent": self.extent, "buffer": self.buffer}
+        with open(self._statefile(), "w") as f:
+            json.dump(state, f)
+
+    def tilefile(self, zoom, x, y):
+        return os.path.join(self.folder, str(zoom), str(x), "%d.mvt" % y)
+
+    def _snapshot(self, commitid):
+        treeid = self.repo.revparse(commitid + ":" + self.path)
+        return treeid, self.repo.snapshot(commitid, self.path, treeid)
+
+    def _index(self, snapshot):
+        '''Returns a tuple with the name of the geometry attribute and a GridIndex of the features in the snapshot'''
+        column = snapshot.geometrycolumn()
+        index = GridIndex()
+        if column is not None:
+            for i in xrange(len(snapshot)):
+                geom = snapshot.value(column, i)
+                if geom is not None and not geom.is_empty:
+                    index.insert(i, geom.bounds)
+        return column, index
+
+    def _bufferfraction(self):
+        return float(self.buffer) / self.extent
+
+    def _tiles(self, bounds, zoom):
+        minx, miny, maxx, maxy = tilerange(bounds, zoom, self._bufferfraction())
+        for x in xrange(minx, maxx + 1):
+            for y in xrange(miny, maxy + 1):
+                yield x, y
+
+    def _writetile(self, snapshot, column, index, zoom, x, y):
+        '''Writes a tile, or deletes it if it has no features. Returns True if it was written'''
+        scale = self.extent
+        def totile(lons, lats, z = None):
+            coords = [lonlattotile(lon, lat, zoom) for lon, lat in zip(lons, lats)]
+            return [(cx - x) * scale for cx, cy in coords], [(cy - y) * scale for cx, cy in coords]
+        clip = box(-self.buffer, -self.buffer, self.extent + self.buffer, self.extent + self.buffer)
+        layer = TileLayer(self.layer, self.extent)
+        for i in sorted(index.query(tilebounds(zoom, x, y, self._bufferfraction()))):
+            data = snapshot.featuredata(i)
+            geom = transform(totile, data.pop(column)[0])
+            try:
+                geom = geom.intersection(clip)
+            except Exception:
+                #invalid geometries cannot always be clipped, so they are added whole
+                pass
+            name = snapshot.path(i).split("/")[-1]
+            featureid = int(name) if name.isdigit() else None
+            layer.add(geom, dict((k, v[0]) for k, v in data.iteritems()), featureid)
+        filename = self.tilefile(zoom, x, y)
+        if not layer.features:
+            if os.path.exists(filename):
+                os.remove(filename)
+                self.tilesdeleted += 1
+            return False
+        folder = os.path.dirname(filename)
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        with open(filename, "wb") as f:
+            f.write(layer.encode())
+        self.tileswritten += 1
+        return True
+
+    def generate(self, ref):
+        '''Generates all tiles for the layer at the passed ref. Returns the number of tiles written'''
+        commitid = self.repo.revparse(ref)
+        treeid, snapshot = self._snapshot(commitid)
+        column, index = self._index(snapshot)
+        written = 0
+        for zoom in xrange(self.minzoom, self.maxzoom + 1):
+            shutil.rmtree(os.path.join(self.folder, str(zoom)), ignore_errors = True)
+            tiles = set()
+            for bounds in index.bounds.itervalues():
+                tiles.update(self._tiles(bounds, zoom))
+            for x, y in sorted(tiles):
+                written += self._writetile(snapshot, column, index, zoom, x, y)
+        if not os.path.isdir(self.folder):
+            os.makedirs(self.folder)
+        self._savestate(commitid, treeid)
+        return written
+
+    def update(self, ref):
+        '''
+        Updates the tiles to the version of the layer at the passed ref, generating again only those that
+        intersect the features that changed since the ref they were generated for.
+        If they have not been generated yet, all of them are. Returns the number of tiles written or deleted
+        '''
+        state = self.state()
+        if state is None:
+            return self.generate(ref)
+        commitid = self.repo.revparse(ref)
+        if commitid == state["commit"]:
+            return 0
+        treeid, snapshot = self._snapshot(commitid)
+        if treeid == state["tree"]:
+            self._savestate(commitid, treeid)
+            return 0
+        oldsnapshot = self.repo.snapshot(state["commit"], self.path, state["tree"])
+        envelopes = []
+        for diff in self.repo.treediff(state["commit"], commitid, self.path):
+            for s in (oldsnapshot, snapshot):
+                bounds = s.bounds(diff.path)
+                if bounds is not None:
+                    envelopes.append(bounds)
+        column, index = self._index(snapshot)
+        before = self.tileswritten + self.tilesdeleted
+        for zoom in xrange(self.minzoom, self.maxzoom + 1):
+            tiles = set()
+            for bounds in envelopes:
+                tiles.update(self._tiles(bounds, zoom))
+            for x, y in sorted(tiles):
+                self._writetile(snapshot, column, index, zoom, x, y)
+        self._savestate(commitid, treeid)
+        return self.tileswritten + self.tilesdeleted - before
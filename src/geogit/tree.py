@@ -3,16 +3,34 @@ class Tree(object):
     '''An object representing a tree path for a given commit'''
     ROOT = None
 
-    def __init__(self, repo, ref, path = ROOT):        
+    __slots__ = ["repo", "ref", "path", "objectid", "bbox"]
+
+    def __init__(self, repo, ref, path = ROOT, objectid = None, bbox = None):        
+        '''
+        objectid: the id of the tree object, if known. 
+        bbox: the bounding box of the features in the tree as a (minx, miny, maxx, maxy) tuple, if known
+        '''
         self.repo = repo
         self.ref = ref
         self.path = path
+        self.objectid = objectid
+        self.bbox = bbox
         
     def trees(self):
         return self.repo.trees(self.ref, self.path)
         
     def features(self):
+        '''
+        Returns a Listing with the features in this tree. If the repository has a snapshot store,
+        they are read from the snapshot of this tree, which is created if it does not exist
+        '''
+        if self.repo.snapshots is not None:
+            return self.snapshot().listing(self.repo, self.ref, self.path)
         return self.repo.features(self.ref, self.path)
+
+    def snapshot(self):
+        '''Returns a Snapshot with the decoded data of all features in this tree'''
+        return self.repo.snapshot(self.ref, self.path, self.objectid)
     
     def children(self):        
         return self.repo.children(self.ref, self.path)
@@ -20,6 +38,20 @@ class Tree(object):
     def exportshp(self, shapefile):
         '''exports this tree to the specified shapefile'''
         self.repo.exportshp(self.ref, self.path, shapefile)
+
+    def exportgeojson(self, fp, ndjson = True, precision = None, geometryattribute = None):
+        '''exports this tree to a file object as GeoJSON. See Repository.exportgeojson'''
+        return self.repo.exportgeojson(self.ref, self.path, fp, ndjson, precision, geometryattribute)
     
+    def exporttiles(self, folder, minzoom = 0, maxzoom = 14):
+        '''
+        exports this tree to a pyramid of vector tiles in the specified folder.
+        Returns the TilePyramid, which can be used to update the tiles to a later version
+        '''
+        from tiles import TilePyramid
+        pyramid = TilePyramid(self.repo, self.path, folder, minzoom, maxzoom)
+        pyramid.generate(self.ref)
+        return pyramid
+
     def __str__(self):
         return self.ref + ":" + self.path
@@ -0,0 +1,116 @@
+'''
+Differences between two snapshots, computed by comparing the object ids of trees.
+
+Trees are content-addressed, so a subtree with the same id in both snapshots has not changed and
+is not listed at all. Only subtrees with different ids are listed and compared, so the cost of a diff
+is proportional to the size of the change instead of the size of the snapshots.
+
+Listings are cached in the object cache of the repository, keyed by the id of the listed tree,
+so the unchanged parts shared by consecutive commits are listed only once when diffing a range of them.
+
+    >>> differ = TreeDiffer(repo)
+    >>> for commit, previous in zip(commits, commits[1:]):
+    ...     changes = differ.diff(previous.commitid, commit.commitid, "parks")
+'''
+
+from diff import Diffentry, NULL_ID
+from listing import TYPE_TREE, TYPE_FEATURE
+
+class TreeDiffer(object):
+
+    '''Computes differences between snapshots of a repository, reusing listings across calls'''
+
+    def __init__(self, repo):
+        self.repo = repo
+        self.listings = 0
+
+    def _listing(self, ref, objectid, path, recursive = False):
+        '''
+        Returns a dict with (type, objectid) tuples keyed by path, for the children of the tree with
+        the passed id, which is at the passed path of ref
+        '''
+        key = ("ls-tree", objectid, path, recursive)
+        entries = self.repo.objectcache.get(key) if self.repo.usecache else None
+        if entries is None:
+            listing = self.repo.children(ref, path, recursive)
+            entries = dict((listing.path(i), (listing.type(i), listing.objectid(i))) for i in xrange(len(listing)))
+            self.listings += 1
+            if self.repo.usecache:
+                self.repo.objectcache.put(key, entries)
+        return entries
+
+    def entry(self, ref, path):
+        '''
+        Returns a (type, objectid) tuple for the element at the passed path of a ref, which
+        must be an object id, as returned by revparse. Returns None if the path does not exist
+        '''
+        entry = (TYPE_TREE, ref)
+        current = None
+        for name in path.split("/"):
+            if entry[0] != TYPE_TREE:
+                return None
+            entries = self._listing(ref, entry[1], current)
+            current = name if current is None else current + "/" + name
+            entry = entries.get(current)
+            if entry is None:
+                return None
+        return entry
+
+    def diff(self, refa, refb, path = None):
+        '''
+        Returns a list of Diffentry with the features that differ between two refs, sorted by path.
+        If a path is passed, only changes under that path are returned
+        '''
+        ida = self.repo.revparse(refa)
+        idb = self.repo.revparse(refb)
+        if path is None:
+            entrya = (TYPE_TREE, ida)
+            entryb = (TYPE_TREE, idb)
+        else:
+            entrya = self.entry(ida, path)
+            entryb = self.entry(idb, path)
+        diffs = []
+        self._compare(ida, idb, path, entrya, entryb, diffs)
+        diffs.sort(key = lambda d: d.path)
+        return diffs
+
+    def haschanged(self, refa, refb, path = None):
+        '''Returns True if the element at the passed path differs between two refs'''
+        ida = self.repo.revparse(refa)
+        idb = self.repo.revparse(refb)
+        if ida == idb:
+            return False
+        if path is None:
+            return bool(self.diff(ida, idb))
+        return self.entry(ida, path) != self.entry(idb, path)
+
+    def _compare(self, ida, idb, path, entrya, entryb, diffs):
+        if entrya == entryb:
+            return
+        if entrya is None or entryb is None or entrya[0] != entryb[0]:
+            self._all(ida, path, entrya, diffs, True)
+            self._all(idb, path, entryb, diffs, False)
+            return
+        if entrya[0] == TYPE_FEATURE:
+            diffs.append(Diffentry(self.repo, entrya[1], entryb[1], path))
+            return
+        childrena = self._listing(ida, entrya[1], path)
+        childrenb = self._listing(idb, entryb[1], path)
+        for childpath in set(childrena) | set(childrenb):
+            self._compare(ida, idb, childpath, childrena.get(childpath), childrenb.get(childpath), diffs)
+
+    def _all(self, ref, path, entry, diffs, removed):
+        '''Adds a Diffentry for each feature under an element that exists in only one of the refs'''
+        if entry is None:
+            return
+        if entry[0] == TYPE_FEATURE:
+            features = {path: entry}
+        else:
+            features = self._listing(ref, entry[1], path, True)
+        for featurepath, (entrytype, objectid) in features.iteritems():
+            if entrytype != TYPE_FEATURE:
+                continue
+            if removed:
+                diffs.append(Diffentry(self.repo, objectid, NULL_ID, featurepath))
+            else:
+                diffs.append(Diffentry(self.repo, NULL_ID, objectid, featurepath))
@@ -0,0 +1,32 @@
+'''
+A folder in the temp folder for the files that geogitpy shares between the processes of a user, such as
+the socket of the cache daemon and the default snapshot store.
+
+Other local users must not be able to add or replace files in it, since they are trusted by the processes
+that read them, so it is only accessible by its owner, and a folder with the same name owned by another
+user is never used.
+'''
+
+import os
+import getpass
+import tempfile
+
+if hasattr(os, "getuid"):
+    USER_FOLDER = os.path.join(tempfile.gettempdir(), "geogitpy-%d" % os.getuid())
+else:
+    USER_FOLDER = os.path.join(tempfile.gettempdir(), "geogitpy-" + getpass.getuser())
+
+
+def makeuserfolder(folder):
+    '''
+    Creates a folder accessible only by the current user, along with its parents, if it does not exist.
+    Raises an OSError if it exists and belongs to another user
+    '''
+    if not os.path.isdir(folder):
+        try:
+            os.makedirs(folder, 0700)
+        except OSError:
+            if not os.path.isdir(folder):
+                raise
+    if hasattr(os, "getuid") and os.stat(folder).st_uid != os.getuid():
+        raise OSError("The folder belongs to another user: " + folder)
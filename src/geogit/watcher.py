@@ -0,0 +1,288 @@
+'''
+Notification of changes made to the refs of a repository by any process.
+
+A RefWatcher monitors the HEAD, STAGE_HEAD and WORK_HEAD files in the .geogit folder, the refs folder
+and the log folder. On Linux it uses inotify, so changes are noticed as soon as they are written. On other
+systems, or if inotify is not available, the files are read again every POLL_INTERVAL seconds.
+
+When something changes, the refs are read and compared with their previous values, and the listeners of
+each change are called. Caches of the repository that depend on ref names instead of ids are invalidated
+before that, so listeners already get fresh results from it.
+
+    >>> watcher = RefWatcher(repo)
+    >>> watcher.oncommit(lambda branch, old, new: refreshlayer(branch, new))
+    >>> watcher.start()
+
+Events and the arguments of their listeners:
+
+    EVENT_COMMIT: (branch, old id, new id), when a branch moves. branch is None for a detached HEAD.
+    The old id is None for new branches, and the new one is None for deleted ones
+    EVENT_HEAD: (old, new), when HEAD changes, with the ref it points to or its id if it is detached
+    EVENT_STAGE, EVENT_WORK: (old tree id, new tree id), when the staging area or the working tree change
+    EVENT_REF: (ref, old id, new id), when a tag or a remote branch changes
+'''
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import logging
+import threading
+import geogit
+
+logger = logging.getLogger("geogit")
+
+#Seconds between reads of the refs when inotify is not used
+POLL_INTERVAL = 1.0
+
+#Seconds to wait after an inotify event for more of them, so a command that writes several files fires once
+SETTLE_TIME = 0.01
+
+EVENT_COMMIT = "commit"
+EVENT_HEAD = "head"
+EVENT_STAGE = "stage"
+EVENT_WORK = "work"
+EVENT_REF = "ref"
+
+GEOGIT_FOLDER = ".geogit"
+
+_IN_MODIFY = 0x2
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0x800
+_IN_CLOEXEC = 0x80000
+_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_EVENT = struct.Struct("iIII")
+
+
+def _read(filename):
+    try:
+        with open(filename) as f:
+            return f.readline().strip() or None
+    except IOError:
+        return None
+
+def readrefs(url):
+    '''
+    Returns a dict with the contents of the HEAD, STAGE_HEAD and WORK_HEAD files and of all the refs of
+    a repository, keyed by their names. HEAD is the ref it points to, or an id if it is detached
+    '''
+    folder = os.path.join(url, GEOGIT_FOLDER)
+    refs = {}
+    head = _read(os.path.join(folder, geogit.HEAD))
+    if head is not None and head.startswith("ref: "):
+        head = head[len("ref: "):]
+    refs[geogit.HEAD] = head
+    refs[geogit.STAGE_HEAD] = _read(os.path.join(folder, geogit.STAGE_HEAD))
+    refs[geogit.WORK_HEAD] = _read(os.path.join(folder, geogit.WORK_HEAD))
+    for dirpath, dirnames, filenames in os.walk(os.path.join(folder, "refs")):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            refs[os.path.relpath(path, folder).replace(os.sep, "/")] = _read(path)
+    return refs
+
+
+class _Inotify(object):
+
+    '''Watches a set of folders with inotify, and the subfolders of the ones that are watched recursively'''
+
+    def __init__(self, folders):
+        '''folders: a list of (folder, recursive) tuples'''
+        import ctypes
+        import ctypes.util
+        self._ctypes = ctypes
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno = True)
+        self._addwatch = libc.inotify_add_watch
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._folders = {}
+        for folder, recursive in folders:
+            self.add(folder, recursive)
+
+    def add(self, folder, recursive):
+        if not os.path.isdir(folder):
+            return
+        wd = self._addwatch(self.fd, folder, _MASK)
+        if wd < 0:
+            raise OSError(self._ctypes.get_errno(), "inotify_add_watch failed for " + folder)
+        if recursive:
+            self._folders[wd] = folder
+            for name in os.listdir(folder):
+                if os.path.isdir(os.path.join(folder, name)):
+                    self.add(os.path.join(folder, name), True)
+
+    def wait(self, timeout):
+        '''Waits up to timeout seconds for changes. Returns True if there were any'''
+        ready = select.select([self.fd], [], [], timeout)[0]
+        if not ready:
+            return False
+        time.sleep(SETTLE_TIME)
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except OSError, e:
+                if e.errno == errno.EAGAIN:
+                    break
+                raise
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = _EVENT.unpack_from(data, offset)
+                name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip("\0")
+                offset += _EVENT.size + length
+                #new folders, such as the one of a new remote, have to be watched too
+                if mask & _IN_ISDIR and mask & (_IN_CREATE | _IN_MOVED_TO) and wd in self._folders:
+                    self.add(os.path.join(self._folders[wd], name), True)
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class RefWatcher(object):
+
+    def __init__(self, repo, polling = False, interval = POLL_INTERVAL):
+        '''
+        repo: the repository to watch. It has to be a local one
+        polling: if True, poll the refs every interval seconds even if inotify is available
+        '''
+        self.repo = repo
+        self.polling = polling
+        self.interval = interval
+        self.refs = readrefs(repo.url)
+        self._listeners = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.usinginotify = False
+
+    def addlistener(self, event, listener):
+        '''Adds a function to call when the passed event happens. See the module documentation for its arguments'''
+        with self._lock:
+            self._listeners.setdefault(event, []).append(listener)
+
+    def removelistener(self, event, listener):
+        with self._lock:
+            self._listeners.get(event, []).remove(listener)
+
+    def oncommit(self, listener):
+        '''Adds a function to call with (branch, old id, new id) when a branch moves'''
+        self.addlistener(EVENT_COMMIT, listener)
+
+    def _fire(self, event, *args):
+        with self._lock:
+            listeners = list(self._listeners.get(event, []))
+        for listener in listeners:
+            try:
+                listener(*args)
+            except Exception, e:
+                logger.exception("Error in %s listener: %s" % (event, e))
+
+    def _invalidate(self, changed):
+        '''Removes the entries of the repository caches that depend on the names of the changed refs'''
+        repo = self.repo
+        repo._logcache = []
+        #refs are used by their short names, such as "master" for refs/heads/master or "origin/master"
+        #for refs/remotes/origin/master
+        names = set(changed) | set(ref.split("/", 2)[2] for ref in changed if ref.startswith("refs/") and ref.count("/") > 1)
+        if geogit.HEAD in changed or self.refs.get(geogit.HEAD) in changed:
+            names.add(geogit.HEAD)
+        def stale(key):
+            if not isinstance(key, tuple) or not key:
+                return False
+            if key[0] == "status":
+                return True
+            return key[0] == "dateindex" and key[1] in names
+        repo.objectcache.discard(stale)
+
+    def check(self):
+        '''
+        Reads the refs and fires the events for those that have changed since the last check.
+        Returns the names of the refs that changed. This is called by the watcher thread, but it can also
+        be called directly, to check for changes without starting it
+        '''
+        refs = readrefs(self.repo.url)
+        old = self.refs
+        changed = sorted(name for name in set(old) | set(refs) if old.get(name) != refs.get(name))
+        if not changed:
+            return []
+        self._invalidate(changed)
+        self.refs = refs
+        for name in changed:
+            before, after = old.get(name), refs.get(name)
+            if name == geogit.HEAD:
+                self._fire(EVENT_HEAD, before, after)
+                if _isid(before) and _isid(after):
+                    self._fire(EVENT_COMMIT, None, before, after)
+            elif name == geogit.STAGE_HEAD:
+                self._fire(EVENT_STAGE, before, after)
+            elif name == geogit.WORK_HEAD:
+                self._fire(EVENT_WORK, before, after)
+            elif name.startswith("refs/heads/"):
+                self._fire(EVENT_COMMIT, name[len("refs/heads/"):], before, after)
+            else:
+                self._fire(EVENT_REF, name, before, after)
+        return changed
+
+    def _inotify(self):
+        if self.polling or not sys.platform.startswith("linux"):
+            return None
+        folder = os.path.join(self.repo.url, GEOGIT_FOLDER)
+        try:
+            return _Inotify([(folder, False), (os.path.join(folder, "refs"), True), (os.path.join(folder, "log"), False)])
+        except (OSError, AttributeError), e:
+            logger.info("inotify is not available, polling refs instead: %s" % e)
+            return None
+
+    def _run(self, inotify):
+        try:
+            while not self._stop.is_set():
+                if inotify is None:
+                    self._stop.wait(self.interval)
+                elif not inotify.wait(self.interval):
+                    continue
+                if not self._stop.is_set():
+                    try:
+                        self.check()
+                    except Exception, e:
+                        logger.exception("Error checking the refs of %s: %s" % (self.repo.url, e))
+        finally:
+            if inotify is not None:
+                inotify.close()
+
+    def start(self):
+        '''Starts watching the repository in a background thread'''
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self.refs = readrefs(self.repo.url)
+        inotify = self._inotify()
+        self.usinginotify = inotify is not None
+        self._thread = threading.Thread(target = self._run, args = (inotify,), name = "geogit-watcher")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        '''Stops watching the repository, waiting for the background thread to finish'''
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def _isid(value):
+    return value is not None and len(value) == 40 and not value.startswith("refs/")
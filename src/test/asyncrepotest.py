@@ -0,0 +1,46 @@
+import unittest
+import os
+import geogit
+from geogit.repo import Repository
+from geogit.asyncrepo import AsyncRepository
+from geogit.geogitexception import GeoGitException
+
+class GeogitAsyncRepositoryTest(unittest.TestCase):
+
+    repo = Repository(os.path.join(os.path.dirname(__file__), 'data/testrepo'))
+
+    def testLog(self):
+        asyncrepo = AsyncRepository(self.repo)
+        result = asyncrepo.log()
+        log = result.result()
+        self.assertTrue(result.done())
+        self.assertEquals(4, len(log))
+        self.assertEquals("message_4", log[0].message)
+
+    def testConcurrentReads(self):
+        asyncrepo = AsyncRepository(self.repo, maxconcurrent = 2)
+        results = [asyncrepo.featuredata(geogit.HEAD, "parks/1") for i in range(6)]
+        for result in results:
+            self.assertEquals(8, len(result.result()))
+        asyncrepo.close()
+
+    def testIterLog(self):
+        asyncrepo = AsyncRepository(self.repo)
+        messages = [commit.message for commit in asyncrepo.iterlog()]
+        self.assertEquals(4, len(messages))
+        self.assertEquals("message_4", messages[0])
+
+    def testError(self):
+        asyncrepo = AsyncRepository(self.repo)
+        result = asyncrepo.featuredata(geogit.HEAD, "wrongpath/wrongname")
+        self.assertRaises(GeoGitException, result.result)
+
+    def testCancel(self):
+        asyncrepo = AsyncRepository(self.repo, maxconcurrent = 1)
+        first = asyncrepo.log()
+        second = asyncrepo.log()
+        self.assertTrue(second.cancel())
+        self.assertTrue(second.cancelled())
+        self.assertRaises(GeoGitException, second.result)
+        self.assertEquals(4, len(first.result()))
+        self.assertFalse(first.cancel())
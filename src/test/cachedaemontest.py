@@ -0,0 +1,129 @@
+import unittest
+import os
+import shutil
+import socket
+import struct
+import tempfile
+import threading
+import geogit
+from geogit.repo import Repository
+from geogit.replayconnector import ReplayConnector
+from geogit.cachedaemon import CacheServer, CacheClient, ByteStore
+from geogit import cachedaemon
+from cachetest import INTERACTIONS, FEATURE_ID
+from commitgraphtest import interactions as commitinteractions, IDS
+
+class GeogitCacheDaemonTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "cache.sock")
+        self.server = CacheServer(self.path, 1024 * 1024)
+        self.thread = threading.Thread(target = self.server.serve_forever, args = (0.05,))
+        self.thread.daemon = True
+        self.thread.start()
+        self.clients = []
+
+    def tearDown(self):
+        for client in self.clients:
+            client.close()
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.folder, ignore_errors = True)
+
+    def getRepo(self, interactions):
+        repo = Repository("replayed", ReplayConnector(interactions, strict = True))
+        repo.sharedcache = self.getClient()
+        return repo
+
+    def getClient(self, path = None):
+        client = CacheClient(path or self.path)
+        self.clients.append(client)
+        return client
+
+    def testByteStore(self):
+        store = ByteStore(10)
+        store.put([("a", "12345"), ("b", "12345")])
+        self.assertEquals(["12345"], store.get(["a"]))
+        store.put([("c", "1")])
+        self.assertEquals([None, "12345", "1"], store.get(["b", "a", "c"]))
+        self.assertEquals(6, store.stats()["size"])
+
+    def testClient(self):
+        client = self.getClient()
+        client.put(("commit", "a"), {"value": (1, "INTEGER")})
+        self.assertEquals({"value": (1, "INTEGER")}, self.getClient().get(("commit", "a")))
+        self.assertEquals([None, {"value": (1, "INTEGER")}], client.getmany(["b", ("commit", "a")]))
+        self.assertEquals(1, client.stats()["entries"])
+        client.clear()
+        self.assertEquals(None, client.get(("commit", "a")))
+
+    def testUnavailable(self):
+        client = CacheClient(os.path.join(self.folder, "missing.sock"))
+        self.assertEquals(None, client.get("a"))
+        client.put("a", 1)
+        self.assertEquals(None, client.stats())
+
+    def testFeatureDataShared(self):
+        repo = self.getRepo(INTERACTIONS)
+        feature = repo.features(geogit.HEAD, "parks")[0]
+        self.assertEquals("Public", feature.attributes()["usage"])
+        #a different repository object, as another process would have, gets the data from the daemon
+        other = self.getRepo(INTERACTIONS[:1])
+        feature = other.features(geogit.HEAD, "parks")[0]
+        self.assertEquals(23876.5, feature.attributes()["area"])
+
+    def testCommitsShared(self):
+        repo = self.getRepo(commitinteractions(1000))
+        commit = repo.commitgraph.get(IDS[6])
+        self.assertEquals(1, repo.commitgraph.pages)
+        other = self.getRepo([])
+        shared = other.commitgraph.get(IDS[6])
+        self.assertEquals(0, other.commitgraph.pages)
+        self.assertEquals(commit.parentids, shared.parentids)
+        self.assertEquals(commit.commitertimestamp, shared.commitertimestamp)
+        self.assertEquals(commit.message, shared.message)
+        self.assertEquals([IDS[3]], [c.commitid for c in other.commitgraph.get(IDS[4]).parents()])
+
+    def testSocketOfAnotherUser(self):
+        getuid = cachedaemon.os.getuid
+        cachedaemon.os.getuid = lambda: getuid() + 1
+        try:
+            client = self.getClient()
+            client.put("a", 1)
+            self.assertEquals(None, client.get("a"))
+            self.assertEquals(None, client.stats())
+        finally:
+            cachedaemon.os.getuid = getuid
+        self.assertEquals(0, self.getClient().stats()["entries"])
+
+    def testInvalidRequest(self):
+        errors = []
+        self.server.handle_error = lambda request, address: errors.append(address)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(5)
+        sock.connect(self.path)
+        sock.sendall(struct.pack("<I", 5) + "wrong")
+        #the daemon closes the connection and keeps serving other clients
+        self.assertEquals("", sock.recv(1024))
+        sock.close()
+        self.assertEquals([], errors)
+        client = self.getClient()
+        client.put("a", 1)
+        self.assertEquals(1, client.get("a"))
+
+    def testFeatureDataSharedById(self):
+        client = self.getClient()
+        repo = Repository("replayed", ReplayConnector(INTERACTIONS, strict = True))
+        repo.sharedcache = client
+        repo.featuredata(geogit.HEAD, "parks/1")
+        self.assertEquals("Public", client.get(FEATURE_ID)["usage"][0])
+        self.assertEquals(None, client.get("HEAD:parks/1"))
+        #a second repository has no show command to replay, so the data comes from the daemon, by object id
+        other = Repository("replayed", ReplayConnector(INTERACTIONS[:1], strict = True))
+        other.sharedcache = client
+        hits = client.stats()["hits"]
+        feature = other.features(geogit.HEAD, "parks")[0]
+        self.assertEquals(FEATURE_ID, feature.objectid)
+        self.assertEquals(23876.5, feature.attributes()["area"])
+        self.assertEquals(hits + 1, client.stats()["hits"])
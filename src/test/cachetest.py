@@ -0,0 +1,56 @@
+import unittest
+import geogit
+from geogit.repo import Repository
+from geogit.cache import LRUCache
+from geogit.replayconnector import ReplayConnector
+
+FEATURE_ID = "6e2ded64426d5368fdb9017be867ee574f1c02cd"
+
+FEATURE_OUTPUT = ["HEAD:parks/1",
+                  FEATURE_ID,
+                  "usage", "STRING", "Public",
+                  "area", "DOUBLE", "23876.5"]
+
+LSTREE_OUTPUT = ["a1f2dca1d6a6ef0b55f5ac7d3f9cea1e3ee1e3b0 feature %s parks/1 -10.5,20,-9.5,21" % FEATURE_ID]
+
+INTERACTIONS = [{"command": ["ls-tree", "HEAD:parks", "-v"], "output": LSTREE_OUTPUT, "error": False},
+                {"command": ["ls-tree", "HEAD~1:parks", "-v"], "output": LSTREE_OUTPUT, "error": False},
+                {"command": ["show", "--raw", "HEAD:parks/1"], "output": FEATURE_OUTPUT, "error": False}]
+
+class GeogitCacheTest(unittest.TestCase):
+
+    def testLRUCache(self):
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEquals(1, cache.get("a"))
+        cache.put("c", 3)
+        self.assertFalse("b" in cache)
+        self.assertEquals(1, cache.get("a"))
+        self.assertEquals(3, cache.get("c"))
+        self.assertEquals(None, cache.get("b"))
+        self.assertEquals(2, len(cache))
+        self.assertEquals(1, cache.discard(lambda key: key == "a"))
+        self.assertEquals([False, True], ["a" in cache, "c" in cache])
+
+    def testObjectIds(self):
+        repo = Repository("replayed", ReplayConnector(INTERACTIONS))
+        feature = repo.features(geogit.HEAD, "parks")[0]
+        self.assertEquals(FEATURE_ID, feature.objectid)
+        self.assertEquals((-10.5, 20.0, -9.5, 21.0), feature.bbox)
+
+    def testFeatureDataReusedById(self):
+        repo = Repository("replayed", ReplayConnector(INTERACTIONS, strict = True))
+        feature = repo.features(geogit.HEAD, "parks")[0]
+        self.assertEquals("Public", feature.attributes()["usage"])
+        #the show command can be replayed only once, so this has to come from the cache
+        previous = repo.features(geogit.HEAD + "~1", "parks")[0]
+        self.assertEquals(23876.5, previous.attributes()["area"])
+
+    def testFeatureDataKeyedById(self):
+        repo = Repository("replayed", ReplayConnector(INTERACTIONS, strict = True))
+        repo.featuredata(geogit.HEAD, "parks/1")
+        self.assertEquals("Public", repo.objectcache.get(FEATURE_ID)["usage"][0])
+        self.assertEquals(None, repo.objectcache.get("HEAD:parks/1"))
+        feature = repo.features(geogit.HEAD, "parks")[0]
+        self.assertEquals(23876.5, feature.attributes()["area"])
@@ -0,0 +1,122 @@
+import unittest
+import os
+import shutil
+import tempfile
+from geogit.repo import Repository
+from geogit.replayconnector import ReplayConnector
+from geogit.commitish import Commitish
+from geogit.changestats import ChangeStatsIndex, ChangeStats, INDEX_FILE, _pack
+import geogit
+
+IDS = ["%040d" % i for i in xrange(5)]
+NULL = "0" * 40
+OLD = "a" * 40
+NEW = "b" * 40
+
+#changes of each commit. The first one adds 2 roads and a park, the second one modifies a road and removes the park,
+#the third one adds a feature at the root and the fourth one only adds a road
+CHANGES = {1: ["roads/1 %s %s" % (NULL, NEW), "roads/2 %s %s" % (NULL, NEW), "parks/5 %s %s" % (NULL, NEW)],
+           2: ["roads/1 %s %s" % (OLD, NEW), "parks/5 %s %s" % (OLD, NULL)],
+           3: ["point %s %s" % (NULL, NEW)],
+           4: ["roads/3 %s %s" % (NULL, NEW)]}
+
+def revlist(n):
+    output = []
+    for i in xrange(n, 0, -1):
+        output.extend(["commit " + IDS[i], "tree " + "f" * 40, "parent " + (IDS[i - 1] if i > 1 else ""),
+                       "author volaya volaya@boundlessgeo.com 1384817842000 0",
+                       "committer volaya volaya@boundlessgeo.com 1384817842000 0",
+                       "message", "\tcommit %d" % i, "changes"] + CHANGES[i] + [""])
+    return output
+
+def lstree(ref, paths):
+    return {"command": ["ls-tree", ref, "-v"],
+            "output": ["%s feature %s %s %s" % ("f" * 40, NEW, path, bbox) for path, bbox in paths], "error": False}
+
+INTERACTIONS = [{"command": ["rev-list", IDS[2], "--changed"], "output": revlist(2), "error": False},
+                {"command": ["rev-list", IDS[3], "--changed"], "output": revlist(3), "error": False},
+                {"command": ["rev-list", IDS[4], "--changed"], "output": revlist(4), "error": False},
+                lstree(IDS[1] + ":roads", [("roads/1", "0,0,1,1"), ("roads/2", "5,5,6,6")]),
+                lstree(IDS[1] + ":parks", [("parks/5", "-3,-3,-2,-2")]),
+                lstree(IDS[2] + ":roads", [("roads/1", "10,10,11,11"), ("roads/2", "5,5,6,6")]),
+                lstree(IDS[3], []),
+                lstree(IDS[4] + ":roads", [("roads/3", "20,20,21,21")]),
+                {"command": ["rev-parse", IDS[2]], "output": [IDS[2]], "error": False}]
+
+class GeogitChangeStatsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.url = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.url, ".geogit", "refs", "heads"))
+        with open(os.path.join(self.url, ".geogit", "HEAD"), "w") as f:
+            f.write("ref: refs/heads/master\n")
+        self.settip(3)
+
+    def tearDown(self):
+        shutil.rmtree(self.url, ignore_errors = True)
+
+    def settip(self, n):
+        with open(os.path.join(self.url, ".geogit", "refs", "heads", "master"), "w") as f:
+            f.write(IDS[n] + "\n")
+
+    def getRepo(self):
+        return Repository(self.url, ReplayConnector(INTERACTIONS))
+
+    def testStats(self):
+        index = self.getRepo().changestats()
+        self.assertEquals(3, len(index))
+        stats = index.get(IDS[1])
+        self.assertEquals((3, 0, 0), (stats.added, stats.modified, stats.removed))
+        self.assertEquals({"roads": (2, 0, 0), "parks": (1, 0, 0)}, stats.trees)
+        self.assertEquals((-3, -3, 6, 6), stats.bbox)
+        stats = index.get(IDS[2])
+        self.assertEquals({"roads": (0, 1, 0), "parks": (0, 0, 1)}, stats.trees)
+        #the old and new versions of the modified road, and the removed park
+        self.assertEquals((-3, -3, 11, 11), stats.bbox)
+        stats = index.get(IDS[3])
+        self.assertEquals({"": (1, 0, 0)}, stats.trees)
+        self.assertEquals(None, stats.bbox)
+
+    def testPersistedAndIncremental(self):
+        self.getRepo().changestats()
+        index = ChangeStatsIndex(self.getRepo())
+        self.assertEquals(3, len(index))
+        self.assertEquals({"roads": (0, 1, 0), "parks": (0, 0, 1)}, index.get(IDS[2]).trees)
+        self.assertEquals((-3, -3, 11, 11), index.get(IDS[2]).bbox)
+        self.assertEquals(0, index.update())
+        self.settip(4)
+        self.assertEquals(1, index.update())
+        self.assertEquals((20, 20, 21, 21), index.get(IDS[4]).bbox)
+        self.assertEquals(4, len(ChangeStatsIndex(self.getRepo())))
+
+    def testIncompleteRecord(self):
+        self.getRepo().changestats()
+        filename = os.path.join(self.url, INDEX_FILE)
+        size = os.path.getsize(filename)
+        with open(filename, "ab") as f:
+            f.write("\x01\x02\x03")
+        index = ChangeStatsIndex(self.getRepo())
+        self.assertEquals(3, len(index))
+        self.settip(4)
+        self.assertEquals(1, index.update())
+        self.assertEquals(4, len(ChangeStatsIndex(self.getRepo())))
+        self.assertTrue(os.path.getsize(filename) > size)
+
+    def testCommitishStats(self):
+        repo = self.getRepo()
+        stats = Commitish(repo, IDS[2]).changestats()
+        self.assertEquals(1, stats.modified)
+        self.assertEquals(1, stats.removed)
+        self.assertTrue("modified" in str(stats))
+
+    def testRecordsAppendedByOtherProcess(self):
+        index = self.getRepo().changestats()
+        #another process adds a commit after this index read the file
+        self.settip(4)
+        self.assertEquals(1, ChangeStatsIndex(self.getRepo()).update())
+        stats = ChangeStats("f" * 40, {"roads": (1, 0, 0)}, None)
+        index._append([(stats.commitid, _pack(stats))])
+        self.assertTrue(IDS[4] in index)
+        reloaded = ChangeStatsIndex(self.getRepo())
+        self.assertEquals(5, len(reloaded))
+        self.assertEquals((20, 20, 21, 21), reloaded.get(IDS[4]).bbox)
@@ -0,0 +1,122 @@
+import unittest
+import shutil
+import tempfile
+from geogit.repo import Repository
+from geogit.replayconnector import ReplayConnector
+from geogit.geogitexception import GeoGitException
+import geogit
+
+#the north branch has 3 commits after the start of the range, and the current branch changed roads/2 since then
+IDS = ["%040d" % i for i in xrange(5)]
+START, FIRST, SECOND, THIRD, HEAD = IDS
+CHANGES = {FIRST: ["roads/1"], SECOND: ["roads/2", "roads/3"], THIRD: ["roads/4"], START: []}
+
+def revlist(merge = False):
+    output = []
+    for commitid, parentid in [(THIRD, SECOND), (SECOND, FIRST), (FIRST, START), (START, None)]:
+        output.extend(["commit " + commitid, "tree " + "f" * 40])
+        if parentid is not None:
+            output.append("parent " + parentid)
+        if merge and commitid == SECOND:
+            output.append("parent " + HEAD)
+        output.extend(["author volaya volaya@boundlessgeo.com 1384817842000 3600000",
+                       "committer volaya volaya@boundlessgeo.com 1384817842000 3600000",
+                       "message", "\tcommit " + commitid[-1], "changes"])
+        output.extend("%s %s %s" % (path, "0" * 40, "e" * 40) for path in CHANGES[commitid])
+        output.append("")
+    return output
+
+def interactions(conflict = False, merge = False):
+    return [{"command": ["rev-parse", "north~3"], "output": [START], "error": False},
+            {"command": ["rev-parse", geogit.HEAD], "output": [HEAD], "error": False},
+            {"command": ["rev-list", "north", "--changed"], "output": revlist(merge), "error": False},
+            {"command": ["diff-tree", "north~3", geogit.HEAD],
+             "output": ["roads/2 %s %s" % ("e" * 40, "d" * 40)], "error": False},
+            {"command": ["cherry-pick", FIRST], "output": ["CONFLICT: roads/1"], "error": conflict},
+            {"command": ["cherry-pick", SECOND], "output": [], "error": False},
+            {"command": ["cherry-pick", THIRD], "output": [], "error": False},
+            {"command": ["conflicts", "--refspecs-only"], "output": ["No elements need merging."], "error": False},
+            {"command": ["diff-tree", geogit.HEAD, geogit.STAGE_HEAD],
+             "output": ["roads/1 %s %s" % ("0" * 40, "e" * 40)], "error": False},
+            {"command": ["commit", "-m", "commit 1"], "output": [], "error": False},
+            {"command": ["reset", HEAD, "--hard"], "output": [], "error": False},
+            {"command": ["rebase", "--continue"], "output": [], "error": False},
+            {"command": ["rebase", "--abort"], "output": [], "error": False}]
+
+class GeogitCherryPickTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors = True)
+
+    def getRepo(self, conflict = False, merge = False):
+        self.connector = ReplayConnector(interactions(conflict, merge))
+        return Repository(self.folder, self.connector)
+
+    def picked(self):
+        return [c for c in self.connector.executed if c[0] in ("cherry-pick", "commit", "reset")]
+
+    def record(self):
+        self.connector.executed = []
+        run = self.connector.run
+        def recorded(command):
+            self.connector.executed.append(command)
+            return run(command)
+        self.connector.run = recorded
+
+    def testStopsBeforeOverlappingCommit(self):
+        repo = self.getRepo()
+        self.record()
+        progress = []
+        try:
+            repo.cherrypickrange("north~3", "north", progress = lambda done, total: progress.append((done, total)))
+            self.fail("The range should have stopped before the second commit")
+        except GeoGitException, e:
+            self.assertTrue(SECOND in e.message)
+            self.assertTrue("roads/2" in e.message)
+        self.assertTrue(repo.ischerrypicking())
+        self.assertEquals([["cherry-pick", FIRST]], self.picked())
+        self.assertEquals(3, repo.continuecherrypick(lambda done, total: progress.append((done, total))))
+        self.assertFalse(repo.ischerrypicking())
+        self.assertEquals([["cherry-pick", FIRST], ["cherry-pick", SECOND], ["cherry-pick", THIRD]], self.picked())
+        self.assertEquals([(1, 3), (2, 3), (3, 3)], progress)
+
+    def testWithoutCheck(self):
+        repo = self.getRepo()
+        self.record()
+        self.assertEquals(3, repo.cherrypickrange("north~3", "north", check = False))
+        self.assertEquals(3, len(self.picked()))
+        self.assertFalse(repo.ischerrypicking())
+
+    def testContinueAfterConflict(self):
+        repo = self.getRepo(conflict = True)
+        self.record()
+        self.assertRaises(GeoGitException, repo.cherrypickrange, "north~3", "north", False)
+        self.assertTrue(repo.ischerrypicking())
+        self.assertEquals(3, repo.continuecherrypick())
+        self.assertEquals([["cherry-pick", FIRST], ["commit", "-m", "commit 1"], ["cherry-pick", SECOND],
+                           ["cherry-pick", THIRD]], self.picked())
+
+    def testAbort(self):
+        repo = self.getRepo()
+        self.record()
+        self.assertRaises(GeoGitException, repo.cherrypickrange, "north~3", "north")
+        self.assertRaises(GeoGitException, repo.cherrypickrange, "north~3", "north")
+        repo.abortcherrypick()
+        self.assertFalse(repo.ischerrypicking())
+        self.assertEquals(["reset", HEAD, "--hard"], self.picked()[-1])
+        self.assertRaises(GeoGitException, repo.continuecherrypick)
+
+    def testMergeInRange(self):
+        repo = self.getRepo(merge = True)
+        self.assertRaises(GeoGitException, repo.cherrypickrange, "north~3", "north")
+        self.assertFalse(repo.ischerrypicking())
+
+    def testRebaseContinueAndAbort(self):
+        repo = self.getRepo()
+        self.record()
+        repo.continuerebase()
+        repo.abortrebase()
+        self.assertEquals([["rebase", "--continue"], ["rebase", "--abort"]], self.connector.executed)
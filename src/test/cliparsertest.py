@@ -0,0 +1,80 @@
+import unittest
+import datetime
+from geogit import cliparser
+from geogit.diff import TYPE_ADDED
+
+LOG_OUTPUT = ["commit 267aafec09e34f289fe9ca9e149ca7f55035bc7a",
+              "tree cb6c689b61459e8adcb1a2ecc5d2d870908d83e9",
+              "parent f32ada21d3dcbc1083dc36265a3fe8c6f61401b8",
+              "parent 02284b8722378a8850e204ffd396bd2f12e3f91f",
+              "author Victor Olaya volaya@boundlessgeo.com 1384817842000 3600000",
+              "committer volaya volaya@boundlessgeo.com 1384817900000 3600000",
+              "message",
+              "\tmerged branch",
+              "\t",
+              "\tsecond paragraph",
+              "",
+              "commit f32ada21d3dcbc1083dc36265a3fe8c6f61401b8",
+              "tree 6c1bc4a5d2bde7c3c85d2a6d8e0e7f4e22f3cb7a",
+              "parent ",
+              "author volaya volaya@boundlessgeo.com 1384817800000 3600000",
+              "committer volaya volaya@boundlessgeo.com 1384817800000 3600000",
+              "message",
+              "\tfirst commit",
+              "changes",
+              "parks/1 0000000000000000000000000000000000000000 6e2ded64426d5368fdb9017be867ee574f1c02cd",
+              ""]
+
+class GeogitCliParserTest(unittest.TestCase):
+
+    def testParseLog(self):
+        commits = list(cliparser.parselog(None, LOG_OUTPUT))
+        self.assertEquals(2, len(commits))
+        commit = commits[0]
+        self.assertEquals("267aafec09e34f289fe9ca9e149ca7f55035bc7a", commit.commitid)
+        self.assertEquals(commit.commitid, commit.ref)
+        self.assertEquals("cb6c689b61459e8adcb1a2ecc5d2d870908d83e9", commit.treeid)
+        self.assertEquals("f32ada21d3dcbc1083dc36265a3fe8c6f61401b8", commit.parent)
+        self.assertEquals(["f32ada21d3dcbc1083dc36265a3fe8c6f61401b8", "02284b8722378a8850e204ffd396bd2f12e3f91f"],
+                          commit.parentids)
+        self.assertEquals("merged branch\n\nsecond paragraph", commit.message)
+        self.assertEquals("Victor Olaya", commit.authorname)
+        self.assertEquals("volaya", commit.commitername)
+        self.assertEquals(datetime.datetime.fromtimestamp(1384817842), commit.authordate)
+        self.assertEquals(datetime.datetime.fromtimestamp(1384817900), commit.commiterdate)
+        self.assertEquals(None, commits[1].parent)
+        self.assertEquals([], commits[1].parentids)
+        self.assertEquals("first commit", commits[1].message)
+
+    def testParseLogWithChanges(self):
+        entries = list(cliparser.parselog(None, LOG_OUTPUT, True))
+        self.assertEquals(2, len(entries))
+        self.assertEquals([], entries[0][1])
+        diffs = entries[1][1]
+        self.assertEquals(1, len(diffs))
+        self.assertEquals("parks/1", diffs[0].path)
+        self.assertEquals(TYPE_ADDED, diffs[0].type())
+
+    def testParseLogWithoutSeparators(self):
+        lines = [line for line in LOG_OUTPUT if line != ""]
+        commits = list(cliparser.parselog(None, lines))
+        self.assertEquals(2, len(commits))
+        self.assertEquals("first commit", commits[1].message)
+
+    def testParseFeatures(self):
+        lines = ["HEAD:parks/1", "6e2ded64426d5368fdb9017be867ee574f1c02cd",
+                 "name", "STRING", "", "open", "BOOLEAN", "true", "area", "DOUBLE", "23876.5", "",
+                 "HEAD:parks/2", "75a0cbf170714fb1b60f0bd80fddeac8fbfb2429",
+                 "name", "STRING", "Central park", "open", "BOOLEAN", "false", "count", "INTEGER", "null"]
+        features = list(cliparser.parsefeatures(lines))
+        self.assertEquals(2, len(features))
+        ref, objectid, attributes = features[0]
+        self.assertEquals("HEAD:parks/1", ref)
+        self.assertEquals("6e2ded64426d5368fdb9017be867ee574f1c02cd", objectid)
+        self.assertEquals(("", "STRING"), attributes["name"])
+        self.assertEquals((True, "BOOLEAN"), attributes["open"])
+        self.assertEquals((23876.5, "DOUBLE"), attributes["area"])
+        attributes = features[1][2]
+        self.assertEquals(("Central park", "STRING"), attributes["name"])
+        self.assertEquals((False, "BOOLEAN"), attributes["open"])
+        self.assertEquals(("null", "INTEGER"), attributes["count"])
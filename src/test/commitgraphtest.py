@@ -0,0 +1,71 @@
+import unittest
+from geogit.repo import Repository
+from geogit.replayconnector import ReplayConnector
+from geogit.commitish import Commitish
+from geogit.commitgraph import CommitGraph
+from geogit.geogitexception import GeoGitException
+import geogit
+
+#a history of 6 commits, the last one merging a branch with the second one
+IDS = ["%040d" % i for i in xrange(7)]
+PARENTS = {IDS[1]: [], IDS[2]: [IDS[1]], IDS[3]: [IDS[2]], IDS[4]: [IDS[3]],
+           IDS[5]: [IDS[2]], IDS[6]: [IDS[4], IDS[5]]}
+ORDER = [IDS[6], IDS[5], IDS[4], IDS[3], IDS[2], IDS[1]]
+
+def revlist(commitid, count):
+    start = ORDER.index(commitid)
+    output = []
+    for commitid in ORDER[start:start + count]:
+        output.append("commit " + commitid)
+        output.append("tree " + "f" * 40)
+        output.extend("parent " + parentid for parentid in PARENTS[commitid])
+        output.extend(["author volaya volaya@boundlessgeo.com 1384817842000 3600000",
+                       "committer volaya volaya@boundlessgeo.com 1384817842000 3600000",
+                       "message", "\tcommit " + commitid[-1], ""])
+    return output
+
+def interactions(pagesize):
+    interactions = [{"command": ["rev-parse", geogit.HEAD], "output": [IDS[6]], "error": False},
+                    {"command": ["diff-tree", IDS[6], IDS[4]], "output": [], "error": False}]
+    for commitid in ORDER:
+        interactions.append({"command": ["rev-list", commitid, "-n", str(pagesize)],
+                             "output": revlist(commitid, pagesize), "error": False})
+    return interactions
+
+class GeogitCommitGraphTest(unittest.TestCase):
+
+    def getRepo(self, pagesize):
+        repo = Repository("replayed", ReplayConnector(interactions(pagesize)))
+        repo.commitgraph = CommitGraph(repo, pagesize)
+        return repo
+
+    def testParents(self):
+        repo = self.getRepo(10)
+        head = Commitish(repo, geogit.HEAD)
+        self.assertEquals([IDS[4], IDS[5]], [c.commitid for c in head.parents()])
+        self.assertEquals(IDS[4], head.parent().commitid)
+        self.assertEquals([IDS[2]], [c.commitid for c in head.parents()[1].parents()])
+        self.assertEquals(None, repo.commitgraph.get(IDS[1]).parent)
+        self.assertEquals([], repo.commitgraph.get(IDS[1]).parents())
+        self.assertEquals(1, repo.commitgraph.pages)
+
+    def testWalkFirstParents(self):
+        repo = self.getRepo(2)
+        commit = Commitish(repo, geogit.HEAD)
+        walked = []
+        while commit is not None:
+            walked.append(commit.commitid)
+            commit = commit.parent()
+        self.assertEquals([IDS[6], IDS[4], IDS[3], IDS[2], IDS[1]], walked)
+        self.assertEquals(walked, [c.commitid for c in repo.commitgraph.firstparents(IDS[6])])
+        self.assertTrue(repo.commitgraph.pages <= 3)
+
+    def testDiffAgainstParent(self):
+        repo = self.getRepo(10)
+        head = Commitish(repo, geogit.HEAD)
+        self.assertEquals([], head.diff())
+        self.assertRaises(GeoGitException, repo.commitgraph.get(IDS[1]).diff)
+
+    def testMissingCommit(self):
+        repo = self.getRepo(10)
+        self.assertRaises(GeoGitException, repo.commitgraph.get, "a" * 40)
@@ -0,0 +1,110 @@
+import unittest
+import os
+import shutil
+import tempfile
+import datetime
+from geogit.repo import Repository
+from geogit.replayconnector import ReplayConnector
+from geogit.dateindex import DateIndex, totimestamp
+import geogit
+
+IDS = ["%040d" % i for i in xrange(8)]
+#seconds since the epoch of the committer date of each commit. The sixth one has an earlier date than the fifth
+DATES = {1: 1000, 2: 2000, 3: 3000, 4: 4000, 5: 5000, 6: 4500, 7: 7000}
+
+def revlist(n, count):
+    output = []
+    for i in xrange(n, max(n - count, 0), -1):
+        output.extend(["commit " + IDS[i], "tree " + "f" * 40, "parent " + (IDS[i - 1] if i > 1 else ""),
+                       "author volaya volaya@boundlessgeo.com %d000 0" % DATES[i],
+                       "committer volaya volaya@boundlessgeo.com %d000 0" % DATES[i],
+                       "message", "\tcommit %d" % i, ""])
+    return output
+
+def interactions(pagesize):
+    interactions = []
+    for i in xrange(1, 8):
+        interactions.append({"command": ["rev-list", IDS[i], "-n", str(pagesize)],
+                             "output": revlist(i, pagesize), "error": False})
+    interactions.append({"command": ["rev-parse", IDS[3] + ":parks/1"], "output": ["a" * 40], "error": False})
+    interactions.append({"command": ["rev-parse", IDS[1] + ":parks/1"], "output": ["Error"], "error": True})
+    return interactions
+
+class GeogitDateIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.url = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.url, ".geogit", "refs", "heads"))
+        with open(os.path.join(self.url, ".geogit", "HEAD"), "w") as f:
+            f.write("ref: refs/heads/master\n")
+        self.settip(4)
+
+    def tearDown(self):
+        shutil.rmtree(self.url, ignore_errors = True)
+
+    def settip(self, n):
+        with open(os.path.join(self.url, ".geogit", "refs", "heads", "master"), "w") as f:
+            f.write(IDS[n] + "\n")
+
+    def getRepo(self, pagesize = 2):
+        repo = Repository(self.url, ReplayConnector(interactions(pagesize)))
+        repo.commitgraph.pagesize = pagesize
+        return repo
+
+    def testTimestamp(self):
+        self.assertEquals(1500, totimestamp(1.5))
+        date = datetime.datetime(2024, 3, 1, 12, 30)
+        self.assertEquals(date, datetime.datetime.fromtimestamp(totimestamp(date) / 1000))
+
+    def testAsOf(self):
+        repo = self.getRepo()
+        self.assertEquals(None, repo.asof(999))
+        self.assertEquals(IDS[1], repo.asof(1000).commitid)
+        self.assertEquals(IDS[2], repo.asof(2999).commitid)
+        self.assertEquals(IDS[4], repo.asof(datetime.datetime.fromtimestamp(10000)).commitid)
+        self.assertEquals(4, len(repo.dateindex()))
+
+    def testPersistentAndIncremental(self):
+        repo = self.getRepo()
+        self.assertEquals(4, repo.dateindex().update())
+        #a new repository object reads the index from its file
+        repo = self.getRepo()
+        index = repo.dateindex()
+        self.assertEquals(IDS[4], index.tip)
+        self.assertEquals(0, index.update())
+        self.assertEquals(0, repo.commitgraph.pages)
+        self.settip(5)
+        self.assertEquals(1, index.update())
+        self.assertEquals(1, repo.commitgraph.pages)
+        self.assertEquals(5, len(DateIndex(repo).dates))
+        #the sixth commit is older than the fifth, so the index is sorted again
+        self.settip(7)
+        self.assertEquals(2, index.update())
+        self.assertEquals([DATES[i] * 1000 for i in (1, 2, 3, 4, 6, 5, 7)], DateIndex(repo).dates)
+        self.assertEquals(IDS[6], repo.asof(4600).commitid)
+
+    def testRewrittenHistory(self):
+        repo = self.getRepo()
+        repo.dateindex().update()
+        self.settip(2)
+        repo.dateindex().update()
+        self.assertEquals(2, len(DateIndex(repo)))
+        self.assertEquals(IDS[2], repo.asof(5000).commitid)
+
+    def testFeatureAsOf(self):
+        repo = self.getRepo()
+        feature = repo.feature(geogit.HEAD, "parks/1")
+        old = feature.asof(3500)
+        self.assertEquals(IDS[3], old.ref)
+        self.assertEquals("a" * 40, old.objectid)
+        self.assertEquals(None, feature.asof(1500))
+
+    def testCommitIdNotPersisted(self):
+        repo = self.getRepo()
+        feature = repo.feature(IDS[4], "parks/1")
+        self.assertEquals(IDS[3], feature.asof(3500).ref)
+        self.assertFalse(repo.dateindex(IDS[4]).persistent)
+        self.assertEquals(4, len(repo.dateindex(IDS[4])))
+        self.assertFalse(os.path.exists(os.path.join(self.url, ".geogit", "geogitpy", "dateindex")))
+        repo.dateindex().update()
+        self.assertTrue(os.path.exists(DateIndex(repo).filename))
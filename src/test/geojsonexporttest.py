@@ -0,0 +1,95 @@
+import unittest
+import json
+from StringIO import StringIO
+from shapely.wkt import loads
+from geogit.repo import Repository
+from geogit.replayconnector import ReplayConnector
+from geogit.tree import Tree
+from geogit import geojsonexport
+import geogit
+
+FEATURE_ID = "%040x" % 1
+
+def feature(ref, name, wkt):
+    return [ref, FEATURE_ID, "name", "STRING", name, "count", "INTEGER", "3", "the_geom", "LINESTRING", wkt]
+
+LINE = "LINESTRING (1.123456789 2.987654321, 3 4)"
+
+INTERACTIONS = [{"command": ["ls-tree", "HEAD:roads", "-v", "-r"],
+                 "output": ["f%s feature %s roads/%d" % ("f" * 39, FEATURE_ID, i) for i in xrange(3)], "error": False},
+                {"command": ["show", "--raw", "HEAD:roads/0", "HEAD:roads/1"],
+                 "output": feature("HEAD:roads/0", "first", LINE) + [""] + feature("HEAD:roads/1", "second", LINE), "error": False},
+                {"command": ["show", "--raw", "HEAD:roads/2"], "output": feature("HEAD:roads/2", "third", LINE), "error": False},
+                {"command": ["diff-tree", "HEAD~1", "HEAD"],
+                 "output": ["roads/0 %s %s" % ("0" * 40, FEATURE_ID), "roads/5 %s %s" % (FEATURE_ID, "0" * 40)],
+                 "error": False},
+                {"command": ["show", "--raw", "HEAD:roads/0", "HEAD~1:roads/5"],
+                 "output": feature("HEAD:roads/0", "added", LINE) + [""] + feature("HEAD~1:roads/5", "removed", LINE), "error": False}]
+
+class GeogitGeoJSONExportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.batchsize = geojsonexport.BATCH_SIZE
+        geojsonexport.BATCH_SIZE = 2
+
+    def tearDown(self):
+        geojsonexport.BATCH_SIZE = self.batchsize
+
+    def getRepo(self):
+        return Repository("replayed", ReplayConnector(INTERACTIONS, strict = True))
+
+    def testExportNDJSON(self):
+        f = StringIO()
+        count = Tree(self.getRepo(), geogit.HEAD, "roads").exportgeojson(f)
+        self.assertEquals(3, count)
+        lines = f.getvalue().splitlines()
+        self.assertEquals(3, len(lines))
+        features = [json.loads(line) for line in lines]
+        self.assertEquals(["roads/0", "roads/1", "roads/2"], [feature["id"] for feature in features])
+        self.assertEquals({"name": "first", "count": 3}, features[0]["properties"])
+        self.assertEquals("LineString", features[0]["geometry"]["type"])
+        self.assertEquals([[1.123456789, 2.987654321], [3, 4]], features[0]["geometry"]["coordinates"])
+
+    def testExportFeatureCollection(self):
+        f = StringIO()
+        self.getRepo().exportgeojson(geogit.HEAD, "roads", f, ndjson = False, precision = 3)
+        collection = json.loads(f.getvalue())
+        self.assertEquals("FeatureCollection", collection["type"])
+        self.assertEquals(3, len(collection["features"]))
+        self.assertEquals([[1.123, 2.988], [3, 4]], collection["features"][2]["geometry"]["coordinates"])
+        self.assertTrue("1.123," in f.getvalue())
+
+    def testExportEmptyFeatureCollection(self):
+        f = StringIO()
+        writer = geojsonexport.GeoJSONWriter(f, ndjson = False)
+        writer.close()
+        self.assertEquals([], json.loads(f.getvalue())["features"])
+
+    def testExportDiff(self):
+        f = StringIO()
+        count = self.getRepo().exportdiffgeojson("HEAD~1", geogit.HEAD, f)
+        self.assertEquals(2, count)
+        features = [json.loads(line) for line in f.getvalue().splitlines()]
+        self.assertEquals(["Added", "Removed"], [feature["change"] for feature in features])
+        self.assertEquals("removed", features[1]["properties"]["name"])
+
+    def testRoundGeometryCollection(self):
+        geom = loads("GEOMETRYCOLLECTION (POINT (1.55 2.44), LINESTRING (0.12 0.34, 5 6))")
+        geometry = geojsonexport.geometryjson(geom, 1)
+        self.assertEquals((1.6, 2.4), geometry["geometries"][0]["coordinates"])
+        self.assertEquals([(0.1, 0.3), (5, 6)], geometry["geometries"][1]["coordinates"])
+
+    def testRoundEmptyGeometries(self):
+        for wkt in ["LINESTRING EMPTY", "POLYGON EMPTY", "MULTIPOINT EMPTY"]:
+            geometry = geojsonexport.geometryjson(loads(wkt), 3)
+            self.assertEquals(0, len(geometry["coordinates"]))
+
+    def testSeveralGeometries(self):
+        data = {"centroid": (loads("POINT (1 1)"), "POINT"), "area": (loads("POINT (2 2)"), "POINT"),
+                "name": ("a", "STRING")}
+        feature = geojsonexport.featurejson("parks/1", data)
+        self.assertEquals((2, 2), tuple(feature["geometry"]["coordinates"]))
+        self.assertEquals("POINT (1 1)", feature["properties"]["centroid"].wkt)
+        feature = geojsonexport.featurejson("parks/1", data, geometryattribute = "centroid")
+        self.assertEquals((1, 1), tuple(feature["geometry"]["coordinates"]))
+        self.assertFalse("centroid" in feature["properties"])
@@ -0,0 +1,109 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from geogit.repo import Repository
+from geogit.replayconnector import ReplayConnector
+from geogit.group import RepositoryGroup
+from geogit.geogitexception import GeoGitException
+import geogit
+
+def revlist(prefix, times):
+    output = []
+    for i, t in enumerate(times):
+        output.append("commit " + prefix * 40)
+        output.append("tree " + "f" * 40)
+        output.extend(["author volaya volaya@boundlessgeo.com %d 0" % t,
+                       "committer volaya volaya@boundlessgeo.com %d 0" % t,
+                       "message", "\t%s_%d" % (prefix, i), ""])
+    return output
+
+def replayed(prefix, times, latency = 0):
+    interactions = [{"command": ["rev-list", geogit.HEAD, "--changed"], "output": revlist(prefix, times), "error": False},
+                    {"command": ["rev-parse", geogit.HEAD], "output": [prefix * 40], "error": False}]
+    return Repository(prefix, ReplayConnector(interactions, latency))
+
+def failing():
+    interactions = [{"command": ["rev-list", geogit.HEAD, "--changed"], "output": ["Repository is corrupt"], "error": True},
+                    {"command": ["rev-parse", geogit.HEAD], "output": ["Repository is corrupt"], "error": True}]
+    return Repository("failing", ReplayConnector(interactions))
+
+class GeogitGroupTest(unittest.TestCase):
+
+    def testNames(self):
+        group = RepositoryGroup([replayed("a", []), replayed("b", [])])
+        self.assertEquals(["a", "b"], group.names())
+        group = RepositoryGroup({"north": replayed("a", [])})
+        self.assertEquals(["north"], group.names())
+
+    def testLogOrderedByDate(self):
+        group = RepositoryGroup({"a": replayed("a", [5000, 3000, 1000]), "b": replayed("b", [6000, 4000, 2000])})
+        stream = group.log()
+        merged = [(name, commit.message) for name, commit in stream]
+        self.assertEquals([("b", "b_0"), ("a", "a_0"), ("b", "b_1"), ("a", "a_1"), ("b", "b_2"), ("a", "a_2")], merged)
+        self.assertEquals({}, stream.errors)
+        self.assertEquals(set(["a", "b"]), set(stream.timings))
+
+    def testStreamErrorIsIsolated(self):
+        group = RepositoryGroup({"a": replayed("a", [5000, 3000]), "failing": failing()})
+        stream = group.log()
+        self.assertEquals(["a_0", "a_1"], [commit.message for name, commit in stream])
+        self.assertEquals(["failing"], stream.errors.keys())
+        self.assertTrue(isinstance(stream.errors["failing"], GeoGitException))
+
+    def testUnorderedStream(self):
+        group = RepositoryGroup({"a": replayed("a", [5000, 3000]), "b": replayed("b", [4000])})
+        items = list(group.stream(lambda repo: repo.iterlog()))
+        self.assertEquals(3, len(items))
+        self.assertEquals(["a_0", "a_1"], [commit.message for name, commit in items if name == "a"])
+
+    def testStopConsumingEarly(self):
+        group = RepositoryGroup({"a": replayed("a", range(10000, 0, -1)), "b": replayed("b", range(10000, 0, -1))})
+        stream = group.stream(lambda repo: repo.iterlog(), buffersize = 2)
+        for i, item in enumerate(stream):
+            if i == 3:
+                break
+        #the producers stop, and record their timings when they do
+        deadline = time.time() + 5
+        while len(stream.timings) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEquals(set(["a", "b"]), set(stream.timings))
+
+    def testIterateAgain(self):
+        group = RepositoryGroup({"a": replayed("a", [5000, 3000]), "failing": failing()})
+        stream = group.log()
+        for item in stream:
+            break
+        self.assertEquals(["a_0", "a_1"], [commit.message for name, commit in stream])
+        self.assertEquals(["failing"], stream.errors.keys())
+        self.assertEquals(2, len(list(stream)))
+
+    def testCall(self):
+        group = RepositoryGroup({"a": replayed("a", []), "b": replayed("b", []), "failing": failing()})
+        results = group.call("revparse", geogit.HEAD)
+        self.assertEquals(["a", "b", "failing"], sorted(results))
+        self.assertEquals("a" * 40, results["a"].value)
+        self.assertEquals("b" * 40, results["b"].value)
+        self.assertFalse(results["failing"].ok)
+        self.assertTrue(isinstance(results["failing"].error, GeoGitException))
+        self.assertTrue(all(result.elapsed >= 0 for result in results.values()))
+
+    def testCallsRunInParallel(self):
+        repos = [replayed(prefix, [], latency = 0.2) for prefix in "abcd"]
+        group = RepositoryGroup(repos, maxconcurrent = 4)
+        start = time.time()
+        results = group.call("revparse", geogit.HEAD)
+        self.assertTrue(time.time() - start < 0.6)
+        self.assertTrue(all(result.ok for result in results.values()))
+        self.assertTrue(all(result.elapsed >= 0.2 for result in results.values()))
+
+    def testExportShpFolder(self):
+        folder = os.path.join(tempfile.mkdtemp(), "exports")
+        try:
+            group = RepositoryGroup({"a": replayed("a", [])})
+            results = group.exportshp(geogit.HEAD, "parks", folder)
+            self.assertTrue(os.path.isdir(folder))
+            self.assertFalse(results["a"].ok)
+        finally:
+            shutil.rmtree(os.path.dirname(folder))
@@ -0,0 +1,28 @@
+import unittest
+import os
+from geogit.repo import Repository
+import geogit
+
+def countfeatures(tree):
+    return len(tree.features())
+
+class GeogitHistoryTest(unittest.TestCase):
+
+    repo = Repository(os.path.join(os.path.dirname(__file__), 'data/testrepo'))
+
+    def testMapHistory(self):
+        log = self.repo.log()
+        results = self.repo.maphistory(geogit.HEAD, "parks", countfeatures, 1)
+        self.assertEquals(len(log), len(results))
+        self.assertEquals(log[0].commitid, results[0][0].commitid)
+        self.assertEquals(5, results[0][1])
+
+    def testMapHistoryInPool(self):
+        self.repo.cleancache()
+        expected = self.repo.maphistory(geogit.HEAD, "parks", countfeatures, 1)
+        self.repo.cleancache()
+        results = self.repo.maphistory(geogit.HEAD, "parks", countfeatures, 2)
+        self.assertEquals([r[1] for r in expected], [r[1] for r in results])
+
+    def testMissingPath(self):
+        self.assertEquals([], self.repo.maphistory(geogit.HEAD, "wrong/path", countfeatures, 1))
@@ -0,0 +1,45 @@
+import unittest
+import os
+import geogit
+from geogit.repo import Repository
+from geogit import instrumentation
+
+class GeogitInstrumentationTest(unittest.TestCase):
+
+    repo = Repository(os.path.join(os.path.dirname(__file__), 'data/testrepo'))
+
+    def testEvents(self):
+        events = []
+        instrumentation.addlistener(events.append)
+        try:
+            self.repo.log()
+        finally:
+            instrumentation.removelistener(events.append)
+        self.assertFalse(instrumentation.enabled())
+        self.assertEquals(1, len(events))
+        event = events[0]
+        self.assertEquals("rev-list", event.name)
+        self.assertEquals("log", event.operation)
+        self.assertEquals(0, event.returncode)
+        self.assertTrue(event.lines > 0)
+        self.assertTrue(event.bytes > 0)
+        self.assertTrue(event.parsetime >= 0)
+
+    def testProfile(self):
+        with instrumentation.profile() as stats:
+            self.repo.log()
+            self.repo.log()
+            self.repo.featuredata(geogit.HEAD, "parks/1")
+        self.assertEquals(2, stats.commands["rev-list"].count)
+        self.assertEquals(1, stats.commands["show"].count)
+        self.assertTrue("rev-list" in stats.report())
+        self.assertFalse(stats in instrumentation._listeners)
+
+    def testHistogram(self):
+        histogram = instrumentation.Histogram()
+        for i in range(1, 101):
+            histogram.add(i / 100.0)
+        self.assertEquals(100, histogram.count)
+        self.assertAlmostEquals(0.505, histogram.mean())
+        self.assertTrue(0.5 <= histogram.percentile(50) < 0.6)
+        self.assertEquals(1.0, histogram.percentile(100))
@@ -0,0 +1,48 @@
+import unittest
+from geogit.listing import Listing, TYPE_TREE, TYPE_FEATURE
+from geogit.feature import Feature
+from geogit.tree import Tree
+
+class GeogitListingTest(unittest.TestCase):
+
+    def getListing(self):
+        listing = Listing(None, "HEAD")
+        listing.add(TYPE_TREE, "parks", "cb6c689b61459e8adcb1a2ecc5d2d870908d83e9")
+        for i in range(1, 6):
+            listing.add(TYPE_FEATURE, "parks/%d" % i, "%040x" % i)
+        listing.add(TYPE_FEATURE, u"roads/main", "%040x" % 10)
+        return listing
+
+    def testSequence(self):
+        listing = self.getListing()
+        self.assertEquals(7, len(listing))
+        self.assertTrue(isinstance(listing[0], Tree))
+        self.assertEquals("parks", listing[0].path)
+        self.assertTrue(isinstance(listing[1], Feature))
+        self.assertEquals("parks/1", listing[1].path)
+        self.assertEquals("HEAD", listing[1].ref)
+        self.assertEquals("roads/main", listing[-1].path)
+        self.assertEquals(["parks/4", "parks/5"], [f.path for f in listing[4:6]])
+        self.assertEquals(7, len(list(listing)))
+        self.assertRaises(IndexError, listing.__getitem__, 7)
+
+    def testObjectIds(self):
+        listing = self.getListing()
+        self.assertEquals("cb6c689b61459e8adcb1a2ecc5d2d870908d83e9", listing.objectid(0))
+        self.assertEquals("%040x" % 10, listing.objectid(-1))
+
+    def testFilter(self):
+        listing = self.getListing()
+        trees = listing.trees()
+        self.assertEquals(1, len(trees))
+        self.assertEquals("parks", trees[0].path)
+        features = listing.features()
+        self.assertEquals(6, len(features))
+        self.assertEquals("parks/1", features[0].path)
+        self.assertEquals("%040x" % 1, features.objectid(0))
+        self.assertEquals(TYPE_FEATURE, features.type(-1))
+        self.assertEquals(["parks/1", "parks/2"], list(features.paths())[:2])
+
+    def testPrefixesAreShared(self):
+        listing = self.getListing()
+        self.assertEquals(3, len(listing._prefixes))
@@ -0,0 +1,88 @@
+import unittest
+import os
+import shutil
+import tempfile
+from StringIO import StringIO
+import geogit
+from geogit.repo import Repository
+from geogit.osmimport import OSMImport, chunks
+from geogit.replayconnector import ReplayConnector
+from geogit.geogitexception import GeoGitException
+
+OSM = '''<?xml version='1.0' encoding='UTF-8'?>
+<osm version="0.6">
+  <bounds minlat="0" minlon="0" maxlat="1" maxlon="1"/>
+  <node id="1" lat="0.1" lon="0.1" version="1"><tag k="amenity" v="cafe"/></node>
+  <node id="2" lat="0.2" lon="0.2" version="1"/>
+  <node id="3" lat="0.3" lon="0.3" version="1"/>
+  <way id="10" version="1"><nd ref="1"/><nd ref="2"/><tag k="highway" v="path"/></way>
+  <way id="11" version="1"><nd ref="2"/><nd ref="3"/></way>
+  <relation id="20" version="1"><member type="way" ref="10" role=""/></relation>
+</osm>
+'''
+
+COMMIT_ID = "267aafec09e34f289fe9ca9e149ca7f55035bc7a"
+
+class GeogitOSMImportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.osmfile = os.path.join(self.folder, "data.osm")
+        with open(self.osmfile, "w") as f:
+            f.write(OSM)
+        self.workdir = self.osmfile + ".import"
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors = True)
+
+    def interactions(self, chunks, failing = None, lastmessage = None):
+        interactions = [{"command": ["rev-parse", geogit.HEAD], "output": [COMMIT_ID], "error": False},
+                        {"command": ["add"], "output": [], "error": False}]
+        for n in chunks:
+            chunkfile = os.path.join(self.workdir, "chunk-%05d.osm" % n)
+            interactions.append({"command": ["osm", "import", chunkfile, "--add"], "output": [], "error": n == failing})
+            interactions.append({"command": ["commit", "-m", "Imported OSM data [chunk %d]" % (n + 1)],
+                                 "output": [], "error": False})
+        if lastmessage is not None:
+            interactions.append({"command": ["rev-list", geogit.HEAD, "--changed"], "error": False,
+                                 "output": ["commit " + COMMIT_ID, "message", "\t" + lastmessage, ""]})
+        return interactions
+
+    def testChunks(self):
+        result = [(entitytype, [e.get("id") for e in elements]) for entitytype, elements in chunks(StringIO(OSM), 2)]
+        self.assertEquals([("node", ["1", "2"]), ("node", ["3"]), ("way", ["10", "11"]), ("relation", ["20"])], result)
+
+    def testImport(self):
+        repo = Repository(self.folder, ReplayConnector(self.interactions(range(4)), strict = False))
+        reports = []
+        progress = OSMImport(repo, self.osmfile, 2, progress = reports.append).run()
+        self.assertEquals(4, progress.chunks)
+        self.assertEquals(6, progress.entities)
+        self.assertEquals(4, len(reports))
+        checkpoint = OSMImport(repo, self.osmfile, 2).checkpoint()
+        self.assertEquals(4, checkpoint["chunks"])
+        self.assertEquals(None, checkpoint["pending"])
+
+    def testWayChunksIncludeNodes(self):
+        repo = Repository(self.folder, ReplayConnector(self.interactions(range(4), failing = 2)))
+        self.assertRaises(GeoGitException, OSMImport(repo, self.osmfile, 2, progress = None).run)
+        with open(os.path.join(self.workdir, "chunk-00002.osm")) as f:
+            content = f.read()
+        self.assertTrue('<node id="1"' in content)
+        self.assertTrue('k="amenity"' in content)
+        self.assertTrue('<node id="3"' in content)
+        self.assertTrue('<way id="11"' in content)
+
+    def testResume(self):
+        repo = Repository(self.folder, ReplayConnector(self.interactions(range(4), failing = 2)))
+        self.assertRaises(GeoGitException, OSMImport(repo, self.osmfile, 2, progress = None).run)
+        checkpoint = OSMImport(repo, self.osmfile, 2).checkpoint()
+        self.assertEquals(2, checkpoint["chunks"])
+        self.assertEquals(2, checkpoint["pending"])
+        #the last commit is the one of the second chunk, so the third one has to be imported again
+        repo = Repository(self.folder, ReplayConnector(self.interactions(range(2, 4), None,
+                                                        "Imported OSM data [chunk 2]"), strict = False))
+        progress = OSMImport(repo, self.osmfile, 2, progress = None).run()
+        self.assertEquals(4, progress.chunks)
+        self.assertEquals(6, progress.entities)
+        self.assertEquals(3, progress.resumed)
@@ -0,0 +1,85 @@
+import unittest
+import os
+import time
+import json
+import tempfile
+import geogit
+from geogit.repo import Repository
+from geogit.replayconnector import ReplayConnector
+from geogit.geogitexception import GeoGitException
+
+LOG_OUTPUT = ["commit 267aafec09e34f289fe9ca9e149ca7f55035bc7a",
+              "tree cb6c689b61459e8adcb1a2ecc5d2d870908d83e9",
+              "parent f32ada21d3dcbc1083dc36265a3fe8c6f61401b8",
+              "author volaya volaya@boundlessgeo.com 1384817842000 3600000",
+              "committer volaya volaya@boundlessgeo.com 1384817842000 3600000",
+              "message",
+              "\tmessage_4",
+              "",
+              "commit f32ada21d3dcbc1083dc36265a3fe8c6f61401b8",
+              "tree 6c1bc4a5d2bde7c3c85d2a6d8e0e7f4e22f3cb7a",
+              "parent ",
+              "author volaya volaya@boundlessgeo.com 1384817800000 3600000",
+              "committer volaya volaya@boundlessgeo.com 1384817800000 3600000",
+              "message",
+              "\tmessage_3",
+              ""]
+
+FEATURE_OUTPUT = ["HEAD:parks/1",
+                  "6e2ded64426d5368fdb9017be867ee574f1c02cd",
+                  "usage", "STRING", "Public",
+                  "area", "DOUBLE", "23876.5"]
+
+INTERACTIONS = [{"command": ["rev-list", "HEAD", "--changed"], "output": LOG_OUTPUT, "error": False},
+                {"command": ["show", "--raw", "HEAD:parks/1"], "output": FEATURE_OUTPUT, "error": False},
+                {"command": ["show", "--raw", "HEAD:wrong/path"], "output": ["Error: wrong path"], "error": True},
+                {"call": "head", "result": "master"}]
+
+class GeogitReplayConnectorTest(unittest.TestCase):
+
+    def getRepo(self, **kwargs):
+        return Repository("replayed", ReplayConnector(INTERACTIONS, **kwargs))
+
+    def testLog(self):
+        log = self.getRepo().log()
+        self.assertEquals(2, len(log))
+        self.assertEquals("message_4", log[0].message)
+        self.assertEquals("f32ada21d3dcbc1083dc36265a3fe8c6f61401b8", log[0].parent)
+        self.assertEquals(None, log[1].parent)
+
+    def testFeatureData(self):
+        data = self.getRepo().featuredata(geogit.HEAD, "parks/1")
+        self.assertEquals(2, len(data))
+        self.assertEquals(("Public", "STRING"), data["usage"])
+        self.assertEquals((23876.5, "DOUBLE"), data["area"])
+
+    def testRecordedError(self):
+        self.assertRaises(GeoGitException, self.getRepo().featuredata, geogit.HEAD, "wrong/path")
+
+    def testNotRecorded(self):
+        self.assertRaises(GeoGitException, self.getRepo().featuredata, geogit.HEAD, "parks/2")
+
+    def testHead(self):
+        self.assertEquals("master", self.getRepo().head().ref)
+
+    def testStrict(self):
+        repo = self.getRepo(strict = True)
+        repo.log()
+        self.assertRaises(GeoGitException, repo.log)
+
+    def testLatency(self):
+        repo = self.getRepo(latency = 0.1)
+        start = time.time()
+        repo.log()
+        repo.log()
+        self.assertTrue(time.time() - start >= 0.2)
+
+    def testRecordingFile(self):
+        f = tempfile.NamedTemporaryFile(suffix = ".json", delete = False)
+        json.dump({"version": 1, "url": "replayed", "interactions": INTERACTIONS}, f)
+        f.close()
+        try:
+            repo = Repository("replayed", ReplayConnector(f.name))
+            self.assertEquals(2, len(repo.log()))
+        finally:
+            os.remove(f.name)
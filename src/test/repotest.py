@@ -18,6 +18,10 @@ class GeogitRepositoryTest(unittest.TestCase):
         return os.path.join(os.path.dirname(__file__), "temp", str(time.time())).replace('\\', '/')
 
 
+    def tearDown(self):
+        #removes the repositories and files created by the test
+        shutil.rmtree(os.path.join(os.path.dirname(__file__), "temp"), ignore_errors = True)
+
     def getClonedRepo(self):
         src = self.repo.url
         dst = self.getTempRepoPath()
@@ -0,0 +1,97 @@
+import unittest
+import json
+from wsgiref.util import setup_testing_defaults
+from geogit.repo import Repository
+from geogit.replayconnector import ReplayConnector
+from geogit.server import RepositoryApp, IMMUTABLE_CACHE_CONTROL, MUTABLE_CACHE_CONTROL
+import geogit
+
+COMMIT_ID = "267aafec09e34f289fe9ca9e149ca7f55035bc7a"
+PARENT_ID = "f32ada21d3dcbc1083dc36265a3fe8c6f61401b8"
+FEATURE_ID = "6e2ded64426d5368fdb9017be867ee574f1c02cd"
+
+LOG_OUTPUT = ["commit " + COMMIT_ID, "tree cb6c689b61459e8adcb1a2ecc5d2d870908d83e9", "parent " + PARENT_ID,
+              "author volaya volaya@boundlessgeo.com 1384817842000 3600000",
+              "committer volaya volaya@boundlessgeo.com 1384817900000 3600000",
+              "message", "\tsecond commit", "",
+              "commit " + PARENT_ID, "tree 6c1bc4a5d2bde7c3c85d2a6d8e0e7f4e22f3cb7a", "parent ",
+              "author volaya volaya@boundlessgeo.com 1384817800000 3600000",
+              "committer volaya volaya@boundlessgeo.com 1384817800000 3600000",
+              "message", "\tfirst commit", ""]
+
+FEATURE_OUTPUT = [COMMIT_ID + ":parks/1", FEATURE_ID,
+                  "usage", "STRING", "Public",
+                  "the_geom", "POINT", "POINT (1 2)"]
+
+INTERACTIONS = [{"command": ["rev-list", COMMIT_ID, "--changed"], "output": LOG_OUTPUT, "error": False},
+                {"command": ["rev-parse", "master"], "output": [COMMIT_ID], "error": False},
+                {"command": ["rev-parse", "master"], "output": [COMMIT_ID], "error": False},
+                {"command": ["rev-parse", "wrong"], "output": ["Cannot resolve"], "error": True},
+                {"command": ["show", "--raw", COMMIT_ID + ":parks/1"], "output": FEATURE_OUTPUT, "error": False},
+                {"command": ["ls-tree", COMMIT_ID + ":parks", "-v"],
+                 "output": ["a1f2dca1d6a6ef0b55f5ac7d3f9cea1e3ee1e3b0 feature %s parks/1 1,2,1,2" % FEATURE_ID],
+                 "error": False},
+                {"command": ["diff-tree", PARENT_ID, COMMIT_ID],
+                 "output": ["parks/1 0000000000000000000000000000000000000000 " + FEATURE_ID], "error": False}]
+
+class GeogitServerTest(unittest.TestCase):
+
+    def getApp(self):
+        return RepositoryApp(Repository("replayed", ReplayConnector(INTERACTIONS, strict = True)))
+
+    def request(self, app, path, query = "", headers = {}):
+        environ = {"PATH_INFO": path, "QUERY_STRING": query}
+        environ.update(headers)
+        setup_testing_defaults(environ)
+        response = {}
+        def start_response(status, headers):
+            response["status"] = status
+            response["headers"] = dict(headers)
+        body = "".join(app(environ, start_response))
+        return response["status"], response["headers"], body
+
+    def testLog(self):
+        status, headers, body = self.request(self.getApp(), "/log", "ref=" + COMMIT_ID)
+        self.assertEquals("200 OK", status)
+        self.assertEquals("application/x-ndjson", headers["Content-Type"])
+        self.assertEquals(IMMUTABLE_CACHE_CONTROL, headers["Cache-Control"])
+        commits = [json.loads(line) for line in body.splitlines()]
+        self.assertEquals([COMMIT_ID, PARENT_ID], [c["id"] for c in commits])
+        self.assertEquals([PARENT_ID], commits[0]["parents"])
+        self.assertEquals(1384817900000, commits[0]["commiterdate"])
+
+    def testCachedResponse(self):
+        app = self.getApp()
+        first = self.request(app, "/log", "ref=" + COMMIT_ID)
+        #rev-list can only be replayed once, so the second response comes from the cache of the server
+        second = self.request(app, "/log", "ref=" + COMMIT_ID)
+        self.assertEquals(first[2], second[2])
+        self.assertEquals(first[1]["ETag"], second[1]["ETag"])
+
+    def testNotModified(self):
+        app = self.getApp()
+        status, headers, body = self.request(app, "/featuredata", "ref=master&path=parks/1")
+        self.assertEquals(MUTABLE_CACHE_CONTROL, headers["Cache-Control"])
+        data = json.loads(body)
+        self.assertEquals(["Public", "STRING"], data["usage"])
+        self.assertEquals("POINT (1 2)", data["the_geom"][0])
+        #master is resolved again, but the feature is not retrieved again
+        status, headers, body = self.request(app, "/featuredata", "ref=master&path=parks/1",
+                                             {"HTTP_IF_NONE_MATCH": headers["ETag"]})
+        self.assertEquals("304 Not Modified", status)
+        self.assertEquals("", body)
+
+    def testChildrenAndDiff(self):
+        app = self.getApp()
+        status, headers, body = self.request(app, "/children", "ref=%s&path=parks" % COMMIT_ID)
+        entry = json.loads(body.splitlines()[0])
+        self.assertEquals({"path": "parks/1", "type": "feature", "id": FEATURE_ID, "bbox": [1, 2, 1, 2]}, entry)
+        status, headers, body = self.request(app, "/diff", "refa=%s&refb=%s" % (PARENT_ID, COMMIT_ID))
+        self.assertEquals("Added", json.loads(body)["type"])
+
+    def testErrors(self):
+        app = self.getApp()
+        self.assertEquals("404 Not Found", self.request(app, "/log", "ref=wrong")[0])
+        self.assertEquals("404 Not Found", self.request(app, "/unknown")[0])
+        self.assertEquals("400 Bad Request", self.request(app, "/featuredata", "ref=" + COMMIT_ID)[0])
+        self.assertEquals("405 Method Not Allowed", self.request(app, "/log", "", {"REQUEST_METHOD": "POST"})[0])
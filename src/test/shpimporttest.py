@@ -0,0 +1,49 @@
+import unittest
+import os
+import time
+import shutil
+from geogit.repo import Repository
+from geogit.shpimport import hashshapefile
+import geogit
+
+class GeogitShpImportTest(unittest.TestCase):
+
+    repo = Repository(os.path.join(os.path.dirname(__file__), 'data/testrepo'))
+
+    def getTempRepoPath(self):
+        return os.path.join(os.path.dirname(__file__), "temp", str(time.time())).replace('\\', '/')
+
+    def tearDown(self):
+        #removes the repositories and files created by the test
+        shutil.rmtree(os.path.join(os.path.dirname(__file__), "temp"), ignore_errors = True)
+
+    def getClonedRepo(self):
+        src = self.repo.url
+        dst = self.getTempRepoPath()
+        shutil.copytree(src, dst)
+        return Repository(dst)
+
+    def getShapefile(self, version):
+        return os.path.join(os.path.dirname(__file__), "data", "shp", str(version), "parks.shp")
+
+    def testHashShapefile(self):
+        hashes = hashshapefile(self.getShapefile(1))
+        self.assertEquals(set([".shp", ".dbf", ".prj"]), set(hashes))
+        self.assertEquals(hashes, hashshapefile(self.getShapefile(1)))
+        self.assertNotEquals(hashes[".dbf"], hashshapefile(self.getShapefile(5))[".dbf"])
+        self.assertEquals(None, hashshapefile("wrong/path.shp")[".shp"])
+
+    def testSkipUnchanged(self):
+        repo = self.getClonedRepo()
+        summary = repo.importshpchanges(self.getShapefile(4))
+        self.assertFalse(summary.skipped)
+        summary = repo.importshpchanges(self.getShapefile(4))
+        self.assertTrue(summary.skipped)
+
+    def testStageOnlyChanges(self):
+        repo = self.getClonedRepo()
+        summary = repo.importshpchanges(self.getShapefile(5))
+        self.assertFalse(summary.skipped)
+        self.assertEquals(sorted(summary.added + summary.modified + summary.removed),
+                          sorted(d.path for d in repo.staged()))
+        self.assertFalse(repo.unstaged())
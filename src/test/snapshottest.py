@@ -0,0 +1,90 @@
+import unittest
+import os
+import time
+import shutil
+import tempfile
+from shapely.wkt import loads
+from geogit.snapshot import SnapshotStore, DEFAULT_FOLDER
+from geogit.userfolder import USER_FOLDER, makeuserfolder
+from geogit import userfolder
+from geogit.listing import Listing
+
+TREE_ID = "cb6c689b61459e8adcb1a2ecc5d2d870908d83e9"
+
+ROWS = [("parks/1", "%040x" % 1, {"name": (u"Central \xe1", "STRING"), "area": (23876.5, "DOUBLE"),
+                                  "count": (3, "INTEGER"), "public": (True, "BOOLEAN"),
+                                  "the_geom": (loads("POINT (1 2)"), "POINT")}),
+        ("parks/2", "%040x" % 2, {"name": (u"North", "STRING"), "area": (12, "DOUBLE"),
+                                  "count": ("unknown", "INTEGER"), "public": (False, "BOOLEAN")}),
+        ("parks/sub/3", "%040x" % 3, {"name": (u"South", "STRING")})]
+
+class GeogitSnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.store = SnapshotStore(self.folder)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors = True)
+
+    def testRoundTrip(self):
+        snapshot = self.store.put(TREE_ID, ROWS)
+        self.assertEquals(3, len(snapshot))
+        self.assertEquals("parks/sub/3", snapshot.path(2))
+        self.assertEquals("%040x" % 2, snapshot.objectid(1))
+        data = snapshot.featuredata(0)
+        self.assertEquals((u"Central \xe1", "STRING"), data["name"])
+        self.assertEquals((23876.5, "DOUBLE"), data["area"])
+        self.assertEquals((3, "INTEGER"), data["count"])
+        self.assertEquals((True, "BOOLEAN"), data["public"])
+        self.assertEquals(loads("POINT (1 2)").wkt, data["the_geom"][0].wkt)
+        data = snapshot.featuredata(1)
+        self.assertEquals("unknown", data["count"][0])
+        self.assertFalse("the_geom" in data)
+        self.assertEquals(set(["name"]), set(snapshot.featuredata(2)))
+        self.assertEquals([23876.5, 12.0, None], list(snapshot.column("area")))
+
+    def testGet(self):
+        self.assertEquals(None, self.store.get(TREE_ID))
+        self.store.put(TREE_ID, ROWS)
+        snapshot = SnapshotStore(self.folder).get(TREE_ID)
+        self.assertEquals(3, len(snapshot))
+
+    def testListing(self):
+        snapshot = self.store.put(TREE_ID, ROWS)
+        listing = snapshot.listing(None, "HEAD", "parks")
+        self.assertEquals(2, len(listing))
+        self.assertEquals("North", listing[1].attributes()["name"])
+        self.assertEquals(3, len(snapshot.listing(None, "HEAD", "parks", True)))
+
+    def testEviction(self):
+        self.store.put("%040x" % 1, ROWS)
+        size = self.store.size()
+        old = time.time() - 100
+        os.utime(self.store.filename("%040x" % 1), (old, old))
+        self.store.maxsize = size * 2
+        self.store.put("%040x" % 2, ROWS)
+        self.store.put("%040x" % 3, ROWS)
+        self.assertEquals(None, self.store.get("%040x" % 1))
+        self.assertNotEquals(None, self.store.get("%040x" % 3))
+        self.assertTrue(self.store.size() <= size * 2)
+
+    def testSnapshotBiggerThanStore(self):
+        self.store.put("%040x" % 1, ROWS)
+        self.store.maxsize = 1
+        snapshot = self.store.put(TREE_ID, ROWS)
+        self.assertEquals(3, len(snapshot))
+        self.assertEquals(None, self.store.get("%040x" % 1))
+        self.assertNotEquals(None, self.store.get(TREE_ID))
+
+    def testDefaultFolderIsPrivate(self):
+        self.assertTrue(DEFAULT_FOLDER.startswith(USER_FOLDER))
+        folder = os.path.join(self.folder, "private", "snapshots")
+        makeuserfolder(folder)
+        self.assertEquals(0700, os.stat(folder).st_mode & 0777)
+        getuid = userfolder.os.getuid
+        userfolder.os.getuid = lambda: getuid() + 1
+        try:
+            self.assertRaises(OSError, makeuserfolder, folder)
+        finally:
+            userfolder.os.getuid = getuid
@@ -0,0 +1,59 @@
+import unittest
+from geogit.repo import Repository
+from geogit.replayconnector import ReplayConnector
+from geogit.cliconnector import batches
+from geogit.geogitexception import GeoGitException
+import geogit
+
+OLD_ID = "0" * 40
+NEW_ID = "1" * 40
+
+def diffoutput(paths):
+    return ["%s %s %s" % (path, OLD_ID, NEW_ID) for path in paths]
+
+PARKS = ["parks/%d" % i for i in xrange(2500)]
+ROADS = ["roads/%d" % i for i in xrange(10)]
+
+class GeogitStagingTest(unittest.TestCase):
+
+    def interactions(self, staged = [], unstaged = []):
+        interactions = [{"command": ["diff-tree", geogit.HEAD, geogit.STAGE_HEAD], "output": diffoutput(staged), "error": False},
+                        {"command": ["diff-tree", geogit.STAGE_HEAD, geogit.WORK_HEAD], "output": diffoutput(unstaged), "error": False},
+                        {"command": ["commit", "-m", "message"], "output": [], "error": False},
+                        {"command": ["commit", "-m", "message"] + ROADS, "output": [], "error": False}]
+        for batch in batches(PARKS):
+            interactions.append({"command": ["add"] + batch, "output": [], "error": False})
+        interactions.append({"command": ["add"] + ROADS, "output": [], "error": False})
+        return interactions
+
+    def testBatches(self):
+        self.assertEquals([["a", "b"], ["c"]], list(batches(["a", "b", "c"], maxcount = 2)))
+        self.assertEquals([["aa", "bb"], ["cc"]], list(batches(["aa", "bb", "cc"], maxlength = 7)))
+        self.assertEquals([["a"], ["toolong"], ["b"]], list(batches(["a", "toolong", "b"], maxlength = 4)))
+        self.assertEquals([], list(batches([])))
+
+    def testAddInBatches(self):
+        repo = Repository("replayed", ReplayConnector(self.interactions(), strict = True))
+        reports = []
+        repo.add(PARKS, lambda added, total: reports.append((added, total)))
+        self.assertEquals([(1000, 2500), (2000, 2500), (2500, 2500)], reports)
+
+    def testAddFiltered(self):
+        repo = Repository("replayed", ReplayConnector(self.interactions(unstaged = PARKS + ROADS), strict = True))
+        entries = repo.addfiltered(lambda d: d.path.startswith("roads/"))
+        self.assertEquals(ROADS, [d.path for d in entries])
+
+    def testCommitManyPaths(self):
+        repo = Repository("replayed", ReplayConnector(self.interactions(staged = PARKS, unstaged = PARKS + ROADS)))
+        entries = repo.commitfiltered("message", lambda d: d.path.startswith("parks/"))
+        self.assertEquals(2500, len(entries))
+
+    def testCommitManyPathsWithOtherChangesStaged(self):
+        repo = Repository("replayed", ReplayConnector(self.interactions(staged = PARKS + ROADS)))
+        self.assertRaises(GeoGitException, repo.commit, "message", PARKS)
+        repo.commit("message", ["parks", "roads"] + PARKS[:1500])
+        self.assertRaises(GeoGitException, repo.commit, "message", ["park"] + PARKS[:1500])
+
+    def testCommitFewPaths(self):
+        repo = Repository("replayed", ReplayConnector(self.interactions(staged = PARKS + ROADS)))
+        repo.commit("message", ROADS)
@@ -0,0 +1,29 @@
+import unittest
+import os
+import sys
+import subprocess
+import geogit
+from geogit import DEFERRED_MODULES
+
+SCRIPT = """
+import sys
+from geogit.repo import Repository
+print " ".join(sorted(set(name.split(".")[0] for name in sys.modules)))
+"""
+
+class GeogitStartupTest(unittest.TestCase):
+
+    def loaded(self, script):
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.path.dirname(os.path.dirname(os.path.abspath(geogit.__file__)))
+        return subprocess.check_output([sys.executable, "-c", script], env = env).split()
+
+    def testDeferredModules(self):
+        loaded = self.loaded(SCRIPT)
+        self.assertTrue("geogit" in loaded)
+        self.assertEquals([], [name for name in DEFERRED_MODULES if name in loaded])
+
+    def testGeometriesStillParsed(self):
+        from geogit import cliparser
+        self.assertEquals("POINT (1 2)", cliparser.valuefromstring("POINT (1 2)", "POINT").wkt)
+        self.assertEquals("wrong", cliparser.valuefromstring("wrong", "POINT"))
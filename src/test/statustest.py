@@ -0,0 +1,86 @@
+import unittest
+import os
+import shutil
+import tempfile
+from geogit.repo import Repository
+from geogit.replayconnector import ReplayConnector
+from geogit.status import readheads, compose
+from geogit.diff import Diffentry, NULL_ID
+import geogit
+
+HEAD_ID = "267aafec09e34f289fe9ca9e149ca7f55035bc7a"
+TREE_ID = "cb6c689b61459e8adcb1a2ecc5d2d870908d83e9"
+WORK_ID = "f32ada21d3dcbc1083dc36265a3fe8c6f61401b8"
+OLD_ID = "1" * 40
+STAGED_ID = "2" * 40
+WORK_FEATURE_ID = "3" * 40
+
+INTERACTIONS = [{"command": ["diff-tree", geogit.HEAD, geogit.STAGE_HEAD], "error": False,
+                 "output": ["parks/1 %s %s" % (OLD_ID, STAGED_ID), "parks/2 %s %s" % (NULL_ID, STAGED_ID)]},
+                {"command": ["diff-tree", geogit.STAGE_HEAD, geogit.WORK_HEAD], "error": False,
+                 "output": ["parks/1 %s %s" % (STAGED_ID, OLD_ID), "parks/3 %s %s" % (OLD_ID, WORK_FEATURE_ID)]},
+                {"call": "ismerging", "result": False},
+                {"call": "isrebasing", "result": False}]
+
+class GeogitStatusTest(unittest.TestCase):
+
+    def setUp(self):
+        self.url = tempfile.mkdtemp()
+        folder = os.path.join(self.url, ".geogit")
+        os.makedirs(os.path.join(folder, "refs", "heads"))
+        self.write("HEAD", "ref: refs/heads/master")
+        self.write("refs/heads/master", HEAD_ID)
+        self.write("STAGE_HEAD", TREE_ID)
+        self.write("WORK_HEAD", WORK_ID)
+
+    def tearDown(self):
+        shutil.rmtree(self.url, ignore_errors = True)
+
+    def write(self, name, content):
+        with open(os.path.join(self.url, ".geogit", *name.split("/")), "w") as f:
+            f.write(content + "\n")
+
+    def getRepo(self):
+        return Repository(self.url, ReplayConnector(INTERACTIONS, strict = True))
+
+    def testReadHeads(self):
+        self.assertEquals(("master", HEAD_ID, TREE_ID, WORK_ID, None), readheads(self.url))
+        self.write("HEAD", HEAD_ID)
+        self.assertEquals((None, HEAD_ID, TREE_ID, WORK_ID, None), readheads(self.url))
+
+    def testCompose(self):
+        first = [Diffentry(None, OLD_ID, STAGED_ID, "a"), Diffentry(None, NULL_ID, STAGED_ID, "b")]
+        second = [Diffentry(None, STAGED_ID, OLD_ID, "a"), Diffentry(None, STAGED_ID, NULL_ID, "b"),
+                  Diffentry(None, OLD_ID, STAGED_ID, "c")]
+        self.assertEquals([("c", OLD_ID, STAGED_ID)], [(d.path, d.oldref, d.newref) for d in compose(None, first, second)])
+
+    def testStatus(self):
+        repo = self.getRepo()
+        status = repo.status()
+        self.assertEquals("master", status.branch)
+        self.assertEquals(["parks/1", "parks/2"], [d.path for d in status.staged])
+        self.assertEquals(["parks/1", "parks/3"], [d.path for d in status.unstaged])
+        self.assertEquals(["parks/2", "parks/3"], [d.path for d in status.notindatabase])
+        self.assertEquals({}, status.conflicts)
+        self.assertFalse(status.isclean())
+
+    def testCachedStatusNotShared(self):
+        repo = self.getRepo()
+        status = repo.status()
+        status.staged.pop()
+        status.conflicts["parks/1"] = None
+        status = repo.status()
+        self.assertEquals(["parks/1", "parks/2"], [d.path for d in status.staged])
+        self.assertEquals({}, status.conflicts)
+
+    def testCachedUntilHeadsMove(self):
+        repo = self.getRepo()
+        status = repo.status()
+        #the replay connector is strict, so running any command again would fail
+        self.assertEquals(["parks/1", "parks/2"], [d.path for d in repo.status().staged])
+        self.write("STAGE_HEAD", WORK_ID)
+        repo.connector = ReplayConnector(INTERACTIONS[:1] + INTERACTIONS[2:], strict = True)
+        repo.connector.setRepository(repo)
+        status = repo.status()
+        self.assertEquals([], status.unstaged)
+        self.assertEquals(2, len(status.staged))
@@ -12,6 +12,30 @@ from repotest import GeogitRepositoryTest
 from treetest import GeogitTreeTest
 from featuretest import GeogitFeatureTest
 from commitishtest import GeogitCommitishTest
+from asyncrepotest import GeogitAsyncRepositoryTest
+from instrumentationtest import GeogitInstrumentationTest
+from replayconnectortest import GeogitReplayConnectorTest
+from cliparsertest import GeogitCliParserTest
+from listingtest import GeogitListingTest
+from cachetest import GeogitCacheTest
+from treedifftest import GeogitTreeDiffTest
+from historytest import GeogitHistoryTest
+from snapshottest import GeogitSnapshotTest
+from tilestest import GeogitTilesTest, GeogitTilePyramidTest
+from osmimporttest import GeogitOSMImportTest
+from shpimporttest import GeogitShpImportTest
+from stagingtest import GeogitStagingTest
+from commitgraphtest import GeogitCommitGraphTest
+from statustest import GeogitStatusTest
+from dateindextest import GeogitDateIndexTest
+from servertest import GeogitServerTest
+from cachedaemontest import GeogitCacheDaemonTest
+from watchertest import GeogitWatcherTest
+from grouptest import GeogitGroupTest
+from geojsonexporttest import GeogitGeoJSONExportTest
+from cherrypicktest import GeogitCherryPickTest
+from changestatstest import GeogitChangeStatsTest
+from startuptest import GeogitStartupTest
 
 def getTempRepoPath():
     return os.path.join(os.path.dirname(__file__), "temp", str(time.time())).replace('\\', '/')
@@ -43,6 +67,31 @@ def suite():
     suite.addTests(unittest.makeSuite(GeogitRepositoryTest, 'test'))
     suite.addTests(unittest.makeSuite(GeogitFeatureTest, 'test'))
     suite.addTests(unittest.makeSuite(GeogitCommitishTest, 'test'))
+    suite.addTests(unittest.makeSuite(GeogitAsyncRepositoryTest, 'test'))
+    suite.addTests(unittest.makeSuite(GeogitInstrumentationTest, 'test'))
+    suite.addTests(unittest.makeSuite(GeogitReplayConnectorTest, 'test'))
+    suite.addTests(unittest.makeSuite(GeogitCliParserTest, 'test'))
+    suite.addTests(unittest.makeSuite(GeogitListingTest, 'test'))
+    suite.addTests(unittest.makeSuite(GeogitCacheTest, 'test'))
+    suite.addTests(unittest.makeSuite(GeogitTreeDiffTest, 'test'))
+    suite.addTests(unittest.makeSuite(GeogitHistoryTest, 'test'))
+    suite.addTests(unittest.makeSuite(GeogitSnapshotTest, 'test'))
+    suite.addTests(unittest.makeSuite(GeogitTilesTest, 'test'))
+    suite.addTests(unittest.makeSuite(GeogitTilePyramidTest, 'test'))
+    suite.addTests(unittest.makeSuite(GeogitOSMImportTest, 'test'))
+    suite.addTests(unittest.makeSuite(GeogitShpImportTest, 'test'))
+    suite.addTests(unittest.makeSuite(GeogitStagingTest, 'test'))
+    suite.addTests(unittest.makeSuite(GeogitCommitGraphTest, 'test'))
+    suite.addTests(unittest.makeSuite(GeogitStatusTest, 'test'))
+    suite.addTests(unittest.makeSuite(GeogitDateIndexTest, 'test'))
+    suite.addTests(unittest.makeSuite(GeogitServerTest, 'test'))
+    suite.addTests(unittest.makeSuite(GeogitCacheDaemonTest, 'test'))
+    suite.addTests(unittest.makeSuite(GeogitWatcherTest, 'test'))
+    suite.addTests(unittest.makeSuite(GeogitGroupTest, 'test'))
+    suite.addTests(unittest.makeSuite(GeogitGeoJSONExportTest, 'test'))
+    suite.addTests(unittest.makeSuite(GeogitCherryPickTest, 'test'))
+    suite.addTests(unittest.makeSuite(GeogitChangeStatsTest, 'test'))
+    suite.addTests(unittest.makeSuite(GeogitStartupTest, 'test'))
     return suite
    
 
@@ -0,0 +1,144 @@
+import unittest
+import os
+import shutil
+import tempfile
+from shapely.geometry import Point, LineString, Polygon
+from geogit.repo import Repository
+from geogit.replayconnector import ReplayConnector
+from geogit.snapshot import SnapshotStore
+from geogit.tiles import (GridIndex, TileLayer, TilePyramid, encodegeometry, lonlattotile, tilebounds, tilerange,
+                          GEOM_POINT, GEOM_LINESTRING, GEOM_POLYGON)
+
+OLD, NEW = "1" * 40, "2" * 40
+OLDTREE, NEWTREE = "3" * 40, "4" * 40
+FEATURE_IDS = dict((n, "%040d" % n) for n in xrange(1, 5))
+
+def row(n, lon, lat, objectid = None):
+    return ("parks/%d" % n, objectid or FEATURE_IDS[n], {"name": (u"park %d" % n, "STRING"),
+                                                         "the_geom": (Point(lon, lat), "POINT")})
+
+#between the two commits, parks/1 is moved, parks/3 is added and parks/2 is not changed.
+#At zoom 2, parks/1 is in tile 2/1, parks/2 in 3/1 and parks/3 in 0/2, away from the borders of those tiles
+OLD_ROWS = [row(1, 45, 30), row(2, 135, 60)]
+NEW_ROWS = [row(1, 46, 31, FEATURE_IDS[4]), row(2, 135, 60), row(3, -135, -60)]
+
+def lstree(ref, lines):
+    return {"command": ["ls-tree", ref, "-v"], "output": lines, "error": False}
+
+INTERACTIONS = [{"command": ["rev-parse", "old"], "output": [OLD], "error": False},
+                {"command": ["rev-parse", "new"], "output": [NEW], "error": False},
+                {"command": ["rev-parse", OLD], "output": [OLD], "error": False},
+                {"command": ["rev-parse", NEW], "output": [NEW], "error": False},
+                {"command": ["rev-parse", OLD + ":parks"], "output": [OLDTREE], "error": False},
+                {"command": ["rev-parse", NEW + ":parks"], "output": [NEWTREE], "error": False},
+                lstree(OLD, ["%s tree %s parks" % ("f" * 40, OLDTREE)]),
+                lstree(NEW, ["%s tree %s parks" % ("f" * 40, NEWTREE)]),
+                lstree(OLD + ":parks", ["%s feature %s %s" % ("f" * 40, r[1], r[0]) for r in OLD_ROWS]),
+                lstree(NEW + ":parks", ["%s feature %s %s" % ("f" * 40, r[1], r[0]) for r in NEW_ROWS])]
+
+class GeogitTilesTest(unittest.TestCase):
+
+    def testEncodePoint(self):
+        #example from the vector tile specification
+        self.assertEquals((GEOM_POINT, [9, 50, 34]), encodegeometry(Point(25, 17)))
+
+    def testEncodeLineString(self):
+        #example from the vector tile specification
+        geomtype, commands = encodegeometry(LineString([(2, 2), (2, 10), (10, 10)]))
+        self.assertEquals(GEOM_LINESTRING, geomtype)
+        self.assertEquals([9, 4, 4, 18, 0, 16, 16, 0], commands)
+
+    def testEncodePolygon(self):
+        #example from the vector tile specification, with the ring in the opposite orientation
+        geomtype, commands = encodegeometry(Polygon([(3, 6), (20, 34), (8, 12), (3, 6)]))
+        self.assertEquals(GEOM_POLYGON, geomtype)
+        self.assertEquals([9, 6, 12, 18, 10, 12, 24, 44, 15], commands)
+
+    def testDegenerateGeometries(self):
+        self.assertEquals(None, encodegeometry(LineString([(0.1, 0.1), (0.2, 0.2)])))
+        self.assertEquals(None, encodegeometry(Polygon([(0, 0), (0.1, 0), (0.1, 0.1), (0, 0)])))
+
+    def testTileLayer(self):
+        layer = TileLayer("parks")
+        self.assertTrue(layer.add(Point(1, 1), {"name": "a", "area": 1.5, "open": True}, 1))
+        self.assertTrue(layer.add(Point(2, 2), {"name": "a", "area": 3}))
+        self.assertFalse(layer.add(Point(1, 1).buffer(1).difference(Point(1, 1).buffer(2)), {}))
+        self.assertEquals(2, len(layer.features))
+        self.assertEquals(3, len(layer._keys))
+        self.assertEquals(4, len(layer._values))
+        data = layer.encode()
+        self.assertEquals("\x1a", data[0])
+        self.assertTrue("parks" in data)
+
+    def testTileCoordinates(self):
+        self.assertEquals((0.5, 0.5), lonlattotile(0, 0, 0))
+        self.assertEquals((0, 0, 0, 0), tilerange((-10, -10, 10, 10), 0))
+        self.assertEquals((1, 1, 2, 2), tilerange((-10, -10, 10, 10), 2))
+        minlon, minlat, maxlon, maxlat = tilebounds(1, 1, 0)
+        self.assertEquals((0, 180), (minlon, maxlon))
+        self.assertAlmostEquals(0, minlat)
+        self.assertAlmostEquals(85.0511, maxlat, 4)
+
+    def testGridIndex(self):
+        index = GridIndex(10)
+        index.insert(1, (0, 0, 5, 5))
+        index.insert(2, (-25, -25, 25, 25))
+        index.insert(3, (30, 30, 31, 31))
+        self.assertEquals(set([1, 2]), index.query((1, 1, 2, 2)))
+        self.assertEquals(set([3]), index.query((29, 29, 40, 40)))
+        self.assertEquals(set(), index.query((100, 100, 101, 101)))
+
+
+class GeogitTilePyramidTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        store = SnapshotStore(os.path.join(self.folder, "snapshots"))
+        store.put(OLDTREE, OLD_ROWS)
+        store.put(NEWTREE, NEW_ROWS)
+        self.repo = Repository(self.folder, ReplayConnector(INTERACTIONS))
+        self.repo.snapshots = store
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors = True)
+
+    def tiles(self, pyramid):
+        tiles = {}
+        for zoom in xrange(pyramid.minzoom, pyramid.maxzoom + 1):
+            for dirpath, dirnames, filenames in os.walk(os.path.join(pyramid.folder, str(zoom))):
+                for name in filenames:
+                    filename = os.path.join(dirpath, name)
+                    with open(filename, "rb") as f:
+                        tiles[os.path.relpath(filename, pyramid.folder)] = f.read()
+        return tiles
+
+    def testGenerate(self):
+        pyramid = TilePyramid(self.repo, "parks", os.path.join(self.folder, "tiles"), 0, 2)
+        self.assertEquals(4, pyramid.generate("old"))
+        self.assertEquals(OLD, pyramid.state()["commit"])
+        self.assertEquals(OLDTREE, pyramid.state()["tree"])
+        tiles = self.tiles(pyramid)
+        self.assertEquals(set(["0/0/0.mvt", "1/1/0.mvt", "2/2/1.mvt", "2/3/1.mvt"]), set(tiles))
+        self.assertTrue("park 1" in tiles["2/2/1.mvt"])
+        self.assertFalse("park 2" in tiles["2/2/1.mvt"])
+
+    def testUpdate(self):
+        pyramid = TilePyramid(self.repo, "parks", os.path.join(self.folder, "tiles"), 0, 2)
+        pyramid.generate("old")
+        before = self.tiles(pyramid)
+        #tiles that only contain parks/2 must not be written again
+        unchanged = pyramid.tilefile(2, 3, 1)
+        os.utime(unchanged, (0, 0))
+        changed = pyramid.update("new")
+        self.assertEquals(0, os.path.getmtime(unchanged))
+        after = self.tiles(pyramid)
+        #the tiles with the old and new versions of parks/1, and those with parks/3
+        self.assertEquals(5, changed)
+        self.assertEquals(set(["0/0/0.mvt", "1/1/0.mvt", "1/0/1.mvt", "2/2/1.mvt", "2/0/2.mvt"]),
+                          set(t for t in after if before.get(t) != after[t]))
+        self.assertEquals(before["2/3/1.mvt"], after["2/3/1.mvt"])
+        self.assertEquals(NEW, pyramid.state()["commit"])
+        self.assertEquals(0, pyramid.update("new"))
+        fresh = TilePyramid(self.repo, "parks", os.path.join(self.folder, "fresh"), 0, 2)
+        fresh.generate("new")
+        self.assertEquals(self.tiles(fresh), after)
@@ -0,0 +1,32 @@
+import unittest
+import os
+from geogit.repo import Repository
+from geogit.treediff import TreeDiffer
+import geogit
+
+class GeogitTreeDiffTest(unittest.TestCase):
+
+    repo = Repository(os.path.join(os.path.dirname(__file__), 'data/testrepo'))
+
+    def testSameAsDiff(self):
+        expected = sorted((d.path, d.oldref, d.newref) for d in self.repo.diff(geogit.HEAD + "~1", geogit.HEAD))
+        diffs = self.repo.treediff(geogit.HEAD + "~1", geogit.HEAD)
+        self.assertEquals(expected, [(d.path, d.oldref, d.newref) for d in diffs])
+
+    def testPath(self):
+        diffs = self.repo.treediff(geogit.HEAD + "~1", geogit.HEAD, "parks")
+        self.assertTrue("parks/5" in [d.path for d in diffs])
+        self.assertEquals([], self.repo.treediff(geogit.HEAD + "~1", geogit.HEAD, "parks/1"))
+
+    def testHasChanged(self):
+        self.assertTrue(self.repo.haschanged(geogit.HEAD + "~1", geogit.HEAD, "parks"))
+        self.assertFalse(self.repo.haschanged(geogit.HEAD, geogit.HEAD, "parks"))
+        self.assertFalse(self.repo.haschanged(geogit.HEAD + "~1", geogit.HEAD, "parks/1"))
+
+    def testListingsReused(self):
+        differ = TreeDiffer(self.repo)
+        self.repo.cleancache()
+        differ.diff(geogit.HEAD + "~1", geogit.HEAD)
+        listings = differ.listings
+        differ.diff(geogit.HEAD + "~1", geogit.HEAD)
+        self.assertEquals(listings, differ.listings)
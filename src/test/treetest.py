@@ -13,6 +13,10 @@ class GeogitTreeTest(unittest.TestCase):
     def getTempPath(self):
         return os.path.join(os.path.dirname(__file__), "temp", str(time.time())).replace('\\', '/')
 
+    def tearDown(self):
+        #removes the repositories and files created by the test
+        shutil.rmtree(os.path.join(os.path.dirname(__file__), "temp"), ignore_errors = True)
+
     def getClonedRepo(self):
         src = self.repo.url
         dst = self.getTempPath()
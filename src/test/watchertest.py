@@ -0,0 +1,100 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import geogit
+from geogit.repo import Repository
+from geogit.replayconnector import ReplayConnector
+from geogit.watcher import RefWatcher, readrefs, EVENT_HEAD, EVENT_STAGE, EVENT_REF
+
+OLD_ID = "1" * 40
+NEW_ID = "2" * 40
+
+class GeogitWatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.url = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.url, ".geogit", "refs", "heads"))
+        os.makedirs(os.path.join(self.url, ".geogit", "refs", "tags"))
+        self.write("HEAD", "ref: refs/heads/master")
+        self.write("refs/heads/master", OLD_ID)
+        self.write("STAGE_HEAD", OLD_ID)
+        self.write("WORK_HEAD", OLD_ID)
+        self.repo = Repository(self.url, ReplayConnector([]))
+
+    def tearDown(self):
+        shutil.rmtree(self.url, ignore_errors = True)
+
+    def write(self, name, content):
+        filename = os.path.join(self.url, ".geogit", *name.split("/"))
+        if not os.path.isdir(os.path.dirname(filename)):
+            os.makedirs(os.path.dirname(filename))
+        with open(filename, "w") as f:
+            f.write(content + "\n")
+
+    def testReadRefs(self):
+        refs = readrefs(self.url)
+        self.assertEquals("refs/heads/master", refs[geogit.HEAD])
+        self.assertEquals(OLD_ID, refs["refs/heads/master"])
+        self.assertEquals(OLD_ID, refs[geogit.WORK_HEAD])
+
+    def testCheck(self):
+        watcher = RefWatcher(self.repo)
+        events = []
+        watcher.oncommit(lambda *args: events.append(("commit",) + args))
+        watcher.addlistener(EVENT_STAGE, lambda *args: events.append(("stage",) + args))
+        watcher.addlistener(EVENT_REF, lambda *args: events.append(("ref",) + args))
+        watcher.addlistener(EVENT_HEAD, lambda *args: events.append(("head",) + args))
+        self.assertEquals([], watcher.check())
+        self.write("refs/heads/master", NEW_ID)
+        self.write("refs/heads/branch", NEW_ID)
+        self.write("refs/tags/tag1", NEW_ID)
+        self.write("STAGE_HEAD", NEW_ID)
+        watcher.check()
+        self.assertEquals([("commit", "branch", None, NEW_ID), ("commit", "master", OLD_ID, NEW_ID),
+                           ("ref", "refs/tags/tag1", None, NEW_ID), ("stage", OLD_ID, NEW_ID)], sorted(events))
+        events[:] = []
+        self.write("HEAD", OLD_ID)
+        watcher.check()
+        self.write("HEAD", NEW_ID)
+        watcher.check()
+        self.assertEquals([("head", "refs/heads/master", OLD_ID), ("head", OLD_ID, NEW_ID),
+                           ("commit", None, OLD_ID, NEW_ID)], events)
+
+    def testInvalidate(self):
+        self.repo.objectcache.put(("dateindex", "master"), "index")
+        self.repo.objectcache.put(("dateindex", geogit.HEAD), "index")
+        self.repo.objectcache.put(("dateindex", "other"), "index")
+        self.repo.objectcache.put(("status", "a"), "status")
+        self.repo.objectcache.put("feature", "data")
+        watcher = RefWatcher(self.repo)
+        self.write("refs/heads/master", NEW_ID)
+        watcher.check()
+        self.assertFalse(("dateindex", "master") in self.repo.objectcache)
+        self.assertFalse(("dateindex", geogit.HEAD) in self.repo.objectcache)
+        self.assertFalse(("status", "a") in self.repo.objectcache)
+        self.assertTrue(("dateindex", "other") in self.repo.objectcache)
+        self.assertTrue("feature" in self.repo.objectcache)
+
+    def waitForCommit(self, polling):
+        received = threading.Event()
+        events = []
+        def oncommit(branch, old, new):
+            events.append((branch, old, new))
+            received.set()
+        watcher = RefWatcher(self.repo, polling, interval = 0.05)
+        watcher.oncommit(oncommit)
+        with watcher:
+            self.assertEquals(not polling and sys.platform.startswith("linux"), watcher.usinginotify)
+            self.write("refs/remotes/origin/master", OLD_ID)
+            self.write("refs/heads/master", NEW_ID)
+            received.wait(5)
+        self.assertEquals([("master", OLD_ID, NEW_ID)], events)
+
+    def testPolling(self):
+        self.waitForCommit(True)
+
+    def testInotify(self):
+        self.waitForCommit(False)